@@ -0,0 +1,145 @@
+"""Deploy throughput benchmark.
+
+Deploys the built-in topologies at increasing sizes to a local mock P4Runtime
+target and reports the number of written table entries per second.
+
+Run from the repository root:
+
+    python -m benchmarks.deploy_benchmark --batch-size 1 100 --latency 0 0.001
+    python -m benchmarks.deploy_benchmark --hops 10 50 --tree-fanouts 4,4 4,4,4 \
+        --k-ary-depth 2 3 --random-routers 100 500
+"""
+import argparse
+import io
+import json
+import logging
+import time
+
+from virntup import topology_generator
+from virntup.address_allocator import AddressAllocator
+from virntup.mock_target import MockTarget
+from virntup.target_configurator import TargetConnector
+from virntup.topology_controller import TopologyController, get_required_resources
+
+
+def create_env(topo):
+    """create_env.
+
+    Creates an env.json which provides exactly the wire loops and host links
+    the topology needs.
+
+    Parameters
+    ----------
+    topo :
+        V_topology - topology with calculated routing tables
+
+    Returns
+    ----------
+    io.StringIO : env.json file descriptor
+    """
+    links, host_links = get_required_resources(topo.get_IR_representation())
+    env = {
+        "links": [[2 * i, 2 * i + 1] for i in range(links)],
+        "host_links": [["h{}".format(i), 2 * links + i] for i in range(host_links)]
+    }
+    return io.StringIO(json.dumps(env))
+
+
+def run_deploy(mock_target, topo_type, params, batch_size):
+    """run_deploy.
+
+    Deploys one topology to the (empty) mock target.
+
+    Returns
+    ----------
+    dict : Result of the run
+    """
+    # The default address plan only has room for 256 subnets
+    topo = topology_generator.generate_topo(
+        topo_type, allocator=AddressAllocator("10.0.0.0/8"), **params)
+    controller = TopologyController(create_env(topo), topo=topo)
+
+    # Start every run with empty tables
+    mock_target.servicer.set_p4info(mock_target.servicer.p4info)
+    write_requests = mock_target.servicer.write_requests
+
+    connector = TargetConnector(
+        "localhost", mock_target.port, batch_size=batch_size)
+
+    start = time.perf_counter()
+    controller.deploy(connector)
+    duration = time.perf_counter() - start
+
+    return {
+        "topology": topo_type if not params else "{} {}".format(topo_type, params),
+        "batch_size": batch_size,
+        "latency": mock_target.servicer.latency,
+        "entries": connector.written_updates,
+        "write_requests": mock_target.servicer.write_requests - write_requests,
+        "seconds": duration,
+        "entries_per_second": connector.written_updates / duration
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark `TopologyController.deploy` against a local mock P4Runtime target")
+    parser.add_argument('--hops', type=int, nargs='+', default=[10, 50, 200],
+                        help="Sizes of the n_hops topologies (default: 10 50 200)")
+    parser.add_argument('--tree-fanouts', nargs='+', default=["4,4", "4,4,4"],
+                        help="Fanouts of the tree topologies (default: 4,4 4,4,4)")
+    parser.add_argument('--arity', type=int, default=4,
+                        help="Arity of the k_ary topologies (default: 4)")
+    parser.add_argument('--k-ary-depth', type=int, nargs='+', default=[2, 3],
+                        help="Depths of the k_ary topologies (default: 2 3)")
+    parser.add_argument('--random-routers', type=int, nargs='+', default=[100, 500],
+                        help="Number of vRouters of the random topologies, each with twice "
+                        "as many hosts (default: 100 500)")
+    parser.add_argument('--seed', type=int, default=1,
+                        help="Seed of the random topologies (default: 1)")
+    parser.add_argument('--batch-size', type=int, nargs='+', default=[1, 100],
+                        help="Batch sizes of the TargetConnector (default: 1 100)")
+    parser.add_argument('--latency', type=float, nargs='+', default=[0],
+                        help="Delay of the mock target per RPC in seconds (default: 0)")
+    parser.add_argument('--p4info', default=None,
+                        help="p4info of virntup.p4 (default: generated p4info)")
+    parser.add_argument('--json', type=argparse.FileType('w'), default=None,
+                        help="Store the results as json")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    cases = [('minimal', {}), ('medium', {}), ('large', {})]
+    cases += [('n_hops', {"hops": hops}) for hops in args.hops]
+    cases += [('tree', {"fanouts": fanouts})
+              for fanouts in args.tree_fanouts]
+    cases += [('k_ary', {"arity": args.arity, "depth": depth})
+              for depth in args.k_ary_depth]
+    cases += [('random', {"routers": routers, "hosts": 2 * routers, "seed": args.seed})
+              for routers in args.random_routers]
+
+    mock_target = MockTarget(p4info_path=args.p4info)
+    mock_target.start()
+
+    results = []
+    print("{:<52} {:>6} {:>8} {:>9} {:>9} {:>10} {:>12}".format(
+        "topology", "batch", "latency", "entries", "requests", "seconds", "entries/s"))
+    try:
+        for latency in args.latency:
+            mock_target.servicer.latency = latency
+            for topo_type, params in cases:
+                for batch_size in args.batch_size:
+                    result = run_deploy(
+                        mock_target, topo_type, params, batch_size)
+                    results.append(result)
+                    print("{topology:<52} {batch_size:>6} {latency:>8} {entries:>9} {write_requests:>9} "
+                          "{seconds:>10.3f} {entries_per_second:>12.0f}".format(**result))
+    finally:
+        mock_target.stop()
+
+    if args.json:
+        json.dump(results, args.json, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""CLI startup benchmark.
+
+Measures the import time of the modules the `topogen` stage loads and of the
+additional target backend the `deploy` stage loads, as well as the wall-clock
+time of a complete `virntup.py topogen` run. Every measurement runs in a fresh
+interpreter.
+
+Run from the repository root:
+
+    python -m benchmarks.startup_benchmark --repeat 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules imported by virntup.py at startup
+CLI_MODULES = [
+    "virntup.topology_generator",
+    "virntup.topology_sweep",
+    "virntup.topology",
+    "virntup.address_allocator",
+    "virntup.topology_controller",
+]
+
+# Modules additionally imported by the deploy stage
+DEPLOY_MODULES = ["virntup.target_configurator"]
+
+MARKER = "-- start of measurement --"
+
+
+def import_time(modules, baseline_modules=()):
+    """import_time.
+
+    Imports `modules` in a fresh interpreter (after `baseline_modules`) and
+    returns their cumulative import time in ms reported by `-X importtime`.
+    """
+    code = "".join("import {}\n".format(module) for module in baseline_modules)
+    code += "import sys; sys.stderr.write('{}\\n')\n".format(MARKER)
+    code += "".join("import {}\n".format(module) for module in modules)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=REPO_ROOT, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+
+    lines = result.stderr.splitlines()
+    total_us = 0
+    for line in lines[lines.index(MARKER) + 1:]:
+        # import time: self [us] | cumulative | imported package
+        _, cumulative, name = line.split("|")
+        # Nested imports are part of the cumulative time of their parent
+        if not name.startswith("  "):
+            total_us += int(cumulative)
+    return total_us / 1000
+
+
+def cli_run_time(args):
+    """cli_run_time.
+
+    Returns the wall-clock time in ms of one `virntup.py` invocation.
+    """
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "virntup.py"] + args, cwd=REPO_ROOT,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the startup time of the virntup CLI stages")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="Number of runs per measurement, the median is reported (default: 5)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ir_path = os.path.join(tmp_dir, "ir.json")
+        measurements = [
+            ("topogen imports", lambda: import_time(CLI_MODULES)),
+            ("deploy imports (additional)",
+             lambda: import_time(DEPLOY_MODULES, CLI_MODULES)),
+            ("topogen -t minimal (wall clock)",
+             lambda: cli_run_time(["topogen", "-t", "minimal", "-o", ir_path])),
+        ]
+
+        for name, measure in measurements:
+            runs = [measure() for _ in range(args.repeat)]
+            print("{:<34} {:>9.1f} ms  (min {:.1f}, max {:.1f})".format(
+                name, statistics.median(runs), min(runs), max(runs)))
+
+
+if __name__ == '__main__':
+    main()
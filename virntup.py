@@ -1,156 +1,1235 @@
+import io
 import json
+import os
 import sys
 import logging
 
 import argparse
 from argparse import RawTextHelpFormatter
 
+from virntup import binary_ir
+from virntup import capacity_analyzer
+from virntup import pipe_placement
+from virntup import pipeline
+from virntup import port_setup
+from virntup import tenants
 from virntup import topology_generator
+from virntup import topology_sweep
 from virntup import topology
-from virntup import target_configurator
-from virntup.topology_controller import TopologyController
+from virntup.address_allocator import AddressAllocator
+from virntup.topology_controller import TopologyController, InsufficientEnvironmentError
 
 LOG_FORMAT = '%(levelname)s - %(module)s - %(message)s'
 
 
+def create_topology_controller(env, ir, placement='file', vRouter_offset=0, ipv4=False):
+    """create_topology_controller.
+
+    Creates the TopologyController and exits if the environment is too small
+    for the topology.
+
+    Parameters
+    ----------
+    env :
+        File descriptor for the env.json file
+    ir :
+        File descriptor for the intermediate representation json
+    placement :
+        str (default: 'file') - placement strategy of the wire loops and host
+        links, see `pipe_placement.PLACEMENT_STRATEGIES`
+    vRouter_offset :
+        int (default: 0) - offset of the vRouter numbers in the table entries
+    ipv4 :
+        bool (default: False) - also exit if the topology can not be
+        translated into table entries, see `check_ipv4()`
+    """
+    try:
+        topo_controller = TopologyController(
+            env, ir_fd=ir, placement=placement, vRouter_offset=vRouter_offset)
+    except InsufficientEnvironmentError as e:
+        logging.error(e)
+        sys.exit(-1)
+
+    if ipv4:
+        check_ipv4(topo_controller)
+    return topo_controller
+
+
+def check_ipv4(topo_controller):
+    """check_ipv4.
+
+    Exits if the topology uses an IPv6 address space. The virntup P4 program
+    only forwards IPv4, so such a topology can not be deployed, verified,
+    simulated or compiled into a deployment artifact.
+
+    Parameters
+    ----------
+    topo_controller :
+        TopologyController - mapped topology
+    """
+    try:
+        topo_controller.get_address_space()
+    except RuntimeError as e:
+        logging.error(e)
+        sys.exit(-1)
+
+
+def open_env(args, conf):
+    """open_env.
+
+    Returns the file descriptor of the env.json given by the CLI argument
+    (`-e`) or the conf.json and exits if it is missing.
+
+    Parameters
+    ----------
+    args :
+        argparse.Namespace - parsed CLI arguments
+    conf :
+        dict - conf.json
+    """
+    if args.env:
+        logging.info(
+            "Using CLI parameter for {} - {}".format("env", args.env))
+        return args.env
+    if conf['env']:
+        logging.info(
+            "Using config json for {} - {}".format("env", conf['env']))
+        return open(conf['env'], mode='r')
+
+    logging.error(
+        "env.json is neither specified via CLI nor in configuration json")
+    sys.exit(-1)
+
+
+def open_env_and_ir(args, conf):
+    """open_env_and_ir.
+
+    Returns the file descriptors of the env.json and the IR given by the CLI
+    arguments (`-e`, `-ir`) or the conf.json and exits if one is missing.
+
+    Parameters
+    ----------
+    args :
+        argparse.Namespace - parsed CLI arguments
+    conf :
+        dict - conf.json
+    """
+    env = open_env(args, conf)
+
+    if args.intermediate_representation:
+        ir = args.intermediate_representation
+        logging.info(
+            "Using CLI parameter for {} - {}".format("ir", args.intermediate_representation))
+    elif conf['ir']:
+        ir = open(conf['ir'], mode='rb')
+        logging.info(
+            "Using config json for {} - {}".format("ir", conf['ir']))
+    else:
+        logging.error(
+            "ir.json is neither specified via CLI nor in configuration json")
+        sys.exit(-1)
+
+    return env, ir
+
+
+def create_target_connector(options):
+    """create_target_connector.
+
+    Connects to the P4 target. The target_configurator (and with it the
+    p4runtime shell, gRPC and protobuf) is imported here and not at module
+    level, so the stages which do not talk to a target start fast.
+
+    Parameters
+    ----------
+    options :
+        dict - target options, see `get_target_options()`
+    """
+    from virntup import target_configurator
+
+    return target_configurator.TargetConnector(
+        options['hostname'],
+        options['port'],
+        p4info_path=options['p4info'],
+        p4binary_path=options['p4binary'],
+        batch_size=options['batch_size']
+    )
+
+
+def send_port_config(connector, options, topo_controller):
+    """send_port_config.
+
+    Sends the port configuration file or the port setup generated from the
+    mapping to the bf_shell of the target, if requested. Exits if a command
+    failed or the shell is not reachable.
+
+    Parameters
+    ----------
+    connector :
+        TargetConnector - connector of the target
+    options :
+        dict - target options, see `get_target_options()`
+    topo_controller :
+        TopologyController - deployed mapping
+    """
+    try:
+        if options['generate_port_config']:
+            batches = port_setup.generate_port_setup(
+                topo_controller, clear=options['clear_ports'])
+            if options['port_config_out']:
+                with options['port_config_out']:
+                    port_setup.write_port_setup(
+                        batches, options['port_config_out'])
+            connector.send_port_setup(9999, batches)
+        elif options['port_config']:
+            connector.send_bf_shell_commands(
+                9999, options['port_config'], window=options['bf_shell_window'])
+    except (RuntimeError, ValueError, OSError) as e:
+        logging.error(e)
+        sys.exit(-1)
+
+
+def get_artifact_key(env, ir, p4info_path, placement, vRouter_offset):
+    """get_artifact_key.
+
+    Reads the env.json and the IR and computes the key of their deployment
+    artifact (see `deploy_artifact.compute_key()`).
+
+    Parameters
+    ----------
+    env :
+        File descriptor for the env.json file
+    ir :
+        Binary file descriptor for the intermediate representation
+    p4info_path :
+        str - path to the p4info file
+    placement :
+        str - placement strategy
+    vRouter_offset :
+        int - offset of the vRouter numbers
+
+    Returns
+    ----------
+    (bytes, str, bytes) : key, content of the env.json and of the IR
+    """
+    from virntup import deploy_artifact
+
+    env_data = env.read()
+    ir_data = ir.read()
+    with open(p4info_path, 'rb') as p4info_fd:
+        p4info_data = p4info_fd.read()
+
+    key = deploy_artifact.compute_key(
+        ir_data, env_data.encode(), p4info_data, placement, vRouter_offset)
+    return key, env_data, ir_data
+
+
+def write_artifact(topo_controller, key, p4info_path, artifact_path):
+    """write_artifact.
+
+    Compiles the mapping into a deployment artifact. The artifact is written
+    to a temporary file first, so an interrupted compilation never leaves a
+    truncated artifact behind.
+
+    Parameters
+    ----------
+    topo_controller :
+        TopologyController - mapped topology
+    key :
+        bytes - key of the inputs, see `get_artifact_key()`
+    p4info_path :
+        str - path to the p4info file
+    artifact_path :
+        str - path of the artifact
+    """
+    from virntup import deploy_artifact
+
+    p4info = deploy_artifact.load_p4info(p4info_path)
+    with open(artifact_path + ".tmp", 'wb') as artifact_fd:
+        deploy_artifact.compile_artifact(
+            topo_controller, p4info, key, artifact_fd)
+    os.replace(artifact_path + ".tmp", artifact_path)
+    logging.info("Stored deployment artifact {}".format(artifact_path))
+
+
+def read_artifact_key(artifact_path):
+    """read_artifact_key.
+
+    Returns the key of a deployment artifact or None if there is no valid
+    artifact at the path.
+    """
+    from virntup import deploy_artifact
+
+    try:
+        with open(artifact_path, 'rb') as artifact_fd:
+            return deploy_artifact.ArtifactReader(artifact_fd).key
+    except (OSError, ValueError):
+        return None
+
+
+def get_target_options(args, conf):
+    """get_target_options.
+
+    Resolves the options of the P4 target. CLI parameters are preferred over
+    the configuration json.
+
+    Parameters
+    ----------
+    args :
+        argparse.Namespace - parsed CLI arguments of a stage which talks to
+        the target
+    conf :
+        dict - configuration json
+
+    Returns
+    ----------
+    dict : target, port_config, hostname, port, p4info, p4binary, batch_size,
+    bf_shell_window, generate_port_config, port_config_out and clear_ports
+    """
+    if args.target:
+        target = args.target
+        logging.info(
+            "Using CLI parameter for {} - {}".format("target", args.target))
+    elif conf['target']:
+        target = conf['target']
+        logging.info(
+            "Using config json for {} - {}".format("target", conf['target']))
+    else:
+        logging.error(
+            "Target is neither specified via CLI nor in configuration json")
+        sys.exit()(-1)
+
+    port_config = None
+    if target == 'tofino':
+        if args.port_config:
+            port_config = args.port_config
+            logging.info(
+                "Using CLI parameter for {} - {}".format("port_config", args.port_config))
+        elif conf.get('port_config'):
+            port_config = open(conf['port_config'], mode='r')
+            logging.info(
+                "Using config json for {} - {}".format("port_config", conf['port_config']))
+        else:
+            logging.warning(
+                "Port configuration is neither specified via CLI nor in configuration json - tofino ports won't be up!")
+
+    if args.hostname:
+        hostname = args.hostname
+        logging.info(
+            "Using CLI parameter for {} - {}".format("hostname", args.hostname))
+    elif conf['hostname']:
+        hostname = conf['hostname']
+        logging.info(
+            "Using config json for {} - {}".format("hostname", conf['hostname']))
+    else:
+        logging.error(
+            "hostname is neither specified via CLI nor in configuration json")
+        sys.exit()(-1)
+
+    if args.port:
+        port = args.port
+        logging.info(
+            "Using CLI parameter for {} - {}".format("port", args.port))
+    elif conf['port']:
+        port = conf['port']
+        logging.info(
+            "Using config json for {} - {}".format("port", conf['port']))
+    else:
+        logging.error(
+            "port is neither specified via CLI nor in configuration json")
+        sys.exit()(-1)
+
+    p4info = None
+    p4binary = None
+
+    if args.p4info:
+        p4info = args.p4info
+        logging.info(
+            "Using CLI parameter for {} - {}".format("p4info", args.p4info))
+    elif conf['p4info']:
+        p4info = conf['p4info']
+        logging.info(
+            "Using config json for {} - {}".format("p4info", conf['p4info']))
+    else:
+        logging.info(
+            "p4info is neither specified via CLI nor in configuration json - assuming no configuration should be deployed")
+
+    if args.p4binary:
+        p4binary = args.p4binary
+        logging.info(
+            "Using CLI parameter for {} - {}".format("p4binary", args.p4binary))
+    elif conf['p4binary']:
+        p4binary = conf['p4binary']
+        logging.info(
+            "Using config json for {} - {}".format("p4binary", conf['p4binary']))
+    else:
+        logging.error(
+            "p4binary is neither specified via CLI nor in configuration json - assuming no configuration should be deployed")
+
+    if args.batch_size:
+        batch_size = args.batch_size
+        logging.info(
+            "Using CLI parameter for {} - {}".format("batch_size", args.batch_size))
+    elif conf.get('batch_size'):
+        batch_size = conf['batch_size']
+        logging.info(
+            "Using config json for {} - {}".format("batch_size", conf['batch_size']))
+    else:
+        batch_size = 1
+
+    if args.bf_shell_window:
+        bf_shell_window = args.bf_shell_window
+    else:
+        bf_shell_window = conf.get('bf_shell_window') or 1
+
+    generate_port_config = args.generate_port_config or bool(
+        conf.get('generate_port_config'))
+    if generate_port_config and port_config:
+        logging.info(
+            "Generating the port configuration from the mapping instead of using {}".format(port_config))
+
+    return {
+        "target": target,
+        "port_config": port_config,
+        "hostname": hostname,
+        "port": port,
+        "p4info": p4info,
+        "p4binary": p4binary,
+        "batch_size": batch_size,
+        "bf_shell_window": bf_shell_window,
+        "generate_port_config": generate_port_config,
+        "port_config_out": args.port_config_out,
+        "clear_ports": args.clear_ports or bool(conf.get('clear_ports'))
+    }
+
+
+def get_address_plan(args):
+    """get_address_plan.
+
+    Parameters
+    ----------
+    args :
+        argparse.Namespace - parsed CLI arguments, see `add_topology_arguments()`
+
+    Returns
+    ----------
+    dict : keyword arguments of the AddressAllocator
+    """
+    return {
+        "address_space": args.address_space or topology.ADDRESS_SPACE,
+        "router_prefix": args.router_prefix or topology.SUBNET_PREFIX,
+        "host_prefix": args.host_prefix or topology.SUBNET_PREFIX
+    }
+
+
+def generate_topology(args, plan):
+    """generate_topology.
+
+    Generates the topology selected by the CLI arguments and exits if the
+    arguments are invalid.
+
+    Parameters
+    ----------
+    args :
+        argparse.Namespace - parsed CLI arguments, see `add_topology_arguments()`
+    plan :
+        dict - address plan, see `get_address_plan()`
+    """
+    try:
+        return topology_generator.generate_topo(
+            args.type,
+            AddressAllocator(**plan),
+            aggregate=args.aggregate,
+            verify_aggregation=args.verify_aggregation,
+            compact=args.compact,
+            **get_topology_params(args)
+        )
+    except ValueError as e:
+        logging.error(e)
+        sys.exit(-1)
+
+
+def get_topology_params(args):
+    """get_topology_params.
+
+    Returns the type specific topology parameters which are set in the CLI
+    arguments, see `topology_generator.create_topo()`.
+
+    Parameters
+    ----------
+    args :
+        argparse.Namespace - parsed CLI arguments, see `add_topology_arguments()`
+    """
+    names = ['hops', 'fanouts', 'hosts_per_leaf', 'arity', 'depth',
+             'k', 'routers', 'hosts', 'seed', 'max_fanout']
+    return {name: getattr(args, name) for name in names
+            if getattr(args, name) is not None}
+
+
+def add_topology_arguments(parser):
+    """add_topology_arguments.
+
+    Adds the arguments which select the topology type and its address plan.
+
+    Parameters
+    ----------
+    parser :
+        argparse.ArgumentParser
+    """
+    parser.add_argument(
+        '-t', '--type',
+        help="Toplogoy type to be generated",
+        required=True,
+        choices=topology_generator.TOPOLOGY_TYPES
+    )
+
+    parser.add_argument(
+        '--hops',
+        type=int,
+        help="Only a valid parameter if type `n_hops` was chosen. Define the number of routers between two hosts"
+    )
+
+    parser.add_argument(
+        '--fanouts',
+        help="""Only a valid parameter if type `tree` was chosen. Number of child vRouters
+    per layer, e.g. `4,4,8`"""
+    )
+
+    parser.add_argument(
+        '--hosts-per-leaf',
+        type=int,
+        help="Only a valid parameter if type `tree` or `k_ary` was chosen. Hosts per vRouter of the last layer - Default is 1"
+    )
+
+    parser.add_argument(
+        '--arity',
+        type=int,
+        help="Only a valid parameter if type `k_ary` was chosen. Number of child vRouters of each vRouter"
+    )
+
+    parser.add_argument(
+        '--depth',
+        type=int,
+        help="Only a valid parameter if type `k_ary` was chosen. Number of layers below the root vRouter"
+    )
+
+    parser.add_argument(
+        '-k',
+        type=int,
+        help="Only a valid parameter if type `fat_tree` was chosen. Even port count of the fat-tree switches"
+    )
+
+    parser.add_argument(
+        '--routers',
+        type=int,
+        help="Only a valid parameter if type `random` was chosen. Number of vRouters"
+    )
+
+    parser.add_argument(
+        '--hosts',
+        type=int,
+        help="Only a valid parameter if type `random` was chosen. Number of hosts"
+    )
+
+    parser.add_argument(
+        '--seed',
+        type=int,
+        help="Only a valid parameter if type `random` was chosen. Seed of the random topology"
+    )
+
+    parser.add_argument(
+        '--max-fanout',
+        type=int,
+        help="Only a valid parameter if type `random` was chosen. Maximum number of neighbours of a vRouter"
+    )
+
+    parser.add_argument(
+        '--address-space',
+        help="IPv4 or IPv6 address space the networks of the topology are taken from - Default is `10.42.0.0/16`"
+    )
+
+    parser.add_argument(
+        '--router-prefix',
+        type=int,
+        help="Prefix length of the vRouter uplink networks - Default is 24"
+    )
+
+    parser.add_argument(
+        '--host-prefix',
+        type=int,
+        help="Prefix length of the host link networks - Default is 24"
+    )
+
+    parser.add_argument(
+        '--aggregate',
+        action='store_true',
+        help="""Assign one contiguous address block to each subtree and summarize
+    the routing tables - Results in about one route per vRouter port"""
+    )
+
+    parser.add_argument(
+        '--verify-aggregation',
+        action='store_true',
+        help="Only valid in combination with --aggregate. Check that the summarized routing tables forward like the original ones"
+    )
+
+    parser.add_argument(
+        '--compact',
+        action='store_true',
+        help="""Keep the topology in compact arrays and derive the routing tables from
+    subtree intervals - Same output with a fraction of the memory for big trees"""
+    )
+
+
+def add_dot_arguments(parser):
+    """add_dot_arguments.
+
+    Adds the arguments which control the DOT representation (`-d/--dot`).
+
+    Parameters
+    ----------
+    parser :
+        argparse.ArgumentParser
+    """
+    parser.add_argument(
+        '--dot-max-depth',
+        type=int,
+        help="Draw the vRouters at this depth (the root has depth 0) as summary of their subtree"
+    )
+
+    parser.add_argument(
+        '--dot-max-subtree-size',
+        type=int,
+        help="Draw subtrees with more nodes as a single summary node"
+    )
+
+    parser.add_argument(
+        '--dot-routingtables',
+        default='all',
+        help="""`all` (default), `none` or comma separated ids of the vRouters whose
+    routing table is added to the dot representation"""
+    )
+
+
+def get_dot_options(args):
+    """get_dot_options.
+
+    Returns the options of `topology.write_dot_representation()` selected by
+    the CLI arguments, see `add_dot_arguments()`.
+
+    Parameters
+    ----------
+    args :
+        argparse.Namespace - parsed CLI arguments
+    """
+    options = {
+        "with_routingtable": args.dot_routingtables != 'none',
+        "max_depth": args.dot_max_depth,
+        "max_subtree_size": args.dot_max_subtree_size
+    }
+    if args.dot_routingtables not in ('all', 'none'):
+        try:
+            options["routingtable_routers"] = {
+                int(router_id) for router_id in args.dot_routingtables.split(",") if router_id}
+        except ValueError:
+            logging.error("--dot-routingtables expects `all`, `none` or vRouter ids")
+            sys.exit(-1)
+    return options
+
+
+def add_placement_argument(parser):
+    """add_placement_argument.
+
+    Parameters
+    ----------
+    parser :
+        argparse.ArgumentParser
+    """
+    parser.add_argument(
+        '--placement',
+        choices=pipe_placement.PLACEMENT_STRATEGIES,
+        help="""Order in which wire loops and host links are assigned - `file` (default)
+    or `pipe` to keep subtrees in few pipes (needs port metadata in env.json).
+    Has to be the same for envgen and deploy"""
+    )
+
+
+def get_placement(args, conf):
+    """get_placement.
+
+    Returns the placement strategy of the CLI arguments or the conf.json.
+
+    Parameters
+    ----------
+    args :
+        argparse.Namespace - parsed CLI arguments
+    conf :
+        dict - conf.json
+    """
+    if args.placement:
+        return args.placement
+    if conf.get('placement'):
+        logging.debug(
+            "Using config json for {} - {}".format("placement", conf['placement']))
+        return conf['placement']
+    return 'file'
+
+
+def add_vRouter_offset_argument(parser):
+    """add_vRouter_offset_argument.
+
+    Parameters
+    ----------
+    parser :
+        argparse.ArgumentParser
+    """
+    parser.add_argument(
+        '--vRouter-offset',
+        type=int,
+        help="""Offset added to the vRouter ids to get the vRouter numbers of the table
+    entries - Default is 0. Staged topologies need disjoint vRouter numbers"""
+    )
+
+
+def get_vRouter_offset(args, conf):
+    """get_vRouter_offset.
+
+    Returns the vRouter offset of the CLI arguments or the conf.json.
+
+    Parameters
+    ----------
+    args :
+        argparse.Namespace - parsed CLI arguments
+    conf :
+        dict - conf.json
+    """
+    if args.vRouter_offset is not None:
+        return args.vRouter_offset
+    if conf.get('vRouter_offset') is not None:
+        logging.debug(
+            "Using config json for {} - {}".format("vRouter_offset", conf['vRouter_offset']))
+        return conf['vRouter_offset']
+    return 0
+
+
+def add_target_arguments(parser, target_flags=('-t', '--target')):
+    """add_target_arguments.
+
+    Adds the arguments which describe the P4 target and the deployment.
+
+    Parameters
+    ----------
+    parser :
+        argparse.ArgumentParser
+    target_flags :
+        tuple of str - option strings of the target type argument
+    """
+    parser.add_argument(
+        *target_flags,
+        type=str,
+        choices=['bmv2', 'tofino'],
+        help='Target type to deploy to'
+    )
+
+    parser.add_argument(
+        '--port_config',
+        type=argparse.FileType('r'),
+        help='Path to the tofino port configuration file - Will be sent to the bf_shell'
+    )
+    parser.add_argument(
+        '--generate-port-config',
+        action='store_true',
+        help="""Generate the port configuration from the mapping instead of --port_config.
+    Only the used ports are added and enabled, with speed, FEC and front panel
+    port (`fp`) of the port metadata of the env.json"""
+    )
+    parser.add_argument(
+        '--port-config-out',
+        type=argparse.FileType('w'),
+        help="(optional) Store the generated port configuration to the given path"
+    )
+    parser.add_argument(
+        '--clear-ports',
+        action='store_true',
+        help="""With --generate-port-config, delete all ports of the switch first instead
+    of the ports of the env.json - this also disables the ports of other tenants"""
+    )
+    parser.add_argument(
+        '--bf-shell-window',
+        type=int,
+        help="""Number of bf_shell commands sent before their response is awaited -
+    Default is 1 (wait for the prompt after every command)"""
+    )
+    parser.add_argument(
+        '--hostname',
+        help='fqdn/ip of the P4 Runtime target'
+    )
+
+    parser.add_argument(
+        '--port',
+        help='gRPC Port of the P4 Runtime target'
+    )
+
+    parser.add_argument(
+        '--p4info',
+        help='Path to the p4info file generated for by the target compiler'
+    )
+
+    parser.add_argument(
+        '--p4binary',
+        help='Path to the p4binary file generated for by the target compiler and modified by the p4-runtime-shell script'
+    )
+
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help="""Read the current table entries from the target and only write the
+    difference (INSERT/MODIFY/DELETE) instead of inserting all entries"""
+    )
+
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        help='Number of table entries sent in one P4Runtime WriteRequest - Default is 1 (no batching)'
+    )
+
+
 def main():
     """main.
 
-    Virntup main - CLI for virntup
-    """
+    Virntup main - CLI for virntup
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Virntup - Virtualized network topologies using P4", formatter_class=RawTextHelpFormatter)
+
+    parser.add_argument('--debug',
+                        action='store_true',
+                        help='Print Debug log')
+
+    parser.add_argument(
+        '-c', '--conf',
+        type=argparse.FileType('r'),
+        help="""Path to the target definition json file.
+This json file can contain all necessary configuration details. Like 
+{   "target": "bmv2",               # bmv2 or tofino
+    "env": "env.json",              # Path to the enviroment configuratioin file 
+    "ir": "ir.json",                # Path where the ir should be stored 
+    "host": "host.json",            # Path where the host config should be stored
+    "hostname": "localhost",
+    "port": 50051,
+    "p4info": "/path/to/p4info",    # Absolute path to P4 info file created by P4 compiler
+    "p4binary": "/path/to/p4binary", # Absolute path to P4 binary, which was modified by the P4Runtime shell script (see github)
+    "batch_size": 1                 # Number of table entries per P4Runtime WriteRequest
+}
+
+CLI parameters will overwrite the configuration if set.
+"""
+    )
+    subparsers = parser.add_subparsers(dest='command')
+
+    # Define sub-parsers for all subssytems
+    topogen_parser = subparsers.add_parser(
+        'topogen', help='Generate Toplogoies', formatter_class=RawTextHelpFormatter)
+    envgen_parser = subparsers.add_parser(
+        'envgen', help='Generate Host-configuration for Toplogy', formatter_class=RawTextHelpFormatter)
+    deploy_parser = subparsers.add_parser(
+        'deploy', help='Deploy Toplogoy to Target', formatter_class=RawTextHelpFormatter)
+    simulate_parser = subparsers.add_parser(
+        'simulate', help='Check the reachability of all host pairs offline', formatter_class=RawTextHelpFormatter)
+    up_parser = subparsers.add_parser(
+        'up', help='Generate, map and deploy a Toplogoy in one step', formatter_class=RawTextHelpFormatter)
+    placement_parser = subparsers.add_parser(
+        'placement', help='Compare the predicted path latency of the placement strategies', formatter_class=RawTextHelpFormatter)
+    capacity_parser = subparsers.add_parser(
+        'capacity', help='Predict the load of wire loops and host links for a traffic pattern', formatter_class=RawTextHelpFormatter)
+    tenants_parser = subparsers.add_parser(
+        'tenants', help='Pack several topologies onto one switch and deploy them per tenant', formatter_class=RawTextHelpFormatter)
+    teardown_parser = subparsers.add_parser(
+        'teardown', help='Remove all virntup table entries from the target', formatter_class=RawTextHelpFormatter)
+    verify_parser = subparsers.add_parser(
+        'verify', help='Compare the table entries of the target with the mapping', formatter_class=RawTextHelpFormatter)
+
+    # Define Arguments for the topology_generator subsystem
+    add_topology_arguments(topogen_parser)
+
+    topogen_parser.add_argument(
+        '--sweep',
+        nargs=2,
+        action='append',
+        metavar=('PARAM', 'VALUES'),
+        help="""Generate one topology per value of PARAM in a process pool, e.g.
+`-t n_hops --sweep hops 1..500` or `--sweep hops "2;4;8"`.
+Can be given several times to sweep all combinations. Requires --sweep-dir"""
+    )
+
+    topogen_parser.add_argument(
+        '--sweep-dir',
+        help="Directory the IR of each sweep variant is stored in (as `<type>_<param>-<value>.json` or `.bin` with --format binary)"
+    )
+
+    topogen_parser.add_argument(
+        '--processes',
+        type=int,
+        help="Number of worker processes used for --sweep - Default is the number of CPUs"
+    )
+
+    topogen_parser.add_argument(
+        '--format',
+        choices=['json', 'binary'],
+        default='json',
+        help="""Format of the stored topology representation - Default is `json`.
+The compact `binary` IR is written while the topology is walked and read
+record by record by envgen, deploy and simulate"""
+    )
+
+    topogen_parser.add_argument(
+        '-o', '--out-file',
+        help="Path to the file in which the topology representation should be stored - Default is `ir.json`"
+    )
+
+    topogen_parser.add_argument(
+        '-d', '--dot',
+        help="Create dot represenetation and store the dot file to the path given. Can not be combined with --sweep"
+    )
+
+    add_dot_arguments(topogen_parser)
+
+    # Define Arguments for the env generation
+    envgen_parser.add_argument(
+        '-e', '--env',
+        type=argparse.FileType('r'),
+        help='Path to the enviroment configuration file'
+    )
+
+    envgen_parser.add_argument(
+        '-ir', '--intermediate-representation',
+        type=argparse.FileType('rb'),
+        help='Path to the intermediate representation file (json or binary IR)'
+    )
+
+    envgen_parser.add_argument(
+        '-t', '--target',
+        type=str,
+        choices=['bmv2', 'tofino'],
+        help='Target type to deploy to'
+    )
+
+    envgen_parser.add_argument(
+        '-o', '--out-file',
+        type=argparse.FileType('w'),
+        help='Path to the file the host-configuration should be stored'
+    )
+
+    envgen_parser.add_argument(
+        '--artifact-out',
+        help="""(optional) Compile the table entries into a deployment artifact at the
+    given path, which `deploy --artifact` replays without mapping the topology again"""
+    )
+
+    envgen_parser.add_argument(
+        '--p4info',
+        help='Path to the p4info file of the target - Needed for --artifact-out'
+    )
+    add_vRouter_offset_argument(envgen_parser)
+
+    # Define Arguments for deployment subsystem
+    deploy_parser.add_argument(
+        '-ir', '--intermediate-representation',
+        type=argparse.FileType('rb'),
+        help='Path to the intermediate representation file (json or binary IR)'
+    )
+
+    deploy_parser.add_argument(
+        '-e', '--env',
+        type=argparse.FileType('r'),
+        help='Path to the enviroment configuration file'
+    )
+
+    add_target_arguments(deploy_parser)
+    add_vRouter_offset_argument(deploy_parser)
+
+    deploy_mode = deploy_parser.add_mutually_exclusive_group()
+    deploy_mode.add_argument(
+        '--stage',
+        action='store_true',
+        help="""Only install the routes of the topology, the active topology keeps
+    forwarding. Needs a vRouter offset disjoint to the active topology"""
+    )
+    deploy_mode.add_argument(
+        '--activate',
+        action='store_true',
+        help="""Switch over to a staged topology by rewriting only the port mapping
+    in one WriteRequest"""
+    )
+    deploy_mode.add_argument(
+        '--artifact',
+        help="""Replay the deployment artifact at the given path if it was compiled from
+    the same IR, env.json, p4info and options (see `envgen --artifact-out`).
+    Otherwise the topology is deployed as usual and the artifact is (re)compiled.
+    Like a normal deploy the replay expects tables without the topology's entries"""
+    )
+
+    # Define Arguments for the offline data plane simulation
+    simulate_parser.add_argument(
+        '-e', '--env',
+        type=argparse.FileType('r'),
+        help='Path to the enviroment configuration file'
+    )
+
+    simulate_parser.add_argument(
+        '-ir', '--intermediate-representation',
+        type=argparse.FileType('rb'),
+        help='Path to the intermediate representation file (json or binary IR)'
+    )
+
+    simulate_parser.add_argument(
+        '--show',
+        type=int,
+        default=10,
+        help="Number of failed host pairs which are printed - Default is 10"
+    )
+
+    add_placement_argument(envgen_parser)
+    add_placement_argument(deploy_parser)
+    add_placement_argument(simulate_parser)
+
+    # Define Arguments for the placement report
+    placement_parser.add_argument(
+        '-e', '--env',
+        type=argparse.FileType('r'),
+        help='Path to the enviroment configuration file with port metadata'
+    )
+
+    placement_parser.add_argument(
+        '-ir', '--intermediate-representation',
+        type=argparse.FileType('rb'),
+        help='Path to the intermediate representation file (json or binary IR)'
+    )
+
+    placement_parser.add_argument(
+        '--hop-latency',
+        type=int,
+        default=pipe_placement.HOP_LATENCY_NS,
+        help="Latency of a pass through the switch in ns - Default is {}".format(
+            pipe_placement.HOP_LATENCY_NS)
+    )
 
-    parser = argparse.ArgumentParser(
-        description="Virntup - Virtualized network topologies using P4", formatter_class=RawTextHelpFormatter)
+    placement_parser.add_argument(
+        '--cross-pipe-latency',
+        type=int,
+        default=pipe_placement.CROSS_PIPE_LATENCY_NS,
+        help="Additional latency of a pass crossing pipes in ns - Default is {}".format(
+            pipe_placement.CROSS_PIPE_LATENCY_NS)
+    )
 
-    parser.add_argument('--debug',
-                        action='store_true',
-                        help='Print Debug log')
+    placement_parser.add_argument(
+        '--json',
+        type=argparse.FileType('w'),
+        help="(optional) Store the report as json to the given path"
+    )
 
-    parser.add_argument(
-        '-c', '--conf',
+    # Define Arguments for the capacity analysis
+    capacity_parser.add_argument(
+        '-e', '--env',
         type=argparse.FileType('r'),
-        help="""Path to the target definition json file.
-This json file can contain all necessary configuration details. Like 
-{   "target": "bmv2",               # bmv2 or tofino
-    "env": "env.json",              # Path to the enviroment configuratioin file 
-    "ir": "ir.json",                # Path where the ir should be stored 
-    "host": "host.json",            # Path where the host config should be stored
-    "hostname": "localhost",
-    "port": 50051,
-    "p4info": "/path/to/p4info",    # Absolute path to P4 info file created by P4 compiler
-    "p4binary": "/path/to/p4binary" # Absolute path to P4 binary, which was modified by the P4Runtime shell script (see github)
-}
+        help='Path to the enviroment configuration file, port speeds are taken from its port metadata'
+    )
 
-CLI parameters will overwrite the configuration if set.
-"""
+    capacity_parser.add_argument(
+        '-ir', '--intermediate-representation',
+        type=argparse.FileType('rb'),
+        help='Path to the intermediate representation file (json or binary IR)'
     )
-    subparsers = parser.add_subparsers(dest='command')
 
-    # Define sub-parsers for all subssytems
-    topogen_parser = subparsers.add_parser(
-        'topogen', help='Generate Toplogoies', formatter_class=RawTextHelpFormatter)
-    envgen_parser = subparsers.add_parser(
-        'envgen', help='Generate Host-configuration for Toplogy', formatter_class=RawTextHelpFormatter)
-    deploy_parser = subparsers.add_parser(
-        'deploy', help='Deploy Toplogoy to Target', formatter_class=RawTextHelpFormatter)
+    add_placement_argument(capacity_parser)
 
-    # Define Arguments for the topology_generator subsystem
-    topogen_parser.add_argument(
-        '-t', '--type',
-        help="Toplogoy type to be generated",
-        required=True,
-        choices=['minimal', 'medium', 'large', 'n_hops']
+    capacity_parser.add_argument(
+        '--pattern',
+        choices=capacity_analyzer.TRAFFIC_PATTERNS,
+        default='uniform',
+        help="""Traffic pattern - Default is uniform
+    uniform: every host sends --rate Gbit/s spread evenly over all other hosts
+    all_to_one: every host sends --rate Gbit/s to --target
+    matrix: rates in Gbit/s per host pair from --matrix"""
     )
 
-    topogen_parser.add_argument(
-        '--hops',
+    capacity_parser.add_argument(
+        '--matrix',
+        type=argparse.FileType('r'),
+        help='Path to a traffic matrix json {"h1": {"h2": 10}, ...} in Gbit/s, implies --pattern matrix'
+    )
+
+    capacity_parser.add_argument(
+        '--rate',
+        type=float,
+        default=1.0,
+        help="Rate in Gbit/s every host sends in the uniform and all_to_one pattern - Default is 1"
+    )
+
+    capacity_parser.add_argument(
+        '--target',
+        help="Hostname of the target of the all_to_one pattern - Default is the first host"
+    )
+
+    capacity_parser.add_argument(
+        '--default-speed',
+        type=float,
+        default=capacity_analyzer.DEFAULT_PORT_SPEED,
+        help="Speed in Gbit/s of ports without port metadata - Default is {}".format(
+            capacity_analyzer.DEFAULT_PORT_SPEED)
+    )
+
+    capacity_parser.add_argument(
+        '--top',
         type=int,
-        help="Only a valid parameter if type `n_hops` was chosen. Define the number of routers between two hosts"
+        default=10,
+        help="Number of the most utilized links shown - Default is 10"
     )
 
-    topogen_parser.add_argument(
-        '-o', '--out-file',
+    capacity_parser.add_argument(
+        '--json',
         type=argparse.FileType('w'),
-        help="Path to the file in which the topology representation should be stored - Default is `ir.json`"
+        help="(optional) Store the report with the load of all links and ports as json to the given path"
     )
 
-    topogen_parser.add_argument(
-        '-d', '--dot',
+    capacity_parser.add_argument(
+        '--paths',
         type=argparse.FileType('w'),
-        help="Create dot represenetation and store the dot file to the path given."
+        help="(optional) Store the path of every flow as json to the given path (not for the uniform pattern)"
     )
 
-    # Define Arguments for the env generation
-    envgen_parser.add_argument(
+    # Define Arguments for the multi tenant subsystem
+    tenants_subparsers = tenants_parser.add_subparsers(dest='tenants_command')
+    tenants_pack_parser = tenants_subparsers.add_parser(
+        'pack', help='Assign wire loops, host links and vRouter numbers to the tenants', formatter_class=RawTextHelpFormatter)
+    tenants_deploy_parser = tenants_subparsers.add_parser(
+        'deploy', help='Deploy a single tenant', formatter_class=RawTextHelpFormatter)
+    tenants_teardown_parser = tenants_subparsers.add_parser(
+        'teardown', help='Remove the entries of a single tenant from the target', formatter_class=RawTextHelpFormatter)
+
+    tenants_pack_parser.add_argument(
         '-e', '--env',
         type=argparse.FileType('r'),
-        help='Path to the enviroment configuration file'
+        help='Path to the enviroment configuration file shared by all tenants'
     )
 
-    envgen_parser.add_argument(
-        '-ir', '--intermediate-representation',
-        type=argparse.FileType('r'),
-        help='Path to the intermediate representation json file'
+    tenants_pack_parser.add_argument(
+        '--tenant',
+        action='append',
+        required=True,
+        metavar='NAME=IR',
+        help='Name and path of the IR (json or binary) of a tenant, can be given multiple times'
     )
 
-    envgen_parser.add_argument(
-        '-t', '--target',
-        type=str,
-        choices=['bmv2', 'tofino'],
-        help='Target type to deploy to'
+    tenants_pack_parser.add_argument(
+        '-m', '--manifest',
+        type=argparse.FileType('w'),
+        required=True,
+        help='Path where the tenant manifest should be stored'
     )
 
-    envgen_parser.add_argument(
-        '-o', '--out-file',
-        type=argparse.FileType('w'),
-        help='Path to the file the host-configuration should be stored'
+    tenants_pack_parser.add_argument(
+        '--host-dir',
+        help="(optional) Store the host configuration of every tenant as <NAME>.host.json to this directory"
     )
 
-    # Define Arguments for deployment subsystem
-    deploy_parser.add_argument(
-        '-ir', '--intermediate-representation',
-        type=argparse.FileType('r'),
-        help='Path to the intermediate representation json file'
+    tenants_pack_parser.add_argument(
+        '--vRouter-offset',
+        type=int,
+        default=0,
+        help="vRouter offset of the first tenant - Default is 0"
     )
 
-    deploy_parser.add_argument(
+    add_placement_argument(tenants_pack_parser)
+
+    for tenant_parser in (tenants_deploy_parser, tenants_teardown_parser):
+        tenant_parser.add_argument(
+            '-m', '--manifest',
+            type=argparse.FileType('r'),
+            required=True,
+            help='Path to the tenant manifest'
+        )
+
+        tenant_parser.add_argument(
+            '--tenant',
+            required=True,
+            help='Name of the tenant'
+        )
+
+        add_target_arguments(tenant_parser)
+
+    # Define Arguments for the removal of all table entries
+    add_target_arguments(teardown_parser)
+
+    # Define Arguments for the verification of a deployment
+    verify_parser.add_argument(
         '-e', '--env',
         type=argparse.FileType('r'),
         help='Path to the enviroment configuration file'
     )
 
-    deploy_parser.add_argument(
-        '-t', '--target',
-        type=str,
-        choices=['bmv2', 'tofino'],
-        help='Target type to deploy to'
+    verify_parser.add_argument(
+        '-ir', '--intermediate-representation',
+        type=argparse.FileType('rb'),
+        help='Path to the intermediate representation file (json or binary IR)'
     )
 
-    deploy_parser.add_argument(
-        '--port_config',
-        type=argparse.FileType('r'),
-        help='Path to the tofino port configuration file - Will be sent to the bf_shell'
+    verify_parser.add_argument(
+        '--scoped',
+        action='store_true',
+        help="""Only compare the entries of the ports of the environment and of the
+    vRouter numbers of the topology, e.g. for tenants or staged topologies"""
     )
-    deploy_parser.add_argument(
-        '--hostname',
-        help='fqdn/ip of the P4 Runtime target'
+
+    verify_parser.add_argument(
+        '--show',
+        type=int,
+        default=10,
+        help="Number of differences which are printed per kind and table - Default is 10"
     )
 
-    deploy_parser.add_argument(
-        '--port',
-        help='gRPC Port of the P4 Runtime target'
+    verify_parser.add_argument(
+        '--json',
+        type=argparse.FileType('w'),
+        help="(optional) Store all differences as json to the given path"
     )
 
-    deploy_parser.add_argument(
-        '--p4info',
-        help='Path to the p4info file generated for by the target compiler'
+    add_placement_argument(verify_parser)
+    add_vRouter_offset_argument(verify_parser)
+    add_target_arguments(verify_parser)
+
+    # Define Arguments for the single process pipeline (topogen, envgen and deploy)
+    add_topology_arguments(up_parser)
+    add_placement_argument(up_parser)
+
+    up_parser.add_argument(
+        '-e', '--env',
+        type=argparse.FileType('r'),
+        help='Path to the enviroment configuration file'
     )
 
-    deploy_parser.add_argument(
-        '--p4binary',
-        help='Path to the p4binary file generated for by the target compiler and modified by the p4-runtime-shell script'
+    add_target_arguments(up_parser, target_flags=('--target',))
+
+    up_parser.add_argument(
+        '--ir-out',
+        type=argparse.FileType('w'),
+        help="(optional) Store the intermediate representation to the given path"
+    )
+
+    up_parser.add_argument(
+        '--host-out',
+        type=argparse.FileType('w'),
+        help="(optional) Store the host configuration to the given path"
     )
 
+    up_parser.add_argument(
+        '-d', '--dot',
+        type=argparse.FileType('w'),
+        help="(optional) Store the dot representation to the given path"
+    )
+
+    add_dot_arguments(up_parser)
+
     args = parser.parse_args()
 
     if args.debug:
@@ -180,37 +1259,57 @@ CLI parameters will overwrite the configuration if set.
     if args.command == 'topogen':
         logging.info("Generate topology of type {}".format(args.type))
 
-        if args.type == 'minimal':
-            topo = topology_generator.create_3_node_topo()
-
-        elif args.type == 'medium':
-            topo = topology_generator.create_4_node_topo()
+        plan = get_address_plan(args)
 
-        elif args.type == 'large':
-            topo = topology_generator.create_multi_layer_topo()
-
-        elif args.type == 'n_hops':
-            if not args.hops or args.hops < 1:
-                logging.error(
-                    "For type `n_hops` a number of hops has to be specified using --hops <int>")
-                sys.exit()(-1)
+        if args.sweep:
+            if not args.sweep_dir:
+                logging.error("--sweep requires an output directory (--sweep-dir)")
+                sys.exit(-1)
+            if args.dot:
+                logging.error("--dot can not be combined with --sweep")
+                sys.exit(-1)
 
-            topo = topology_generator.create_n_hop_topo(int(args.hops))
+            variants = topology_sweep.expand_variants(
+                args.type,
+                [(name, topology_sweep.parse_sweep_values(values))
+                 for name, values in args.sweep],
+                get_topology_params(args)
+            )
+            try:
+                results = topology_sweep.run_sweep(
+                    args.type,
+                    variants,
+                    args.sweep_dir,
+                    plan=plan,
+                    aggregate=args.aggregate,
+                    verify_aggregation=args.verify_aggregation,
+                    compact=args.compact,
+                    ir_format=args.format,
+                    processes=args.processes
+                )
+            except ValueError as e:
+                # Invalid parameters of a variant, e.g. --compact with --aggregate
+                logging.error(e)
+                sys.exit(-1)
+            logging.info("Successfully created {} topologies in {}".format(
+                len(results), args.sweep_dir))
+            return
 
-        topo.update_all_routing_tables()
-        ir = topo.get_IR_representation()
+        topo = generate_topology(args, plan)
 
         if args.dot:
-            # Create and store DOT representation if CLI param was set
-            dot_visit = topology.DotRepresentationVisitor(True)
-            topo.apply_visitor(dot_visit)
-            dot_visit.store_representation_to_file(args.dot)
+            # Stream the DOT representation if CLI param was set
+            with open(args.dot, mode='w') as dot:
+                topology.write_dot_representation(
+                    topo, dot, **get_dot_options(args))
 
+        # The binary IR needs a file opened in binary mode
+        mode = 'wb' if args.format == 'binary' else 'w'
         if args.out_file:
-            file = args.out_file
-            logging.debug("Using outfile defined via CLI: {}".format(file))
+            file = open(args.out_file, mode=mode)
+            logging.debug("Using outfile defined via CLI: {}".format(args.out_file))
         elif conf['ir']:
-            file = open(conf['ir'], mode="w+")
+            file = open(conf['ir'], mode=mode)
             logging.debug(
                 "Using outfile defined in configuration file {}: {}".format(
                     conf['ir'], file
@@ -219,40 +1318,20 @@ CLI parameters will overwrite the configuration if set.
         else:
             logging.error(
                 "Outfile is neither specified via CLI nor in configuration json")
-            sys.exit()(-1)
+            sys.exit(-1)
 
-        json.dump(ir, file, indent=4)
+        with file:
+            if args.format == 'binary':
+                binary_ir.write_binary_ir(topo, file)
+            else:
+                json.dump(topo.get_IR_representation(), file, indent=4)
 
         logging.info("Successfully created topology")
 
     elif args.command == 'envgen':
         logging.info("Generate Host Enviroment")
 
-        if args.env:
-            env = args.env
-            logging.debug(
-                "Using CLI parameter for {} - {}".format("env", args.env))
-        elif conf['env']:
-            env = open(conf['env'], mode='r')
-            logging.debug(
-                "Using config json for {} - {}".format("env", conf['env']))
-        else:
-            logging.error(
-                "env.json is neither specified via CLI nor in configuration json")
-            sys.exit()(-1)
-
-        if args.intermediate_representation:
-            ir = args.intermediate_representation
-            logging.debug(
-                "Using CLI parameter for {} - {}".format("ir", args.intermediate_representation))
-        elif conf['ir']:
-            ir = open(conf['ir'], mode='r')
-            logging.debug(
-                "Using config json for {} - {}".format("ir", conf['ir']))
-        else:
-            logging.error(
-                "ir.json is neither specified via CLI nor in configuration json")
-            sys.exit()(-1)
+        env, ir = open_env_and_ir(args, conf)
 
         if args.out_file:
             file = args.out_file
@@ -280,136 +1359,345 @@ CLI parameters will overwrite the configuration if set.
                 "Target is neither specified via CLI nor in configuration json")
             sys.exit()(-1)
 
+        placement = get_placement(args, conf)
+        vRouter_offset = get_vRouter_offset(args, conf)
+
+        artifact_key = None
+        if args.artifact_out:
+            p4info = args.p4info or conf.get('p4info')
+            if not p4info:
+                logging.error(
+                    "A deployment artifact needs the p4info - neither specified via CLI nor in configuration json")
+                sys.exit(-1)
+            artifact_key, env_data, ir_data = get_artifact_key(
+                env, ir, p4info, placement, vRouter_offset)
+            env = io.StringIO(env_data)
+            ir = io.BytesIO(ir_data)
+
         if target == 'bmv2':
-            topo_controller = TopologyController(env, ir_fd=ir)
+            topo_controller = create_topology_controller(
+                env, ir, placement, vRouter_offset, ipv4=args.artifact_out is not None)
             topo_controller.store_host_config_json(file)
             logging.info("Successfully created host configuration")
         elif target == 'tofino':
-            topo_controller = TopologyController(env, ir_fd=ir)
+            topo_controller = create_topology_controller(
+                env, ir, placement, vRouter_offset, ipv4=args.artifact_out is not None)
             topo_controller.store_host_config_json(file)
         else:
             logging.error("`{}` Is not a supported Target".format(target))
+            sys.exit(-1)
+
+        if artifact_key is not None:
+            write_artifact(topo_controller, artifact_key,
+                           p4info, args.artifact_out)
 
     elif args.command == 'deploy':
         logging.info("Deploy stage")
 
-        if args.env:
-            env = args.env
-            logging.info(
-                "Using CLI parameter for {} - {}".format("env", args.env))
-        elif conf['env']:
-            env = open(conf['env'], mode='r')
-            logging.info(
-                "Using config json for {} - {}".format("env", conf['env']))
-        else:
-            logging.error(
-                "env.json is neither specified via CLI nor in configuration json")
-            sys.exit()(-1)
+        env, ir = open_env_and_ir(args, conf)
 
-        if args.intermediate_representation:
-            ir = args.intermediate_representation
-            logging.info(
-                "Using CLI parameter for {} - {}".format("ir", args.intermediate_representation))
-        elif conf['ir']:
-            ir = open(conf['ir'], mode='r')
-            logging.info(
-                "Using config json for {} - {}".format("ir", conf['ir']))
-        else:
-            logging.error(
-                "ir.json is neither specified via CLI nor in configuration json")
-            sys.exit()(-1)
+        options = get_target_options(args, conf)
+        placement = get_placement(args, conf)
+        vRouter_offset = get_vRouter_offset(args, conf)
 
-        if args.target:
-            target = args.target
-            logging.info(
-                "Using CLI parameter for {} - {}".format("target", args.target))
-        elif conf['target']:
-            target = conf['target']
-            logging.info(
-                "Using config json for {} - {}".format("target", conf['target']))
+        if args.artifact:
+            if args.incremental:
+                logging.error("--artifact can not be combined with --incremental")
+                sys.exit(-1)
+            if not options['p4info']:
+                logging.error(
+                    "A deployment artifact needs the p4info - neither specified via CLI nor in configuration json")
+                sys.exit(-1)
+
+            artifact_key, env_data, ir_data = get_artifact_key(
+                env, ir, options['p4info'], placement, vRouter_offset)
+            env = io.StringIO(env_data)
+            ir = io.BytesIO(ir_data)
+
+            if read_artifact_key(args.artifact) == artifact_key:
+                from virntup import deploy_artifact
+
+                logging.info("Replaying deployment artifact {}".format(args.artifact))
+                connector = create_target_connector(options)
+                with open(args.artifact, 'rb') as artifact_fd:
+                    deploy_artifact.replay_artifact(
+                        artifact_fd, connector, key=artifact_key)
+
+                topo_controller = None
+                if options['generate_port_config']:
+                    topo_controller = create_topology_controller(
+                        env, ir, placement, vRouter_offset, ipv4=True)
+                send_port_config(connector, options, topo_controller)
+                return
+
+            logging.info("Deployment artifact {} is missing or stale - compiling it".format(
+                args.artifact))
+
+        topo_controller = create_topology_controller(
+            env, ir, placement, vRouter_offset, ipv4=True)
+
+        if args.artifact:
+            write_artifact(topo_controller, artifact_key,
+                           options['p4info'], args.artifact)
+
+        connector = create_target_connector(options)
+
+        if args.stage or args.activate:
+            try:
+                if args.stage:
+                    topo_controller.stage(connector)
+                else:
+                    topo_controller.activate(connector)
+            except (RuntimeError, ValueError) as e:
+                logging.error(e)
+                sys.exit(-1)
+        elif args.incremental:
+            topo_controller.deploy_incremental(connector)
         else:
-            logging.error(
-                "Target is neither specified via CLI nor in configuration json")
-            sys.exit()(-1)
+            topo_controller.deploy(connector)
+        send_port_config(connector, options, topo_controller)
+
+    elif args.command == 'simulate':
+        logging.info("Simulate data plane")
+
+        env, ir = open_env_and_ir(args, conf)
+
+        # numpy is only needed by the simulator
+        from virntup import simulator
 
-        if target == 'tofino':
-            if args.port_config:
-                port_config = args.port_config
-                logging.info(
-                    "Using CLI parameter for {} - {}".format("port_config", args.port_config))
-            elif conf['port_config']:
-                port_config = conf['port_config']
-                logging.info(
-                    "Using config json for {} - {}".format("port_config", conf['port_config']))
+        topo_controller = create_topology_controller(
+            env, ir, get_placement(args, conf), ipv4=True)
+        result = simulator.DataPlaneSimulator(topo_controller).run()
+
+        logging.info("Simulation result: {}".format(result))
+
+        failed = 0
+        for src, dst, status, hops in result.failed_pairs():
+            if failed < args.show:
+                logging.error("{} -> {}: {} after {} hops".format(
+                    src, dst, status, hops))
+            failed += 1
+
+        if failed:
+            logging.error("{} host pairs can not reach each other".format(failed))
+            sys.exit(-1)
+
+    elif args.command == 'up':
+        logging.info("Generate and deploy topology of type {}".format(args.type))
+
+        env = open_env(args, conf)
+
+        options = get_target_options(args, conf)
+
+        topo = generate_topology(args, get_address_plan(args))
+
+        try:
+            topo_controller, connector = pipeline.run_up(
+                topo,
+                env,
+                lambda: create_target_connector(options),
+                ir_fd=args.ir_out,
+                host_fd=args.host_out,
+                dot_fd=args.dot,
+                incremental=args.incremental,
+                dot_options=get_dot_options(args),
+                placement=get_placement(args, conf)
+            )
+        except (InsufficientEnvironmentError, RuntimeError) as e:
+            logging.error(e)
+            sys.exit(-1)
+
+        send_port_config(connector, options, topo_controller)
+
+        logging.info("Successfully deployed topology")
+
+    elif args.command == 'placement':
+        logging.info("Compare placement strategies")
+
+        env, ir = open_env_and_ir(args, conf)
+        with env, ir:
+            env_data = env.read()
+            ir_data = ir.read()
+
+        reports = {}
+        for placement in pipe_placement.PLACEMENT_STRATEGIES:
+            topo_controller = create_topology_controller(
+                io.StringIO(env_data), io.BytesIO(ir_data), placement)
+            reports[placement] = pipe_placement.analyze_placement(
+                topo_controller, args.hop_latency, args.cross_pipe_latency)
+
+        print(pipe_placement.format_report(reports))
+
+        if args.json:
+            with args.json:
+                json.dump(reports, args.json, indent=4)
+
+    elif args.command == 'capacity':
+        logging.info("Analyze the capacity of the topology")
+
+        pattern = 'matrix' if args.matrix else args.pattern
+        if pattern == 'matrix' and not args.matrix:
+            logging.error("The matrix pattern needs a traffic matrix (--matrix)")
+            sys.exit(-1)
+
+        env, ir = open_env_and_ir(args, conf)
+        with env, ir:
+            topo_controller = create_topology_controller(
+                env, ir, get_placement(args, conf))
+
+        try:
+            if pattern == 'uniform':
+                matrix = None
+                loads = capacity_analyzer.get_uniform_loads(
+                    topo_controller, args.rate)
             else:
-                    logging.warning(
-                        "Port configuration is neither specified via CLI nor in configuration json - tofino ports won't be up!")
+                if pattern == 'matrix':
+                    with args.matrix:
+                        matrix = capacity_analyzer.load_traffic_matrix(
+                            args.matrix)
+                else:
+                    matrix = capacity_analyzer.all_to_one_matrix(
+                        topo_controller, args.rate, args.target)
+                loads = capacity_analyzer.get_matrix_loads(
+                    topo_controller, matrix)
+        except ValueError as e:
+            logging.error(e)
+            sys.exit(-1)
 
-        if args.hostname:
-            hostname = args.hostname
-            logging.info(
-                "Using CLI parameter for {} - {}".format("hostname", args.hostname))
-        elif conf['hostname']:
-            hostname = conf['hostname']
-            logging.info(
-                "Using config json for {} - {}".format("hostname", conf['hostname']))
-        else:
-            logging.error(
-                "hostname is neither specified via CLI nor in configuration json")
-            sys.exit()(-1)
+        report = capacity_analyzer.analyze_capacity(
+            topo_controller, loads, args.default_speed)
+        print(capacity_analyzer.format_report(report, args.top))
 
-        if args.port:
-            port = args.port
-            logging.info(
-                "Using CLI parameter for {} - {}".format("port", args.port))
-        elif conf['port']:
-            port = conf['port']
-            logging.info(
-                "Using config json for {} - {}".format("port", conf['port']))
-        else:
-            logging.error(
-                "port is neither specified via CLI nor in configuration json")
-            sys.exit()(-1)
+        if args.json:
+            with args.json:
+                json.dump(report, args.json, indent=4)
 
-        p4info = None
-        p4binary = None
+        if args.paths:
+            if matrix is None:
+                logging.warning(
+                    "Paths are not stored for the uniform pattern")
+            else:
+                with args.paths:
+                    json.dump([{"src": src, "dst": dst, "path": path} for src, dst, path in
+                               capacity_analyzer.get_paths(topo_controller, matrix)], args.paths)
 
-        if args.p4info:
-            p4info = args.p4info
-            logging.info(
-                "Using CLI parameter for {} - {}".format("p4info", args.p4info))
-        elif conf['p4info']:
-            p4info = conf['p4info']
-            logging.info(
-                "Using config json for {} - {}".format("p4info", conf['p4info']))
-        else:
-            logging.info(
-                "p4info is neither specified via CLI nor in configuration json - assuming no configuration should be deployed")
 
-        if args.p4binary:
-            p4binary = args.p4binary
-            logging.info(
-                "Using CLI parameter for {} - {}".format("p4binary", args.p4binary))
-        elif conf['p4binary']:
-            p4binary = conf['p4binary']
-            logging.info(
-                "Using config json for {} - {}".format("p4binary", conf['p4binary']))
+    elif args.command == 'tenants':
+        if args.tenants_command == 'pack':
+            logging.info("Pack tenants")
+
+            env = open_env(args, conf)
+            with env:
+                env_data = json.load(env)
+
+            ir_paths = {}
+            for tenant in args.tenant:
+                name, _, path = tenant.partition('=')
+                if not name or not path:
+                    logging.error("--tenant expects NAME=IR, got `{}`".format(tenant))
+                    sys.exit(-1)
+                ir_paths[name] = path
+
+            irs = {}
+            for name, path in ir_paths.items():
+                with open(path, mode='rb') as ir:
+                    if binary_ir.is_binary_ir(ir):
+                        irs[name] = binary_ir.load_binary_ir(ir)
+                    else:
+                        irs[name] = json.load(ir)
+
+            manifest = tenants.pack_tenants(
+                irs, env_data, args.vRouter_offset, get_placement(args, conf))
+            for name, tenant in manifest["tenants"].items():
+                tenant["ir"] = ir_paths[name]
+
+                if args.host_dir:
+                    topo_controller = tenants.create_tenant_controller(
+                        manifest, name, io.StringIO(json.dumps(irs[name])))
+                    with open(os.path.join(args.host_dir, "{}.host.json".format(name)), mode='w') as host_config:
+                        topo_controller.store_host_config_json(host_config)
+
+            with args.manifest:
+                json.dump(manifest, args.manifest, indent=4)
+
+            logging.info("Placed {} of {} tenants".format(
+                len(manifest["tenants"]), len(irs)))
+
+        elif args.tenants_command in ('deploy', 'teardown'):
+            with args.manifest:
+                manifest = json.load(args.manifest)
+
+            if args.tenant not in manifest["tenants"]:
+                logging.error("`{}` is not a placed tenant of the manifest".format(args.tenant))
+                sys.exit(-1)
+
+            options = get_target_options(args, conf)
+
+            with open(manifest["tenants"][args.tenant]["ir"], mode='rb') as ir:
+                try:
+                    topo_controller = tenants.create_tenant_controller(
+                        manifest, args.tenant, ir)
+                except InsufficientEnvironmentError as e:
+                    logging.error(e)
+                    sys.exit(-1)
+            check_ipv4(topo_controller)
+
+            connector = create_target_connector(options)
+
+            if args.tenants_command == 'teardown':
+                logging.info("Remove tenant {}".format(args.tenant))
+                topo_controller.remove(connector)
+            else:
+                logging.info("Deploy tenant {}".format(args.tenant))
+                if args.incremental:
+                    topo_controller.deploy_incremental(connector, scoped=True)
+                else:
+                    topo_controller.deploy(connector)
+                send_port_config(connector, options, topo_controller)
+
         else:
-            logging.error(
-                "p4binary is neither specified via CLI nor in configuration json - assuming no configuration should be deployed")
+            tenants_parser.print_help()
 
-        topo_controller = TopologyController(env, ir_fd=ir)
+    elif args.command == 'teardown':
+        logging.info("Remove all table entries")
 
-        connector = target_configurator.TargetConnector(
-            hostname,
-            port,
-            p4info_path=p4info,
-            p4binary_path=p4binary
-        )
+        options = get_target_options(args, conf)
+        connector = create_target_connector(options)
+
+        ports, routes = connector.clear_tables()
+        connector.teardown()
+
+        if connector.write_errors:
+            logging.error("{} table entries could not be removed - see log for details".format(
+                len(connector.write_errors)))
+            sys.exit(-1)
+
+        logging.info("Removed {} port mappings and {} routes".format(ports, routes))
+
+    elif args.command == 'verify':
+        logging.info("Verify deployment")
+
+        from virntup import verification
+
+        env, ir = open_env_and_ir(args, conf)
+        options = get_target_options(args, conf)
+
+        topo_controller = create_topology_controller(
+            env, ir, get_placement(args, conf), get_vRouter_offset(args, conf), ipv4=True)
+
+        connector = create_target_connector(options)
+        report = verification.verify_deployment(
+            topo_controller, connector, scoped=args.scoped)
+        connector.teardown()
+
+        print(verification.format_report(report, args.show))
+
+        if args.json:
+            with args.json:
+                json.dump(verification.report_to_json(report), args.json, indent=4)
 
-        topo_controller.deploy(connector)
-        if target == 'tofino' and port_config:
-            connector.send_bf_shell_commands(9999, open(port_config))
+        if not verification.is_consistent(report):
+            sys.exit(1)
 
 
 if __name__ == '__main__':
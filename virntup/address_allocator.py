@@ -0,0 +1,195 @@
+import ipaddress
+import logging
+
+
+# Default address plan used for topology generation. Each _Node gets a
+# network of size ROUTER_PREFIX / HOST_PREFIX from the ADDRESS_SPACE.
+DEFAULT_ADDRESS_SPACE = ipaddress.IPv4Network("10.42.0.0/16")
+DEFAULT_PREFIX = 24
+
+# All generated MAC addresses start with this octet, the remaining 40 bits
+# identify the network of the Host.
+MAC_PREFIX = 0x08 << 40
+
+
+def derive_mac_address(network):
+    """derive_mac_address.
+
+    Derives the MAC address of a Host from its uplink network. The lower 40
+    bits of the MAC address hold the network number (the network address
+    without the host bits). As all Hosts use networks of the same size, the
+    MAC addresses are unique as long as less than 2^40 Host networks are
+    assigned.
+
+    Parameters
+    ----------
+    network :
+        IPv4Network or IPv6Network - uplink network of the Host
+
+    Returns
+    ----------
+    str : MAC address, e.g. `08:00:00:0a:2a:05`
+    """
+    network_number = int(network.network_address) >> (
+        network.max_prefixlen - network.prefixlen)
+    mac = MAC_PREFIX | (network_number & ((1 << 40) - 1))
+    mac_hex = "{:012x}".format(mac)
+    return ":".join(mac_hex[i:i + 2] for i in range(0, 12, 2))
+
+
+class AddressAllocator:
+    """AddressAllocator.
+
+    Hands out the uplink networks of _Nodes from an address space. Networks
+    are calculated arithmetically when they are requested, hence the size of
+    the address space does not matter - a /8 or an IPv6 /48 can be used just
+    like the default 10.42.0.0/16.
+
+    vRouter uplinks and Host links can use different prefix sizes. Each
+    network is aligned to its size, so networks of both sizes never overlap.
+    """
+
+    def __init__(self, address_space=DEFAULT_ADDRESS_SPACE,
+                 router_prefix=DEFAULT_PREFIX, host_prefix=DEFAULT_PREFIX):
+        """__init__.
+
+        Parameters
+        ----------
+        address_space :
+            IPv4Network, IPv6Network or str - Address space used for the
+            topology (default: 10.42.0.0/16)
+        router_prefix :
+            int - Prefix length of vRouter uplink networks (default: 24)
+        host_prefix :
+            int - Prefix length of Host link networks (default: 24)
+        """
+        self.address_space = ipaddress.ip_network(address_space)
+        self.router_prefix = router_prefix
+        self.host_prefix = host_prefix
+
+        for prefix in (router_prefix, host_prefix):
+            if not self.address_space.prefixlen <= prefix < self.address_space.max_prefixlen:
+                raise ValueError("Prefix /{} does not fit into address space {}".format(
+                    prefix, self.address_space))
+
+        self._network_class = type(self.address_space)
+        self._max_prefixlen = self.address_space.max_prefixlen
+        self._base = int(self.address_space.network_address)
+        self._end = int(self.address_space.broadcast_address) + 1
+        self._next = self._base
+
+        self.allocated = 0
+
+        logging.debug("New AddressAllocator for {} (vRouter /{}, Host /{})".format(
+            self.address_space, router_prefix, host_prefix))
+
+    def prefix_for(self, node_type):
+        """prefix_for.
+
+        Parameters
+        ----------
+        node_type :
+            str - 'vRouter' or 'host'
+
+        Returns
+        ----------
+        int : Prefix length used for _Nodes of this type
+        """
+        if node_type == 'host':
+            return self.host_prefix
+        return self.router_prefix
+
+    def allocate(self, node_type):
+        """allocate.
+
+        Returns the next free network for a _Node of the given type. Raises a
+        ValueError if the address space is exhausted.
+
+        Parameters
+        ----------
+        node_type :
+            str - 'vRouter' or 'host'
+
+        Returns
+        ----------
+        IPv4Network or IPv6Network
+        """
+        prefix = self.prefix_for(node_type)
+        size = 1 << (self._max_prefixlen - prefix)
+
+        # Align the network to its own size
+        start = (self._next + size - 1) & ~(size - 1)
+        if start + size > self._end:
+            raise ValueError(
+                "Address space {} is exhausted after {} networks, use a larger address space or longer prefixes".format(
+                    self.address_space, self.allocated))
+
+        self._next = start + size
+        self.allocated += 1
+        return self._network_class((start, prefix))
+
+    @property
+    def slot_prefix(self):
+        """slot_prefix.
+
+        Prefix length of a slot, the unit used for aggregatable address
+        assignment. A slot is large enough for a network of each _Node type.
+        """
+        return min(self.router_prefix, self.host_prefix)
+
+    def slot_count(self):
+        """slot_count.
+
+        Returns
+        ----------
+        int : Number of slots in the address space
+        """
+        return 1 << (self.slot_prefix - self.address_space.prefixlen)
+
+    def slot_network(self, slot, node_type):
+        """slot_network.
+
+        Returns the network of a _Node placed in the given slot. The network
+        starts at the beginning of the slot.
+
+        Parameters
+        ----------
+        slot :
+            int - Index of the slot in the address space
+        node_type :
+            str - 'vRouter' or 'host'
+
+        Returns
+        ----------
+        IPv4Network or IPv6Network
+        """
+        if not 0 <= slot < self.slot_count():
+            raise RuntimeError("Slot {} is outside of address space {}".format(
+                slot, self.address_space))
+
+        start = self._base + (slot << (self._max_prefixlen - self.slot_prefix))
+        return self._network_class((start, self.prefix_for(node_type)))
+
+    def allocate_after_slots(self, count):
+        """allocate_after_slots.
+
+        Lets the following allocations continue after the first `count`
+        slots of the address space, e.g. once they were handed out with
+        `slot_network()`.
+
+        Parameters
+        ----------
+        count :
+            int - Number of slots in use
+        """
+        if not 0 <= count <= self.slot_count():
+            raise RuntimeError("Address space {} has no {} slots".format(
+                self.address_space, count))
+
+        self._next = self._base + (count << (self._max_prefixlen - self.slot_prefix))
+
+    def __str__(self):
+        """__str__.
+        """
+        return "{} (vRouter /{}, Host /{})".format(
+            self.address_space, self.router_prefix, self.host_prefix)
@@ -0,0 +1,84 @@
+import ipaddress
+import logging
+import unittest
+
+from . import topology
+from . import topology_generator
+from .address_allocator import AddressAllocator, derive_mac_address
+
+logging.basicConfig(level=logging.INFO)
+
+
+###########################################################
+class TestAddressAllocator(unittest.TestCase):
+    """TestAddressAllocator.
+    """
+
+    def test_default_plan(self):
+        """test_default_plan.
+        """
+        allocator = AddressAllocator()
+        self.assertEqual(allocator.allocate('vRouter'),
+                         ipaddress.ip_network("10.42.0.0/24"))
+        self.assertEqual(allocator.allocate('host'),
+                         ipaddress.ip_network("10.42.1.0/24"))
+
+    def test_mixed_prefixes_do_not_overlap(self):
+        """test_mixed_prefixes_do_not_overlap.
+        """
+        allocator = AddressAllocator("10.0.0.0/16", router_prefix=30, host_prefix=24)
+        networks = [allocator.allocate(t) for t in ['vRouter', 'host', 'vRouter', 'vRouter', 'host']]
+
+        for idx, a in enumerate(networks):
+            for b in networks[idx + 1:]:
+                self.assertFalse(a.overlaps(b))
+        self.assertEqual([n.prefixlen for n in networks], [30, 24, 30, 30, 24])
+
+    def test_exhausted_address_space(self):
+        """test_exhausted_address_space.
+        """
+        allocator = AddressAllocator("10.0.0.0/22")
+        for _ in range(4):
+            allocator.allocate('host')
+        with self.assertRaises(ValueError):
+            allocator.allocate('host')
+
+    def test_ipv6_plan(self):
+        """test_ipv6_plan.
+        """
+        allocator = AddressAllocator("fd00:42::/48", router_prefix=64, host_prefix=64)
+        topo = topology_generator.create_3_node_topo(allocator)
+
+        hosts = topo.get_IR_representation()["Host"]
+        self.assertEqual([h["ip"] for h in hosts.values()],
+                         ["fd00:42:0:1::1/64", "fd00:42:0:2::1/64"])
+        self.assertEqual(topo.get_IR_representation()["address_space"], "fd00:42::/48")
+
+
+###########################################################
+class TestLargeTopologies(unittest.TestCase):
+    """TestLargeTopologies.
+    """
+
+    def test_unique_addresses_beyond_256_nodes(self):
+        """test_unique_addresses_beyond_256_nodes.
+        """
+        topo = topology.V_topology(allocator=AddressAllocator("10.0.0.0/8"))
+        root = topo.add_vRouter()
+        for _ in range(1000):
+            topo.add_Host(root)
+
+        hosts = topo.get_IR_representation()["Host"]
+        self.assertEqual(len({h["mac"] for h in hosts.values()}), 1000)
+        self.assertEqual(len({h["ip"] for h in hosts.values()}), 1000)
+
+    def test_mac_address_format(self):
+        """test_mac_address_format.
+        """
+        self.assertEqual(derive_mac_address(ipaddress.ip_network("10.42.5.0/24")),
+                         "08:00:00:0a:2a:05")
+
+
+################################################
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,252 @@
+import logging
+import re
+import socket
+from collections import deque, namedtuple
+
+
+# Telnet commands (RFC 854)
+IAC = 255
+DONT = 254
+DO = 253
+WONT = 252
+WILL = 251
+SB = 250
+SE = 240
+
+# Prompt of the bf_shell and its sub shells, e.g. `bfshell> `, `bf-sde> `
+# or `bf-sde.pm> `
+DEFAULT_PROMPT = re.compile(rb"(?m)^[\w.:-]+> ?")
+
+# Responses matching this pattern are reported as failed commands
+DEFAULT_ERROR_PATTERN = re.compile(
+    r"(?i)\b(error|invalid|unknown command|failed)\b")
+
+# Commands after which the shell may close the connection
+EXIT_COMMANDS = ("exit", "quit")
+
+# Result of a single bf_shell command
+BfShellResult = namedtuple("BfShellResult", ["command", "output", "error"])
+
+
+def read_commands(fd):
+    """read_commands.
+
+    Returns the commands of a bf_shell port configuration file, without
+    empty lines and comments (`#`).
+
+    Parameters
+    ----------
+    fd :
+        file descriptor of the port configuration
+    """
+    commands = []
+    for line in fd:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            commands.append(line)
+    return commands
+
+
+class BfShellClient:
+    """BfShellClient.
+
+    Minimal telnet client for the bf_shell of a Tofino switch. Instead of
+    sending the commands with fixed pauses, the client waits for the prompt
+    after each command, so it never loses commands to a slow shell and
+    finishes as soon as the shell is done. The responses are checked for
+    errors.
+
+    All telnet options offered by the shell are refused, so the session
+    stays in plain line mode.
+    """
+
+    def __init__(self, host, port, timeout=30, prompt=DEFAULT_PROMPT,
+                 error_pattern=DEFAULT_ERROR_PATTERN):
+        """__init__.
+
+        Parameters
+        ----------
+        host :
+            str - hostname or ip address of the switch
+        port :
+            int - telnet port of the bf_shell
+        timeout :
+            float (default: 30) - seconds to wait for the response of a
+            command
+        prompt :
+            compiled bytes regex - prompt of the shell
+        error_pattern :
+            compiled str regex - responses matching it are errors
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.prompt = prompt
+        self.error_pattern = error_pattern
+
+        self._socket = None
+        self._buffer = b""
+        # Incomplete telnet command at the end of the last received data
+        self._telnet_rest = b""
+
+    def connect(self):
+        """connect.
+
+        Connects to the shell and waits for its first prompt.
+        """
+        logging.info("Connecting to bf_shell at {}:{}".format(self.host, self.port))
+        self._socket = socket.create_connection(
+            (self.host, self.port), timeout=self.timeout)
+        self._read_until_prompt()
+
+    def close(self):
+        """close.
+        """
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def run_commands(self, commands, window=1):
+        """run_commands.
+
+        Sends the commands and collects their responses.
+
+        Parameters
+        ----------
+        commands :
+            iterable of str - bf_shell commands
+        window :
+            int (default: 1) - Number of commands sent before their response
+            is awaited. With 1 every command waits for the prompt of the
+            previous one, larger windows pipeline the commands, which
+            hides the round trip time of remote shells.
+
+        Returns
+        ----------
+        list of BfShellResult : Results of all commands, failed commands are
+        logged
+        """
+        commands = list(commands)
+        results = []
+        pending = deque()
+        for command in commands:
+            self._send(command)
+            pending.append(command)
+            if len(pending) >= max(window, 1):
+                results.append(self._receive(
+                    pending.popleft(), len(results) == len(commands) - 1))
+        while pending:
+            results.append(self._receive(
+                pending.popleft(), len(results) == len(commands) - 1))
+
+        for result in results:
+            if result.error:
+                logging.error("bf_shell command `{}` failed:\n{}".format(
+                    result.command, result.output))
+        return results
+
+    def _send(self, command):
+        """_send.
+        """
+        logging.debug("bf_shell < {}".format(command))
+        self._socket.sendall(command.encode() + b"\r\n")
+
+    def _receive(self, command, last):
+        """_receive.
+
+        Returns the result of the oldest command without response.
+        """
+        try:
+            output = self._read_until_prompt()
+        except ConnectionError:
+            if last and command.split()[0] in EXIT_COMMANDS:
+                return BfShellResult(command, "", False)
+            raise
+
+        output = output.decode(errors="replace").replace("\r", "")
+        # Drop the echo of the command, if the shell echoes
+        if output.lstrip().startswith(command):
+            output = output.lstrip()[len(command):]
+        output = output.strip("\n")
+        logging.debug("bf_shell > {}".format(output))
+
+        return BfShellResult(command, output,
+                             self.error_pattern.search(output) is not None)
+
+    def _read_until_prompt(self):
+        """_read_until_prompt.
+
+        Returns everything received before the next prompt.
+        """
+        while True:
+            match = self.prompt.search(self._buffer)
+            if match is not None:
+                output = self._buffer[:match.start()]
+                self._buffer = self._buffer[match.end():]
+                return output
+
+            try:
+                data = self._socket.recv(4096)
+            except socket.timeout:
+                raise RuntimeError("bf_shell at {}:{} did not answer within {} s".format(
+                    self.host, self.port, self.timeout))
+            if not data:
+                raise ConnectionError("bf_shell at {}:{} closed the connection".format(
+                    self.host, self.port))
+            self._buffer += self._handle_telnet(data)
+
+    def _handle_telnet(self, data):
+        """_handle_telnet.
+
+        Removes telnet commands from the received data and refuses all
+        options the shell offers or requests.
+        """
+        data = self._telnet_rest + data
+        self._telnet_rest = b""
+
+        text = bytearray()
+        replies = bytearray()
+        index = 0
+        while index < len(data):
+            byte = data[index]
+            if byte != IAC:
+                text.append(byte)
+                index += 1
+                continue
+
+            if index + 1 >= len(data):
+                self._telnet_rest = data[index:]
+                break
+            command = data[index + 1]
+            if command == IAC:
+                text.append(IAC)
+                index += 2
+            elif command in (DO, DONT, WILL, WONT):
+                if index + 2 >= len(data):
+                    self._telnet_rest = data[index:]
+                    break
+                option = data[index + 2]
+                if command == DO:
+                    replies += bytes((IAC, WONT, option))
+                elif command == WILL:
+                    replies += bytes((IAC, DONT, option))
+                index += 3
+            elif command == SB:
+                end = data.find(bytes((IAC, SE)), index + 2)
+                if end < 0:
+                    self._telnet_rest = data[index:]
+                    break
+                index = end + 2
+            else:
+                index += 2
+
+        if replies:
+            self._socket.sendall(bytes(replies))
+        return bytes(text)
@@ -0,0 +1,144 @@
+import io
+import logging
+import socketserver
+import threading
+import time
+import unittest
+
+from . import bf_shell
+from .bf_shell import BfShellClient, IAC, WILL, DONT
+
+logging.basicConfig(level=logging.INFO)
+
+
+class _FakeBfShellHandler(socketserver.BaseRequestHandler):
+    """_FakeBfShellHandler.
+
+    Emulates a bf_shell telnet session: negotiates echo, answers every
+    command after the configured delay and switches the prompt when entering
+    the `ucli` and `pm` sub shells.
+    """
+
+    def handle(self):
+        shell = self.server.shell
+        prompt = b"bfshell> "
+        self.request.sendall(bytes((IAC, WILL, 1)) + b"Welcome to the bf_shell\r\n" + prompt)
+
+        buffer = b""
+        while True:
+            data = self.request.recv(4096)
+            if not data:
+                return
+            # Telnet replies of the client are recorded, not executed
+            while IAC in data:
+                index = data.index(IAC)
+                shell.telnet_replies.append(data[index:index + 3])
+                data = data[:index] + data[index + 3:]
+            buffer += data
+
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                command = line.decode().strip()
+                shell.commands.append(command)
+                time.sleep(shell.delays.get(command, 0))
+
+                if command == "exit":
+                    return
+                if command == "ucli":
+                    prompt = b"bf-sfc> "
+                    output = b""
+                elif command == "pm":
+                    prompt = b"bf-sfc.pm> "
+                    output = b""
+                elif command.startswith("bad"):
+                    output = b"ERROR: invalid command\r\n"
+                else:
+                    output = "{} done\r\n".format(command).encode()
+                self.request.sendall(command.encode() + b"\r\n" + output + prompt)
+
+
+class FakeBfShell:
+    """FakeBfShell.
+
+    Local telnet server which behaves like a bf_shell.
+    """
+
+    def __init__(self):
+        self.commands = []
+        self.telnet_replies = []
+        self.delays = {}
+        self.server = socketserver.ThreadingTCPServer(("localhost", 0), _FakeBfShellHandler)
+        self.server.daemon_threads = True
+        self.server.shell = self
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+PORT_CONFIG = """# Port setup
+ucli
+pm
+
+port-add 1/0 100G RS
+port-enb 1/0
+show
+"""
+
+
+###########################################################
+class TestBfShellClient(unittest.TestCase):
+    """TestBfShellClient.
+    """
+
+    def setUp(self):
+        self.shell = FakeBfShell()
+
+    def tearDown(self):
+        self.shell.stop()
+
+    def run_config(self, config, window=1, timeout=5):
+        with BfShellClient("localhost", self.shell.port, timeout=timeout) as client:
+            return client.run_commands(bf_shell.read_commands(io.StringIO(config)), window)
+
+    def test_commands_wait_for_prompt(self):
+        """test_commands_wait_for_prompt.
+        """
+        # A slow command must neither be lost nor delay the session by more
+        # than its own duration
+        self.shell.delays["port-add 1/0 100G RS"] = 0.2
+        results = self.run_config(PORT_CONFIG)
+
+        self.assertEqual(self.shell.commands,
+                         ["ucli", "pm", "port-add 1/0 100G RS", "port-enb 1/0", "show"])
+        self.assertEqual([result.output for result in results],
+                         ["", "", "port-add 1/0 100G RS done", "port-enb 1/0 done", "show done"])
+        self.assertFalse(any(result.error for result in results))
+        # The echo option offered by the shell was refused
+        self.assertEqual(self.shell.telnet_replies, [bytes((IAC, DONT, 1))])
+
+    def test_pipelined_commands_keep_their_responses(self):
+        """test_pipelined_commands_keep_their_responses.
+        """
+        config = PORT_CONFIG + "bad command\nshow\nexit\n"
+        sequential = self.run_config(config)
+        self.shell.commands = []
+        pipelined = self.run_config(config, window=4)
+
+        self.assertEqual(pipelined, sequential)
+        self.assertEqual([result.command for result in pipelined if result.error],
+                         ["bad command"])
+
+    def test_silent_shell_times_out(self):
+        """test_silent_shell_times_out.
+        """
+        self.shell.delays["show"] = 1
+        with self.assertRaises(RuntimeError):
+            self.run_config("show\n", timeout=0.2)
+
+
+################################################
+if __name__ == '__main__':
+    unittest.main()
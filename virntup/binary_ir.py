@@ -0,0 +1,337 @@
+import ipaddress
+import socket
+import struct
+
+from . import topology
+
+
+# Every binary IR file starts with MAGIC and the format VERSION
+MAGIC = b"VNIR"
+VERSION = 1
+
+# Record types. Host records are written before the vRouter they are
+# connected to, vRouters in the (pre-order) order of the JSON IR.
+HOST_RECORD = b"H"
+ROUTER_RECORD = b"R"
+END_RECORD = b"E"
+
+# Neighbour types
+NEIGHBOUR_TYPES = ['vRouter', 'host']
+NEIGHBOUR_TYPE_CODES = {name: code for code, name in enumerate(NEIGHBOUR_TYPES)}
+
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_NEIGHBOUR = struct.Struct("<HIB")
+
+
+def is_binary_ir(fd):
+    """is_binary_ir.
+
+    Checks if a file descriptor contains a binary IR without consuming any
+    data. Text file descriptors never contain a binary IR.
+
+    Parameters
+    ----------
+    fd :
+        file descriptor of an IR file
+    """
+    if not hasattr(fd, "peek") and not hasattr(fd, "getbuffer"):
+        return False
+
+    if hasattr(fd, "peek"):
+        return fd.peek(len(MAGIC))[:len(MAGIC)] == MAGIC
+
+    position = fd.tell()
+    magic = fd.read(len(MAGIC))
+    fd.seek(position)
+    return magic == MAGIC
+
+
+class BinaryIRWriterVisitor(topology.AbstractPreOderVTopologyVisitor):
+    """BinaryIRWriterVisitor.
+
+    Writes the records of all _Nodes to a binary file while the topology is
+    walked, without building the IR dict. Network addresses are stored as
+    integers and routing tables as packed arrays.
+    """
+
+    def __init__(self, fd, address_space):
+        """__init__.
+
+        Parameters
+        ----------
+        fd :
+            binary file descriptor the IR is written to
+        address_space :
+            IPv4Network or IPv6Network - address space of the topology
+        """
+        self.fd = fd
+        self.address_length = address_space.max_prefixlen // 8
+        # Number of written vRouter and Host records
+        self.routers = 0
+        self.hosts = 0
+
+        fd.write(MAGIC)
+        fd.write(_U8.pack(VERSION))
+        fd.write(_U8.pack(address_space.version))
+        self._write_network(address_space)
+
+    def _write_string(self, value):
+        """_write_string.
+        """
+        encoded = value.encode()
+        self.fd.write(_U16.pack(len(encoded)))
+        self.fd.write(encoded)
+
+    def _write_network(self, network):
+        """_write_network.
+        """
+        self.fd.write(int(network.network_address).to_bytes(
+            self.address_length, 'big'))
+        self.fd.write(_U8.pack(network.prefixlen))
+
+    def _write_host(self, host):
+        """_write_host.
+        """
+        self.hosts += 1
+        self.fd.write(HOST_RECORD)
+        self.fd.write(_U32.pack(host.id))
+        self._write_string(host.name)
+        # The address of a Host is the first address of its uplink network
+        self.fd.write(int(host.uplink_network[1]).to_bytes(
+            self.address_length, 'big'))
+        self.fd.write(_U8.pack(host.uplink_network.prefixlen))
+        self.fd.write(bytes.fromhex(host.mac_address.replace(":", "")))
+
+    def visit_vRouter(self, router):
+        """visit_vRouter.
+
+        Writes the host neighbours of the vRouter, followed by the vRouter.
+
+        Parameters
+        ----------
+        router :
+            vRouter
+        """
+        for neighbour in router.neighbors:
+            if neighbour.type == 'host':
+                self._write_host(neighbour)
+        self.routers += 1
+
+        fd = self.fd
+        fd.write(ROUTER_RECORD)
+        fd.write(_U32.pack(router.id))
+        self._write_string(router.name)
+        self._write_network(router.uplink_network)
+
+        fd.write(_U32.pack(len(router.neighbors)))
+        for port, neighbour in enumerate(router.neighbors, start=1):
+            fd.write(_NEIGHBOUR.pack(port, neighbour.id,
+                                     NEIGHBOUR_TYPE_CODES[neighbour.type]))
+
+        routingtable = router.routingtable
+        fd.write(_U32.pack(len(routingtable)))
+        fd.write(struct.pack("<{}H".format(len(routingtable)),
+                             *(port for port, _ in routingtable)))
+        fd.write(b"".join(int(network.network_address).to_bytes(self.address_length, 'big')
+                          for _, network in routingtable))
+        fd.write(bytes(network.prefixlen for _, network in routingtable))
+
+    def visit_Host(self, host):
+        """visit_Host.
+
+        Hosts are written together with their vRouter.
+        """
+
+    def close(self):
+        """close.
+
+        Writes the end record. The file descriptor is not closed.
+        """
+        self.fd.write(END_RECORD)
+
+
+def write_binary_ir(topo, fd):
+    """write_binary_ir.
+
+    Parameters
+    ----------
+    topo :
+        V_topology - topology with calculated routing tables
+    fd :
+        binary file descriptor the IR is written to
+
+    Returns
+    ----------
+    (int, int) : Number of written vRouters and Hosts
+    """
+    writer = BinaryIRWriterVisitor(fd, topo.allocator.address_space)
+    topo.apply_visitor(writer)
+    writer.close()
+    return writer.routers, writer.hosts
+
+
+class BinaryIRReader:
+    """BinaryIRReader.
+
+    Reads a binary IR record by record. Iterating the reader yields
+    `(node type, id, node IR)` tuples with node IR dicts in the layout of the
+    JSON IR (see `V_topology.get_IR_representation()`), so only one node is
+    held in memory at a time.
+    """
+
+    def __init__(self, fd):
+        """__init__.
+
+        Parameters
+        ----------
+        fd :
+            binary file descriptor of the IR file
+        """
+        self.fd = fd
+
+        if self._read(len(MAGIC)) != MAGIC:
+            raise RuntimeError("{} is not a binary IR file".format(fd))
+        version = self._read_u8()
+        if version != VERSION:
+            raise RuntimeError(
+                "Binary IR version {} is not supported".format(version))
+
+        ip_version = self._read_u8()
+        self.address_length = 4 if ip_version == 4 else 16
+        self._network_class = ipaddress.IPv4Network if ip_version == 4 else ipaddress.IPv6Network
+        self._address_class = ipaddress.IPv4Address if ip_version == 4 else ipaddress.IPv6Address
+
+        address = self._read(self.address_length)
+        self.address_space = self._format_network(address, self._read_u8())
+
+        # Formatted networks {address bytes + prefix length: network string}
+        self._networks = {}
+
+    def _read(self, size):
+        """_read.
+        """
+        data = self.fd.read(size)
+        if len(data) != size:
+            raise RuntimeError("Binary IR file is truncated")
+        return data
+
+    def _read_u8(self):
+        """_read_u8.
+        """
+        return self._read(1)[0]
+
+    def _read_u32(self):
+        """_read_u32.
+        """
+        return _U32.unpack(self._read(4))[0]
+
+    def _read_string(self):
+        """_read_string.
+        """
+        return self._read(_U16.unpack(self._read(2))[0]).decode()
+
+    def _format_network(self, address, prefixlen):
+        """_format_network.
+
+        Formats a network like `IPv4Network.compressed`.
+        """
+        if self.address_length == 4:
+            return "{}/{}".format(socket.inet_ntoa(address), prefixlen)
+        return self._network_class((int.from_bytes(address, 'big'), prefixlen)).compressed
+
+    def _read_host(self):
+        """_read_host.
+        """
+        node_id = self._read_u32()
+        name = self._read_string()
+        address = self._address_class(self._read(self.address_length))
+        prefixlen = self._read_u8()
+        mac = self._read(6).hex()
+        return str(node_id), {
+            "name": name,
+            "ip": "{}/{}".format(address, prefixlen),
+            "mac": ":".join(mac[i:i + 2] for i in range(0, 12, 2))
+        }
+
+    def _read_router(self):
+        """_read_router.
+        """
+        node_id = self._read_u32()
+        name = self._read_string()
+        address = self._read(self.address_length)
+        uplink_network = self._format_network(address, self._read_u8())
+
+        neighbour_count = self._read_u32()
+        neighbours = []
+        for port, neighbour_id, neighbour_type in _NEIGHBOUR.iter_unpack(
+                self._read(_NEIGHBOUR.size * neighbour_count)):
+            neighbours.append(
+                [port, str(neighbour_id), NEIGHBOUR_TYPES[neighbour_type]])
+
+        route_count = self._read_u32()
+        ports = struct.unpack("<{}H".format(route_count),
+                              self._read(2 * route_count))
+        addresses = self._read(self.address_length * route_count)
+        prefixlens = self._read(route_count)
+
+        # The same networks show up in the routing tables of many vRouters,
+        # each network is only formatted once and the string is shared
+        length = self.address_length
+        networks = self._networks
+        routingtable = []
+        for index, port in enumerate(ports):
+            key = addresses[index * length:(index + 1) * length] + \
+                prefixlens[index:index + 1]
+            network = networks.get(key)
+            if network is None:
+                network = networks[key] = self._format_network(
+                    key[:length], key[length])
+            routingtable.append([port, network])
+
+        return str(node_id), {
+            "name": name,
+            "uplink_network": uplink_network,
+            "neighbors": neighbours,
+            "routingtable": routingtable
+        }
+
+    def __iter__(self):
+        """__iter__.
+        """
+        while True:
+            record_type = self._read(1)
+            if record_type == HOST_RECORD:
+                node_id, node = self._read_host()
+                yield "Host", node_id, node
+            elif record_type == ROUTER_RECORD:
+                node_id, node = self._read_router()
+                yield "vRouter", node_id, node
+            elif record_type == END_RECORD:
+                return
+            else:
+                raise RuntimeError(
+                    "Unknown binary IR record type {}".format(record_type))
+
+
+def load_binary_ir(fd):
+    """load_binary_ir.
+
+    Reads a complete binary IR into the dict of the JSON IR.
+
+    Parameters
+    ----------
+    fd :
+        binary file descriptor of the IR file
+
+    Returns
+    ----------
+    dict : IR, see `V_topology.get_IR_representation()`
+    """
+    reader = BinaryIRReader(fd)
+    ir = {"vRouter": {}, "Host": {}}
+    for node_type, node_id, node in reader:
+        ir[node_type][node_id] = node
+    ir["address_space"] = reader.address_space
+    return ir
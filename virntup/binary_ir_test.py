@@ -0,0 +1,92 @@
+import io
+import json
+import logging
+import unittest
+
+from . import binary_ir
+from . import topology_generator
+from .address_allocator import AddressAllocator
+from .topology_controller import TopologyController, InsufficientEnvironmentError
+from .topology_controller_test import env_fd
+
+logging.basicConfig(level=logging.INFO)
+
+
+def binary_ir_fd(topo):
+    """binary_ir_fd.
+
+    Returns a binary file descriptor containing the binary IR of topo.
+    """
+    fd = io.BytesIO()
+    binary_ir.write_binary_ir(topo, fd)
+    fd.seek(0)
+    return fd
+
+
+###########################################################
+class TestBinaryIR(unittest.TestCase):
+    """TestBinaryIR.
+    """
+
+    def test_roundtrip_equals_json_ir(self):
+        """test_roundtrip_equals_json_ir.
+        """
+        topologies = [
+            topology_generator.generate_topo('large'),
+            topology_generator.generate_topo('large', aggregate=True),
+            topology_generator.generate_topo(
+                'n_hops', AddressAllocator("fd00::/48", 64, 64), hops=5)
+        ]
+        for topo in topologies:
+            self.assertEqual(binary_ir.load_binary_ir(binary_ir_fd(topo)),
+                             topo.get_IR_representation())
+
+    def test_format_is_detected(self):
+        """test_format_is_detected.
+        """
+        topo = topology_generator.generate_topo('medium')
+        json_fd = io.BytesIO(json.dumps(
+            topo.get_IR_representation()).encode())
+
+        self.assertTrue(binary_ir.is_binary_ir(binary_ir_fd(topo)))
+        self.assertFalse(binary_ir.is_binary_ir(json_fd))
+        self.assertEqual(json_fd.tell(), 0)
+
+
+###########################################################
+class TestBinaryIRController(unittest.TestCase):
+    """TestBinaryIRController.
+    """
+
+    def test_streamed_mapping_equals_json_mapping(self):
+        """test_streamed_mapping_equals_json_mapping.
+        """
+        topo = topology_generator.generate_topo('large')
+        json_fd = io.BytesIO(json.dumps(
+            topo.get_IR_representation()).encode())
+
+        from_json = TopologyController(env_fd(12, 18), ir_fd=json_fd)
+        from_binary = TopologyController(
+            env_fd(12, 18), ir_fd=binary_ir_fd(topo))
+
+        self.assertEqual(from_binary.port_mapping, from_json.port_mapping)
+        self.assertEqual(from_binary.route_mapping, from_json.route_mapping)
+        self.assertEqual(from_binary.host_env, from_json.host_env)
+        self.assertEqual(from_binary.get_expected_entries(),
+                         from_json.get_expected_entries())
+
+    def test_missing_resources_are_reported(self):
+        """test_missing_resources_are_reported.
+        """
+        topo = topology_generator.generate_topo('large')
+
+        with self.assertRaises(InsufficientEnvironmentError) as context:
+            TopologyController(env_fd(10, 18), ir_fd=binary_ir_fd(topo))
+
+        self.assertEqual(context.exception.missing_links, 2)
+        self.assertEqual(context.exception.missing_host_links, 0)
+
+
+################################################
+if __name__ == '__main__':
+    unittest.main()
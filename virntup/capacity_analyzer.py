@@ -0,0 +1,393 @@
+import json
+from collections import namedtuple
+
+from . import pipe_placement
+
+
+# Traffic patterns of the capacity analysis. `uniform`: every host sends
+# `rate` Gbit/s spread evenly over all other hosts, `all_to_one`: every host
+# sends `rate` Gbit/s to one target host, `matrix`: rates given per host pair.
+TRAFFIC_PATTERNS = ['uniform', 'all_to_one', 'matrix']
+
+# Speed in Gbit/s of ports without speed in the port metadata of the env.json
+DEFAULT_PORT_SPEED = 100
+
+# Links whose utilization is this close to the highest one are bottlenecks too
+UTILIZATION_TOLERANCE = 1e-9
+
+# Offered load in Gbit/s of a mapped topology, keyed by IR id. `sent` and
+# `received` per host, `up` (towards the root) and `down` per vRouter
+# through the wire loop to its parent.
+LinkLoads = namedtuple("LinkLoads", ["sent", "received", "up", "down"])
+
+
+def load_traffic_matrix(fd):
+    """load_traffic_matrix.
+
+    Reads a traffic matrix in Gbit/s between the hosts of the env.json:
+
+    ```
+    {
+        "h1": {"h2": 10, "h3": 2.5},
+        ...
+    }
+    ```
+
+    Parameters
+    ----------
+    fd :
+        file descriptor of the traffic matrix json
+
+    Returns
+    ----------
+    dict : {source hostname: {destination hostname: float rate}}
+    """
+    matrix = json.load(fd)
+    return {src: {dst: float(rate) for dst, rate in flows.items()}
+            for src, flows in matrix.items()}
+
+
+def all_to_one_matrix(controller, rate, target=None):
+    """all_to_one_matrix.
+
+    Parameters
+    ----------
+    controller :
+        TopologyController - mapped topology
+    rate :
+        float - rate in Gbit/s every host sends to the target
+    target :
+        str (default: first host of the IR) - hostname of the target host
+    """
+    hostnames = list(controller.host_mapping.values())
+    if target is None:
+        target = hostnames[0]
+    if target not in hostnames:
+        raise ValueError("Host `{}` is not part of the topology".format(target))
+    return {src: {target: rate} for src in hostnames if src != target}
+
+
+class _Tree:
+    """_Tree.
+
+    Parent pointers and depths of the nodes of a mapped topology.
+    """
+
+    def __init__(self, controller):
+        """__init__.
+        """
+        ir = controller.ir
+        self.root = next(iter(ir['vRouter']))
+        # {node id: (parent vRouter id, port of the parent)}
+        self.parents = {}
+        self.depths = {self.root: 0}
+        for router_id, router in ir['vRouter'].items():
+            for port, neighbour_id, _ in router["neighbors"]:
+                self.parents[neighbour_id] = (router_id, port)
+                self.depths[neighbour_id] = self.depths[router_id] + 1
+
+        self.host_ids = {hostname: host_id for host_id,
+                         hostname in controller.host_mapping.items()}
+
+    def host_id(self, hostname):
+        """host_id.
+        """
+        if hostname not in self.host_ids:
+            raise ValueError("Host `{}` is not part of the topology".format(hostname))
+        return self.host_ids[hostname]
+
+    def turning_router(self, src_id, dst_id):
+        """turning_router.
+
+        Returns the vRouter at which the path between two nodes turns from
+        upstream to downstream.
+        """
+        src_id = self.parents[src_id][0]
+        dst_id = self.parents[dst_id][0]
+        while self.depths[src_id] > self.depths[dst_id]:
+            src_id = self.parents[src_id][0]
+        while self.depths[dst_id] > self.depths[src_id]:
+            dst_id = self.parents[dst_id][0]
+        while src_id != dst_id:
+            src_id = self.parents[src_id][0]
+            dst_id = self.parents[dst_id][0]
+        return src_id
+
+
+def get_paths(controller, matrix):
+    """get_paths.
+
+    Returns the passes through the switch of every flow of a traffic matrix.
+    The path of a flow is given by the tree, no routing table is needed.
+
+    Parameters
+    ----------
+    controller :
+        TopologyController - mapped topology
+    matrix :
+        dict - {source hostname: {destination hostname: rate}}
+
+    Returns
+    ----------
+    generator : (src, dst, [(vRouter id, physical ingress port, physical
+    egress port)]) per flow
+    """
+    tree = _Tree(controller)
+
+    def hops_up(node_id, turn):
+        hops = []
+        while node_id != turn:
+            router_id, port = tree.parents[node_id]
+            hops.append((router_id, controller.port_of(router_id, port)))
+            node_id = router_id
+        return hops
+
+    for src, flows in matrix.items():
+        src_id = tree.host_id(src)
+        for dst in flows:
+            dst_id = tree.host_id(dst)
+            if src_id == dst_id:
+                raise ValueError("Flow from `{}` to itself".format(src))
+
+            turn = tree.turning_router(src_id, dst_id)
+            up = hops_up(src_id, turn)
+            down = hops_up(dst_id, turn)
+
+            path = [(router_id, port, controller.port_mapping[router_id][0])
+                    for router_id, port in up[:-1]]
+            path.append((turn, up[-1][1], down[-1][1]))
+            path.extend((router_id, controller.port_mapping[router_id][0], port)
+                        for router_id, port in reversed(down[:-1]))
+            yield src, dst, path
+
+
+def get_matrix_loads(controller, matrix):
+    """get_matrix_loads.
+
+    Calculates the load of every wire loop and host link of a traffic matrix.
+    Instead of walking every path, the rate of a flow is added to its source,
+    its destination and the vRouter where it turns. The load through the
+    wire loop above a subtree is then the traffic sent (received) by its
+    hosts minus the traffic turning inside the subtree.
+
+    Parameters
+    ----------
+    controller :
+        TopologyController - mapped topology
+    matrix :
+        dict - {source hostname: {destination hostname: rate in Gbit/s}}
+
+    Returns
+    ----------
+    LinkLoads : load of the host links and wire loops
+    """
+    tree = _Tree(controller)
+    ir = controller.ir
+
+    sent = {host_id: 0.0 for host_id in controller.host_mapping}
+    received = dict(sent)
+    turning = {}
+    for src, flows in matrix.items():
+        src_id = tree.host_id(src)
+        for dst, rate in flows.items():
+            dst_id = tree.host_id(dst)
+            if src_id == dst_id:
+                raise ValueError("Flow from `{}` to itself".format(src))
+            sent[src_id] += rate
+            received[dst_id] += rate
+            turn = tree.turning_router(src_id, dst_id)
+            turning[turn] = turning.get(turn, 0.0) + rate
+
+    # (sent, received, turning) of the subtree below every vRouter, the
+    # vRouters of the IR are in pre-order, so walking them backwards visits
+    # all vRouters below a vRouter first
+    subtree = {}
+    up = {}
+    down = {}
+    for router_id in reversed(list(ir['vRouter'])):
+        subtree_sent = 0.0
+        subtree_received = 0.0
+        subtree_turning = turning.get(router_id, 0.0)
+        for _, neighbour_id, neighbour_type in ir['vRouter'][router_id]["neighbors"]:
+            if neighbour_type == 'vRouter':
+                below = subtree.pop(neighbour_id)
+                subtree_sent += below[0]
+                subtree_received += below[1]
+                subtree_turning += below[2]
+            else:
+                subtree_sent += sent[neighbour_id]
+                subtree_received += received[neighbour_id]
+        subtree[router_id] = (subtree_sent, subtree_received, subtree_turning)
+
+        if router_id != tree.root:
+            up[router_id] = subtree_sent - subtree_turning
+            down[router_id] = subtree_received - subtree_turning
+
+    return LinkLoads(sent, received, up, down)
+
+
+def get_uniform_loads(controller, rate):
+    """get_uniform_loads.
+
+    Calculates the load of every wire loop and host link if every host sends
+    `rate` Gbit/s spread evenly over all other hosts. The `k` hosts below a
+    wire loop send `rate * k * (n - k) / (n - 1)` through it, so the n^2
+    flows are never built.
+
+    Parameters
+    ----------
+    controller :
+        TopologyController - mapped topology
+    rate :
+        float - rate in Gbit/s every host sends
+
+    Returns
+    ----------
+    LinkLoads : load of the host links and wire loops
+    """
+    ir = controller.ir
+    root = next(iter(ir['vRouter']))
+    hosts = len(controller.host_mapping)
+
+    sent = {host_id: rate if hosts > 1 else 0.0 for host_id in controller.host_mapping}
+    up = {}
+    hosts_below = {}
+    for router_id in reversed(list(ir['vRouter'])):
+        hosts_below[router_id] = sum(
+            hosts_below.pop(neighbour_id) if neighbour_type == 'vRouter' else 1
+            for _, neighbour_id, neighbour_type in ir['vRouter'][router_id]["neighbors"])
+        if router_id != root:
+            k = hosts_below[router_id]
+            up[router_id] = rate * k * (hosts - k) / (hosts - 1) if hosts > 1 else 0.0
+
+    return LinkLoads(sent, dict(sent), up, dict(up))
+
+
+def analyze_capacity(controller, loads, default_speed=DEFAULT_PORT_SPEED):
+    """analyze_capacity.
+
+    Compares the offered load of every wire loop and host link with the
+    speed of its ports, given by the port metadata of the env.json (see
+    `pipe_placement.get_port_metadata()`). Both directions of a link are
+    checked separately, a wire loop is as fast as its slower port.
+
+    Parameters
+    ----------
+    controller :
+        TopologyController - mapped topology
+    loads :
+        LinkLoads - result of `get_matrix_loads()` or `get_uniform_loads()`
+    default_speed :
+        float - speed in Gbit/s of ports without metadata
+
+    Returns
+    ----------
+    dict : `offered_load` and the `loops`, `host_links` and `ports` with
+    their load, the highest `max_utilization`, the `saturation_scale` by
+    which the traffic can grow until the first link is saturated (None
+    without traffic), the `saturation_load` and the `bottlenecks`
+    """
+    metadata = pipe_placement.get_port_metadata(controller.env)
+    ir = controller.ir
+
+    def speed(port):
+        return metadata.get(int(port), {}).get("speed", default_speed)
+
+    ports = {}
+
+    def add_port_load(port, tx, rx):
+        entry = ports.setdefault(port, {"tx": 0.0, "rx": 0.0, "speed": speed(port)})
+        entry["tx"] += tx
+        entry["rx"] += rx
+
+    loops = []
+    host_links = []
+    for router_id, router in ir['vRouter'].items():
+        for port, neighbour_id, neighbour_type in router["neighbors"]:
+            local_port = controller.port_of(router_id, port)
+
+            if neighbour_type == 'vRouter':
+                remote_port = controller.port_mapping[neighbour_id][0]
+                up = loads.up[neighbour_id]
+                down = loads.down[neighbour_id]
+                loop_speed = min(speed(local_port), speed(remote_port))
+                add_port_load(local_port, down, up)
+                add_port_load(remote_port, up, down)
+                loops.append({
+                    "parent": router_id, "child": neighbour_id,
+                    "parent_port": local_port, "child_port": remote_port,
+                    "up": up, "down": down, "speed": loop_speed,
+                    "utilization": max(up, down) / loop_speed
+                })
+            else:
+                sent = loads.sent[neighbour_id]
+                received = loads.received[neighbour_id]
+                port_speed = speed(local_port)
+                add_port_load(local_port, received, sent)
+                host_links.append({
+                    "host": controller.host_mapping[neighbour_id],
+                    "port": local_port, "sent": sent, "received": received,
+                    "speed": port_speed,
+                    "utilization": max(sent, received) / port_speed
+                })
+
+    offered_load = sum(loads.sent.values())
+    max_utilization = max(
+        [link["utilization"] for link in loops + host_links] or [0.0])
+    saturation_scale = 1 / max_utilization if max_utilization else None
+
+    bottlenecks = [link for link in loops + host_links
+                   if max_utilization and
+                   link["utilization"] >= max_utilization - UTILIZATION_TOLERANCE]
+
+    return {
+        "offered_load": offered_load,
+        "max_utilization": max_utilization,
+        "saturation_scale": saturation_scale,
+        "saturation_load": offered_load * saturation_scale if saturation_scale else None,
+        "bottlenecks": bottlenecks,
+        "loops": loops,
+        "host_links": host_links,
+        "ports": {str(port): entry for port, entry in sorted(ports.items())}
+    }
+
+
+def describe_link(link):
+    """describe_link.
+
+    Returns a short description of a wire loop or host link of the result of
+    `analyze_capacity()`.
+    """
+    if "host" in link:
+        return "host link {} (port {})".format(link["host"], link["port"])
+    return "loop {} - {} (ports {} - {})".format(
+        link["parent"], link["child"], link["parent_port"], link["child_port"])
+
+
+def format_report(report, top=10):
+    """format_report.
+
+    Formats the result of `analyze_capacity()` with the `top` most utilized
+    links.
+    """
+    lines = ["offered load: {:.2f} Gbit/s".format(report["offered_load"])]
+    if report["saturation_scale"] is None:
+        lines.append("no traffic")
+        return "\n".join(lines)
+
+    lines.append("highest utilization: {:.1%}".format(report["max_utilization"]))
+    lines.append("saturation at {:.2f}x the offered load ({:.2f} Gbit/s)".format(
+        report["saturation_scale"], report["saturation_load"]))
+    lines.append("bottlenecks: {}".format(
+        ", ".join(describe_link(link) for link in report["bottlenecks"])))
+
+    links = sorted(report["loops"] + report["host_links"],
+                   key=lambda link: link["utilization"], reverse=True)[:top]
+    lines.append("{:<48}{:>12}{:>12}{:>10}{:>8}".format(
+        "most utilized links", "up/sent", "down/recv", "speed", "util"))
+    for link in links:
+        forward = link["up"] if "up" in link else link["sent"]
+        backward = link["down"] if "down" in link else link["received"]
+        lines.append("{:<48}{:>12.2f}{:>12.2f}{:>10g}{:>8.1%}".format(
+            describe_link(link), forward, backward, link["speed"], link["utilization"]))
+    return "\n".join(lines)
@@ -0,0 +1,92 @@
+import logging
+import random
+import unittest
+
+from . import capacity_analyzer
+from . import topology_generator
+from .pipe_placement_test import pipe_env_fd
+from .topology_controller import TopologyController
+
+logging.basicConfig(level=logging.INFO)
+
+
+def mapped_topology():
+    """mapped_topology.
+
+    Returns a TopologyController of a random topology on a three pipe
+    environment.
+    """
+    topo = topology_generator.generate_topo(
+        'random', routers=15, hosts=25, seed=5)
+    return TopologyController(pipe_env_fd(3, 6, 9), topo=topo)
+
+
+###########################################################
+class TestCapacityAnalyzer(unittest.TestCase):
+    """TestCapacityAnalyzer.
+    """
+
+    def test_uniform_loads_equal_uniform_matrix(self):
+        """test_uniform_loads_equal_uniform_matrix.
+        """
+        controller = mapped_topology()
+        hostnames = list(controller.host_mapping.values())
+        rate = 2.0 / (len(hostnames) - 1)
+        matrix = {src: {dst: rate for dst in hostnames if dst != src}
+                  for src in hostnames}
+
+        from_matrix = capacity_analyzer.get_matrix_loads(controller, matrix)
+        uniform = capacity_analyzer.get_uniform_loads(controller, 2.0)
+
+        for loads in ("sent", "received", "up", "down"):
+            for node_id, load in getattr(uniform, loads).items():
+                self.assertAlmostEqual(getattr(from_matrix, loads)[node_id], load)
+
+    def test_port_loads_equal_flow_paths(self):
+        """test_port_loads_equal_flow_paths.
+        """
+        controller = mapped_topology()
+        hostnames = list(controller.host_mapping.values())
+        rand = random.Random(1)
+        matrix = {src: {dst: rand.uniform(0, 10) for dst in rand.sample(hostnames, 5)
+                        if dst != src} for src in hostnames}
+
+        report = capacity_analyzer.analyze_capacity(
+            controller, capacity_analyzer.get_matrix_loads(controller, matrix))
+
+        # Every pass through the switch receives the flow on its ingress
+        # port and transmits it on its egress port
+        expected = {}
+        for src, dst, path in capacity_analyzer.get_paths(controller, matrix):
+            for _, ingress, egress in path:
+                expected.setdefault(str(ingress), [0.0, 0.0])[1] += matrix[src][dst]
+                expected.setdefault(str(egress), [0.0, 0.0])[0] += matrix[src][dst]
+
+        for port, entry in report["ports"].items():
+            tx, rx = expected.get(port, (0.0, 0.0))
+            self.assertAlmostEqual(entry["tx"], tx)
+            self.assertAlmostEqual(entry["rx"], rx)
+
+    def test_all_to_one_saturates_target_link(self):
+        """test_all_to_one_saturates_target_link.
+        """
+        controller = mapped_topology()
+        hostnames = list(controller.host_mapping.values())
+        matrix = capacity_analyzer.all_to_one_matrix(controller, 10, hostnames[3])
+
+        report = capacity_analyzer.analyze_capacity(
+            controller, capacity_analyzer.get_matrix_loads(controller, matrix))
+
+        incoming = 10 * (len(hostnames) - 1)
+        self.assertAlmostEqual(report["offered_load"], incoming)
+        self.assertAlmostEqual(report["saturation_scale"], 100 / incoming)
+        self.assertEqual([link.get("host") for link in report["bottlenecks"]],
+                         [hostnames[3]])
+
+        with self.assertRaises(ValueError):
+            capacity_analyzer.all_to_one_matrix(controller, 10, "unknown")
+
+
+################################################
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,455 @@
+import ipaddress
+import logging
+import socket
+
+import numpy as np
+
+from . import address_allocator
+from . import topology
+
+
+# Node type codes of the `types` array
+ROUTER = 0
+HOST = 1
+NODE_TYPES = ['vRouter', 'host']
+
+
+class CompactTopology:
+    """CompactTopology.
+
+    Array-backed, read-only representation of a V_topology. The _Nodes are
+    numbered in pre-order (the order of the IR) and stored in flat NumPy
+    arrays:
+
+    - `ids`, `types`, `parents` and `depths` per _Node
+    - the neighbours of each vRouter as CSR arrays (`neighbor_offsets`,
+      `neighbor_indices`), in port order
+    - the uplink networks as integers (`network_offsets` counts networks of
+      the smallest size from the start of the address space) and
+      `prefixlens`
+
+    Routing tables are not stored. Today's tables list all networks of a
+    subtree in post-order, each subtree of a neighbour behind one port. As a
+    subtree occupies one interval of the post-order (an Euler tour
+    interval), the routing table of a vRouter is derived from this interval
+    when it is requested, see `route_nodes()` and `route_ports()`. Memory is
+    O(nodes) instead of O(nodes x depth).
+
+    `node()` returns thin `__slots__` views which provide the attributes of
+    `vRouter` and `Host`, so the visitors of the `topology` module can be
+    applied with `apply_visitor()`.
+    """
+
+    def __init__(self, topo):
+        """__init__.
+
+        Builds the arrays in a single walk of the topology. The routing
+        tables of the topology do not have to be calculated.
+
+        Parameters
+        ----------
+        topo :
+            V_topology - topology to be represented
+        """
+        self.allocator = topo.allocator
+        address_space = self.allocator.address_space
+        self._network_class = type(address_space)
+        self._base = int(address_space.network_address)
+        self._shift = address_space.max_prefixlen - \
+            max(self.allocator.router_prefix, self.allocator.host_prefix)
+
+        if (address_space.num_addresses >> self._shift) > 1 << 63:
+            raise ValueError("Address plan {} has too many networks for the compact representation".format(
+                self.allocator))
+
+        ids = []
+        types = []
+        parents = []
+        depths = []
+        offsets = []
+        prefixlens = []
+        name_codes = []
+        self.name_prefixes = []
+        prefix_codes = {}
+
+        stack = [(topo.router, -1, 0)]
+        while stack:
+            node, parent, depth = stack.pop()
+            index = len(ids)
+
+            id_string = str(node.id)
+            if not node.name.endswith(id_string):
+                raise ValueError(
+                    "Name of {} does not end with its id".format(node))
+            prefix = node.name[:-len(id_string)]
+            if prefix not in prefix_codes:
+                prefix_codes[prefix] = len(self.name_prefixes)
+                self.name_prefixes.append(prefix)
+
+            ids.append(node.id)
+            types.append(ROUTER if node.type == 'vRouter' else HOST)
+            parents.append(parent)
+            depths.append(depth)
+            offsets.append((int(node.uplink_network.network_address) - self._base) >> self._shift)
+            prefixlens.append(node.uplink_network.prefixlen)
+            name_codes.append(prefix_codes[prefix])
+
+            stack.extend((neighbor, index, depth + 1)
+                         for neighbor in reversed(node.neighbors))
+
+        self.ids = np.array(ids, dtype=np.uint32)
+        self.types = np.array(types, dtype=np.uint8)
+        self.parents = np.array(parents, dtype=np.int32)
+        self.depths = np.array(depths, dtype=np.int32)
+        self.network_offsets = np.array(offsets, dtype=np.uint64)
+        self.prefixlens = np.array(prefixlens, dtype=np.uint8)
+        self.name_codes = np.array(name_codes, dtype=np.uint16)
+
+        node_count = len(ids)
+
+        # Children have larger pre-order indices than their parent and are
+        # numbered in port order, a stable sort by parent yields the CSR
+        # neighbour lists
+        self.neighbor_offsets = np.zeros(node_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.parents[1:], minlength=node_count),
+                  out=self.neighbor_offsets[1:])
+        self.neighbor_indices = (np.argsort(
+            self.parents[1:], kind='stable') + 1).astype(np.int32)
+
+        # The subtree of a _Node is the interval [index, index + size) of the
+        # pre-order, its end is the first following _Node which is not deeper
+        subtree_ends = np.full(node_count, node_count, dtype=np.int64)
+        open_nodes = []
+        for index, depth in enumerate(depths):
+            while open_nodes and depths[open_nodes[-1]] >= depth:
+                subtree_ends[open_nodes.pop()] = index
+            open_nodes.append(index)
+        self.subtree_sizes = (subtree_ends - np.arange(node_count)).astype(np.int32)
+
+        # All _Nodes before a _Node in pre-order, except its ancestors, and its
+        # own descendants come before it in post-order
+        self.post_index = (np.arange(node_count) - self.depths +
+                           self.subtree_sizes - 1).astype(np.int32)
+        self.post_order = np.empty(node_count, dtype=np.int32)
+        self.post_order[self.post_index] = np.arange(node_count, dtype=np.int32)
+
+        self._index_of = np.full(int(self.ids.max()) + 1, -1, dtype=np.int32)
+        self._index_of[self.ids] = np.arange(node_count, dtype=np.int32)
+
+        self._network_strings = None
+
+        logging.info("Compact topology with {} nodes uses {} kB".format(
+            node_count, self.nbytes() // 1024))
+
+    def __len__(self):
+        """__len__.
+
+        Returns the number of _Nodes.
+        """
+        return len(self.ids)
+
+    def nbytes(self):
+        """nbytes.
+
+        Returns the memory used by the arrays in bytes.
+        """
+        return sum(array.nbytes for array in (
+            self.ids, self.types, self.parents, self.depths,
+            self.network_offsets, self.prefixlens, self.name_codes,
+            self.neighbor_offsets, self.neighbor_indices, self.subtree_sizes,
+            self.post_index, self.post_order, self._index_of))
+
+    def index_of(self, node_id):
+        """index_of.
+
+        Returns the pre-order index of the _Node with the given id.
+
+        Parameters
+        ----------
+        node_id :
+            int or str - id of the _Node
+        """
+        node_id = int(node_id)
+        if not 0 <= node_id < len(self._index_of) or self._index_of[node_id] < 0:
+            raise KeyError(node_id)
+        return int(self._index_of[node_id])
+
+    def node(self, index):
+        """node.
+
+        Returns a view of the _Node with the given pre-order index.
+
+        Parameters
+        ----------
+        index :
+            int - pre-order index, 0 is the root router
+        """
+        if self.types[index] == ROUTER:
+            return CompactRouter(self, int(index))
+        return CompactHost(self, int(index))
+
+    @property
+    def router(self):
+        """router.
+
+        The root router, as for `V_topology`.
+        """
+        return self.node(0)
+
+    def neighbors(self, index):
+        """neighbors.
+
+        Returns the pre-order indices of the neighbours of a _Node in port
+        order (port = position + 1).
+
+        Parameters
+        ----------
+        index :
+            int - pre-order index
+        """
+        return self.neighbor_indices[self.neighbor_offsets[index]:self.neighbor_offsets[index + 1]]
+
+    def network(self, index):
+        """network.
+
+        Returns the uplink network of a _Node.
+
+        Parameters
+        ----------
+        index :
+            int - pre-order index
+        """
+        address = self._base + (int(self.network_offsets[index]) << self._shift)
+        return self._network_class((address, int(self.prefixlens[index])))
+
+    def network_strings(self):
+        """network_strings.
+
+        Returns the compressed uplink networks of all _Nodes as strings. The
+        list is calculated once, so the strings are shared by all routing
+        tables.
+        """
+        if self._network_strings is None:
+            prefixlens = self.prefixlens.tolist()
+            addresses = [self._base + (offset << self._shift)
+                         for offset in self.network_offsets.tolist()]
+            if self._network_class is ipaddress.IPv4Network:
+                self._network_strings = [
+                    "{}/{}".format(socket.inet_ntoa(address.to_bytes(4, 'big')), prefixlen)
+                    for address, prefixlen in zip(addresses, prefixlens)]
+            else:
+                self._network_strings = [
+                    self._network_class((address, prefixlen)).compressed
+                    for address, prefixlen in zip(addresses, prefixlens)]
+        return self._network_strings
+
+    def name(self, index):
+        """name.
+
+        Parameters
+        ----------
+        index :
+            int - pre-order index
+        """
+        return self.name_prefixes[self.name_codes[index]] + str(self.ids[index])
+
+    def route_nodes(self, index):
+        """route_nodes.
+
+        Returns the pre-order indices of the _Nodes whose networks are in the
+        routing table of a vRouter, in the order of the table. These are all
+        _Nodes of its subtree in post-order, without the vRouter itself.
+
+        Parameters
+        ----------
+        index :
+            int - pre-order index of a vRouter
+        """
+        end = self.post_index[index]
+        return self.post_order[end - self.subtree_sizes[index] + 1:end]
+
+    def route_ports(self, index):
+        """route_ports.
+
+        Returns the egress port of each route of `route_nodes()`. All networks
+        of the subtree of a neighbour are routed to the port of the neighbour.
+
+        Parameters
+        ----------
+        index :
+            int - pre-order index of a vRouter
+        """
+        neighbors = self.neighbors(index)
+        return np.repeat(np.arange(1, len(neighbors) + 1, dtype=np.int32),
+                         self.subtree_sizes[neighbors])
+
+    def route_count(self):
+        """route_count.
+
+        Returns the number of routes of all routing tables.
+        """
+        return int((self.subtree_sizes[self.types == ROUTER] - 1).sum())
+
+    def apply_visitor(self, visitor):
+        """apply_visitor.
+
+        Applies a AbstractVTopologyVisitor to the views of the _Nodes, see
+        `V_topology.apply_visitor()`.
+
+        Parameters
+        ----------
+        visitor :
+            AbstractVTopologyVisitor
+        """
+        topology.traverse(self.router, visitor)
+
+    def get_IR_representation(self):
+        """get_IR_representation.
+
+        Returns the IR of the topology. It is identical to the IR of the
+        V_topology with calculated (not summarized) routing tables, see
+        `V_topology.get_IR_representation()`.
+        """
+        builder = {"vRouter": {}, "Host": {}}
+        routers = builder["vRouter"]
+        hosts = builder["Host"]
+        strings = self.network_strings()
+        ids = self.ids.tolist()
+        types = self.types.tolist()
+
+        for index in range(len(ids)):
+            node = self.node(index)
+            if types[index] == ROUTER:
+                routers[str(ids[index])] = {
+                    "name": node.name,
+                    "uplink_network": strings[index],
+                    "neighbors": [[port, str(ids[neighbor]), NODE_TYPES[types[neighbor]]]
+                                  for port, neighbor in enumerate(self.neighbors(index).tolist(), start=1)],
+                    "routingtable": [[port, strings[route]] for port, route in zip(
+                        self.route_ports(index).tolist(), self.route_nodes(index).tolist())]
+                }
+            else:
+                hosts[str(ids[index])] = {
+                    "name": node.name,
+                    "ip": node.ip_address,
+                    "mac": node.mac_address
+                }
+
+        builder["address_space"] = self.allocator.address_space.compressed
+        return builder
+
+
+class _CompactNode:
+    """_CompactNode.
+
+    View of a _Node of a CompactTopology. Views are created on demand and
+    only hold the topology and the pre-order index.
+    """
+
+    __slots__ = ('topology', 'index')
+
+    def __init__(self, topology, index):
+        """__init__.
+
+        Parameters
+        ----------
+        topology :
+            CompactTopology
+        index :
+            int - pre-order index of the _Node
+        """
+        self.topology = topology
+        self.index = index
+
+    @property
+    def id(self):
+        """id.
+        """
+        return int(self.topology.ids[self.index])
+
+    @property
+    def name(self):
+        """name.
+        """
+        return self.topology.name(self.index)
+
+    @property
+    def uplink_network(self):
+        """uplink_network.
+        """
+        return self.topology.network(self.index)
+
+    def __eq__(self, other):
+        """__eq__.
+        """
+        return isinstance(other, _CompactNode) and \
+            self.topology is other.topology and self.index == other.index
+
+    def __hash__(self):
+        """__hash__.
+        """
+        return hash((id(self.topology), self.index))
+
+    def __str__(self):
+        """__str__.
+        """
+        return "(" + self.name + "_" + str(self.id) + ")"
+
+
+class CompactRouter(_CompactNode):
+    """CompactRouter.
+
+    View of a vRouter, see `topology.vRouter`.
+    """
+
+    __slots__ = ()
+
+    type = 'vRouter'
+
+    @property
+    def neighbors(self):
+        """neighbors.
+        """
+        return [self.topology.node(index) for index in self.topology.neighbors(self.index)]
+
+    @property
+    def routingtable(self):
+        """routingtable.
+
+        The routing table as list of `(port, network)` tuples, derived from
+        the subtree intervals.
+        """
+        network = self.topology.network
+        return [(port, network(index)) for port, index in zip(
+            self.topology.route_ports(self.index).tolist(),
+            self.topology.route_nodes(self.index).tolist())]
+
+    get_dot_representation = topology.vRouter.get_dot_representation
+
+
+class CompactHost(_CompactNode):
+    """CompactHost.
+
+    View of a Host, see `topology.Host`.
+    """
+
+    __slots__ = ()
+
+    type = 'host'
+    neighbors = ()
+    routingtable = ()
+
+    @property
+    def ip_address(self):
+        """ip_address.
+        """
+        network = self.uplink_network
+        return str(network[1]) + "/" + str(network.prefixlen)
+
+    @property
+    def mac_address(self):
+        """mac_address.
+        """
+        return address_allocator.derive_mac_address(self.uplink_network)
+
+    get_dot_representation = topology.Host.get_dot_representation
@@ -0,0 +1,78 @@
+import logging
+import unittest
+
+from . import topology
+from . import topology_generator
+from .address_allocator import AddressAllocator
+from .compact_topology import CompactTopology
+
+logging.basicConfig(level=logging.INFO)
+
+
+def reference_topologies():
+    """reference_topologies.
+
+    Returns topologies with calculated routing tables.
+    """
+    return [
+        topology_generator.generate_topo('minimal'),
+        topology_generator.generate_topo('large'),
+        topology_generator.generate_topo(
+            'n_hops', AddressAllocator("fd00::/48", 64, 96), hops=5),
+        topology_generator.generate_topo(
+            'random', routers=40, hosts=60, seed=3)
+    ]
+
+
+###########################################################
+class TestCompactTopology(unittest.TestCase):
+    """TestCompactTopology.
+    """
+
+    def test_ir_equals_topology_ir(self):
+        """test_ir_equals_topology_ir.
+        """
+        for topo in reference_topologies():
+            self.assertEqual(CompactTopology(topo).get_IR_representation(),
+                             topo.get_IR_representation())
+
+    def test_views_equal_nodes(self):
+        """test_views_equal_nodes.
+        """
+        topo = topology_generator.generate_topo('large')
+        compact = CompactTopology(topo)
+
+        route_count = 0
+        stack = [topo.router]
+        while stack:
+            node = stack.pop()
+            view = compact.node(compact.index_of(node.id))
+            self.assertEqual(view.name, node.name)
+            self.assertEqual(view.uplink_network, node.uplink_network)
+            self.assertEqual(list(view.routingtable), node.routingtable)
+            self.assertEqual([n.id for n in view.neighbors],
+                             [n.id for n in node.neighbors])
+            route_count += len(node.routingtable)
+            stack.extend(node.neighbors)
+
+        self.assertEqual(compact.route_count(), route_count)
+
+    def test_visitors_can_be_applied(self):
+        """test_visitors_can_be_applied.
+        """
+        topo = topology_generator.generate_topo('medium')
+        dot_visitor = topology.DotRepresentationVisitor(with_routingtable=True)
+        topo.apply_visitor(dot_visitor)
+
+        compact_dot_visitor = topology.DotRepresentationVisitor(
+            with_routingtable=True)
+        topology_generator.generate_topo(
+            'medium', compact=True).apply_visitor(compact_dot_visitor)
+
+        self.assertEqual(compact_dot_visitor.get_representation(),
+                         dot_visitor.get_representation())
+
+
+################################################
+if __name__ == '__main__':
+    unittest.main()
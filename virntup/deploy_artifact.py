@@ -0,0 +1,362 @@
+import hashlib
+import ipaddress
+import json
+import logging
+import struct
+
+from google.protobuf import text_format
+from p4.config.v1 import p4info_pb2
+from p4.v1 import p4runtime_pb2
+
+from .target_configurator import PORT_MAPPING_TABLE, PORT_MAPPING_ACTION, ROUTE_TABLE, ROUTE_ACTION
+from .topology_controller import PORT_MAPPING, ROUTES, deploy_transactionally
+
+
+# Every deployment artifact starts with MAGIC, the format VERSION and the key
+# of the inputs it was compiled from
+MAGIC = b"VNDA"
+VERSION = 2
+KEY_LENGTH = hashlib.sha256().digest_size
+
+# Tag of the `updates` field (4, length delimited) of a p4runtime WriteRequest
+_UPDATES_TAG = b"\x22"
+
+# Table codes of the entry keys stored with every update
+TABLE_CODES = {PORT_MAPPING: 0, ROUTES: 1}
+TABLE_NAMES = {code: table for table, code in TABLE_CODES.items()}
+
+_U8 = struct.Struct("<B")
+_U32 = struct.Struct("<I")
+# Record header: table code, port or vRouter number, network address,
+# prefix length and frame length
+_RECORD = struct.Struct("<BIIBI")
+
+
+def load_p4info(p4info_path):
+    """load_p4info.
+
+    Parameters
+    ----------
+    p4info_path :
+        str - path to a p4info file in text format
+
+    Returns
+    ----------
+    p4info_pb2.P4Info
+    """
+    p4info = p4info_pb2.P4Info()
+    with open(p4info_path, 'r') as p4info_fd:
+        text_format.Merge(p4info_fd.read(), p4info, allow_unknown_field=True)
+    return p4info
+
+
+def compute_key(ir_data, env_data, p4info_data, placement='file', vRouter_offset=0):
+    """compute_key.
+
+    Returns the key of a deployment artifact, the sha256 over the IR, the
+    env.json, the p4info and the mapping options. An artifact can only be
+    replayed if its key matches the key of the current inputs.
+
+    Parameters
+    ----------
+    ir_data :
+        bytes - content of the IR file (json or binary IR)
+    env_data :
+        bytes - content of the env.json
+    p4info_data :
+        bytes - content of the p4info file
+    placement :
+        str (default: 'file') - placement strategy of the mapping
+    vRouter_offset :
+        int (default: 0) - vRouter offset of the mapping
+
+    Returns
+    ----------
+    bytes : sha256 digest
+    """
+    key = hashlib.sha256()
+    for data in (ir_data, env_data, p4info_data):
+        key.update(hashlib.sha256(data).digest())
+    options = {"placement": placement, "vRouter_offset": vRouter_offset}
+    key.update(json.dumps(options, sort_keys=True).encode())
+    return key.digest()
+
+
+def _encode_int(value):
+    """_encode_int.
+
+    Encodes an integer as canonical (shortest) P4Runtime bytestring.
+    """
+    return value.to_bytes(max((value.bit_length() + 7) // 8, 1), byteorder='big')
+
+
+def _encode_varint(value):
+    """_encode_varint.
+
+    Encodes an integer as protobuf varint.
+    """
+    encoded = bytearray()
+    while value > 0x7f:
+        encoded.append(value & 0x7f | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
+
+
+def _find_by_name(entities, name, kind):
+    """_find_by_name.
+
+    Returns the p4info entity (table or action) with the given name or alias.
+    """
+    for entity in entities:
+        if name in (entity.preamble.name, entity.preamble.alias):
+            return entity
+    raise ValueError("The p4info has no {} `{}`".format(kind, name))
+
+
+class _UpdateEncoder:
+    """_UpdateEncoder.
+
+    Builds the serialized INSERT updates of both virntup tables with the ids
+    of a p4info, without the p4runtime-shell.
+    """
+
+    def __init__(self, p4info):
+        """__init__.
+
+        Parameters
+        ----------
+        p4info :
+            p4info_pb2.P4Info - p4info of virntup.p4
+        """
+        port_table = _find_by_name(p4info.tables, PORT_MAPPING_TABLE, "table")
+        port_action = _find_by_name(p4info.actions, PORT_MAPPING_ACTION, "action")
+        route_table = _find_by_name(p4info.tables, ROUTE_TABLE, "table")
+        route_action = _find_by_name(p4info.actions, ROUTE_ACTION, "action")
+
+        port_fields = {field.name: field.id for field in port_table.match_fields}
+        port_params = {param.name: param.id for param in port_action.params}
+        route_fields = {field.name: field.id for field in route_table.match_fields}
+        route_params = {param.name: param.id for param in route_action.params}
+
+        self.port_table_id = port_table.preamble.id
+        self.port_action_id = port_action.preamble.id
+        self.ingress_port_field = port_fields["standard_metadata.ingress_port"]
+        self.vRouter_param = port_params["vRouterNumberFromTable"]
+
+        self.route_table_id = route_table.preamble.id
+        self.route_action_id = route_action.preamble.id
+        self.vRouter_field = route_fields["vRouterNumber"]
+        self.address_field = route_fields["hdr.ipv4.dstAddr"]
+        self.mac_param = route_params["dstAddr"]
+        self.port_param = route_params["port"]
+
+    def port_mapping_update(self, port, vRouter_number):
+        """port_mapping_update.
+
+        Returns the serialized INSERT of a port mapping entry.
+        """
+        update = p4runtime_pb2.Update(type=p4runtime_pb2.Update.INSERT)
+        entry = update.entity.table_entry
+        entry.table_id = self.port_table_id
+        match = entry.match.add(field_id=self.ingress_port_field)
+        match.exact.value = _encode_int(port)
+        action = entry.action.action
+        action.action_id = self.port_action_id
+        action.params.add(param_id=self.vRouter_param,
+                          value=_encode_int(vRouter_number))
+        return update.SerializeToString()
+
+    def route_update(self, vRouter_number, network, mac, port):
+        """route_update.
+
+        Returns the serialized INSERT of a routing table entry. Like the
+        p4runtime-shell, a /0 prefix is written as don't care match.
+        """
+        network = ipaddress.IPv4Network(network)
+        update = p4runtime_pb2.Update(type=p4runtime_pb2.Update.INSERT)
+        entry = update.entity.table_entry
+        entry.table_id = self.route_table_id
+        match = entry.match.add(field_id=self.vRouter_field)
+        match.exact.value = _encode_int(vRouter_number)
+        if network.prefixlen > 0:
+            match = entry.match.add(field_id=self.address_field)
+            match.lpm.value = _encode_int(int(network.network_address))
+            match.lpm.prefix_len = network.prefixlen
+        action = entry.action.action
+        action.action_id = self.route_action_id
+        action.params.add(param_id=self.mac_param,
+                          value=_encode_int(int(mac.replace(":", ""), 16)))
+        action.params.add(param_id=self.port_param, value=_encode_int(port))
+        return update.SerializeToString()
+
+
+def _write_record(fd, table, key, update):
+    """_write_record.
+
+    Writes the key of an entry and its serialized update as `updates` field
+    of a WriteRequest.
+    """
+    frame = _UPDATES_TAG + _encode_varint(len(update)) + update
+    if table == PORT_MAPPING:
+        fd.write(_RECORD.pack(TABLE_CODES[table], key, 0, 0, len(frame)))
+    else:
+        network = ipaddress.IPv4Network(key[1])
+        fd.write(_RECORD.pack(TABLE_CODES[table], key[0], int(network.network_address),
+                              network.prefixlen, len(frame)))
+    fd.write(frame)
+
+
+def compile_artifact(controller, p4info, key, fd):
+    """compile_artifact.
+
+    Compiles the table entries of a mapped topology into a deployment
+    artifact. The artifact holds the INSERT updates of both tables in the
+    order of `TopologyController.deploy()`, each one already serialized as
+    `updates` field of a WriteRequest, so `replay_artifact()` only has to
+    concatenate them. The key of every entry is stored with its update, so
+    the installed entries can be journaled and rolled back.
+
+    Layout: MAGIC, VERSION (u8), key (32 bytes), number of port mapping
+    updates (u32), number of route updates (u32), then one record per
+    update: table code (u8), port or vRouter number (u32), network address
+    (u32), prefix length (u8), frame length (u32) and the frame.
+
+    Parameters
+    ----------
+    controller :
+        TopologyController - mapped topology
+    p4info :
+        p4info_pb2.P4Info - p4info the target runs
+    key :
+        bytes - key of the inputs, see `compute_key()`
+    fd :
+        binary file descriptor the artifact is written to
+
+    Returns
+    ----------
+    int : Number of updates in the artifact
+    """
+    if len(key) != KEY_LENGTH:
+        raise ValueError("Artifact keys have {} bytes, got {}".format(KEY_LENGTH, len(key)))
+
+    encoder = _UpdateEncoder(p4info)
+    port_entries, route_entries = controller.get_expected_entries()
+
+    fd.write(MAGIC)
+    fd.write(_U8.pack(VERSION))
+    fd.write(key)
+    fd.write(_U32.pack(len(port_entries)))
+    fd.write(_U32.pack(len(route_entries)))
+
+    for port, vRouter_number in port_entries.items():
+        _write_record(fd, PORT_MAPPING, port,
+                      encoder.port_mapping_update(port, vRouter_number))
+
+    for (vRouter_number, network), (mac, port) in route_entries.items():
+        _write_record(fd, ROUTES, (vRouter_number, network),
+                      encoder.route_update(vRouter_number, network, mac, port))
+
+    logging.info("Compiled {} port mapping and {} route updates".format(
+        len(port_entries), len(route_entries)))
+    return len(port_entries) + len(route_entries)
+
+
+class ArtifactReader:
+    """ArtifactReader.
+
+    Reads the header of a deployment artifact and streams its updates.
+    """
+
+    def __init__(self, fd):
+        """__init__.
+
+        Parameters
+        ----------
+        fd :
+            binary file descriptor of the artifact
+        """
+        self.fd = fd
+
+        header_size = len(MAGIC) + _U8.size + KEY_LENGTH + 2 * _U32.size
+        header = fd.read(header_size)
+        if header[:len(MAGIC)] != MAGIC:
+            raise ValueError("Not a virntup deployment artifact")
+        # Check the length before unpacking anything, a truncated header
+        # would raise a struct.error instead
+        if len(header) < header_size:
+            raise ValueError("Truncated deployment artifact")
+        offset = len(MAGIC)
+        version, = _U8.unpack_from(header, offset)
+        if version != VERSION:
+            raise ValueError("Unsupported deployment artifact version {}".format(version))
+        offset += _U8.size
+
+        self.key = header[offset:offset + KEY_LENGTH]
+        offset += KEY_LENGTH
+        self.port_updates, = _U32.unpack_from(header, offset)
+        self.route_updates, = _U32.unpack_from(header, offset + _U32.size)
+
+    def updates(self):
+        """updates.
+
+        Yields the entry keys and update frames while the artifact is read.
+
+        Yields
+        ----------
+        ((str, key), bytes) : key of the entry as journaled in
+        `installed_entries` of a connector and the serialized `updates`
+        field of a WriteRequest
+        """
+        for _ in range(self.port_updates + self.route_updates):
+            record = self.fd.read(_RECORD.size)
+            if len(record) < _RECORD.size:
+                raise ValueError("Truncated deployment artifact")
+            code, number, address, prefix_len, length = _RECORD.unpack(record)
+            frame = self.fd.read(length)
+            if len(frame) < length:
+                raise ValueError("Truncated deployment artifact")
+
+            table = TABLE_NAMES.get(code)
+            if table == PORT_MAPPING:
+                yield (table, number), frame
+            elif table == ROUTES:
+                network = ipaddress.IPv4Network((address, prefix_len))
+                yield (table, (number, network.compressed)), frame
+            else:
+                raise ValueError("Unknown table code {} in deployment artifact".format(code))
+
+
+def replay_artifact(fd, target_connector, key=None):
+    """replay_artifact.
+
+    Inserts all entries of a deployment artifact. The frames are streamed
+    into WriteRequests of `batch_size` updates without building table
+    entries, see `TargetConnector.write_serialized_updates()`. Like
+    `deploy()` the replay expects tables without entries of the topology and
+    is transactional: if an update is rejected, the installed entries are
+    deleted again.
+
+    Parameters
+    ----------
+    fd :
+        binary file descriptor of the artifact
+    target_connector :
+        TargetConnector - connected target
+    key :
+        (optional) bytes - key of the current inputs, a ValueError is raised
+        if the artifact was compiled from other inputs
+
+    Returns
+    ----------
+    int : Number of written updates
+    """
+    reader = ArtifactReader(fd)
+    if key is not None and reader.key != key:
+        raise ValueError("The deployment artifact was compiled from other inputs (IR, env.json, p4info or options)")
+
+    logging.info("Replaying {} port mapping and {} route updates".format(
+        reader.port_updates, reader.route_updates))
+    deploy_transactionally(target_connector, lambda: target_connector.write_serialized_updates(
+        reader.updates()))
+    return target_connector.written_updates
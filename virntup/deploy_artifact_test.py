@@ -0,0 +1,115 @@
+import io
+import logging
+import unittest
+
+from . import deploy_artifact
+from . import topology_generator
+from .mock_target import MockTarget, build_virntup_p4info
+from .target_configurator import TargetConnector
+from .topology_controller import TopologyController
+from .topology_controller_test import env_fd
+
+logging.basicConfig(level=logging.INFO)
+
+
+def compile_to_buffer(controller, key=b"\x00" * deploy_artifact.KEY_LENGTH):
+    """compile_to_buffer.
+
+    Returns the artifact of a mapped topology as rewound BytesIO.
+    """
+    fd = io.BytesIO()
+    deploy_artifact.compile_artifact(controller, build_virntup_p4info(), key, fd)
+    fd.seek(0)
+    return fd
+
+
+###########################################################
+class TestDeployArtifact(unittest.TestCase):
+    """TestDeployArtifact.
+    """
+
+    def setUp(self):
+        self.mock_target = MockTarget()
+        self.port = self.mock_target.start()
+        self.controller = TopologyController(
+            env_fd(12, 18), topo=topology_generator.generate_topo('large'))
+
+    def tearDown(self):
+        self.mock_target.stop()
+
+    def connect(self, batch_size=1):
+        return TargetConnector("localhost", self.port, batch_size=batch_size)
+
+    def test_replay_installs_expected_entries(self):
+        """test_replay_installs_expected_entries.
+        """
+        port_entries, route_entries = self.controller.get_expected_entries()
+        updates = len(port_entries) + len(route_entries)
+
+        written = deploy_artifact.replay_artifact(
+            compile_to_buffer(self.controller), self.connect(batch_size=50))
+        self.assertEqual(written, updates)
+        self.assertEqual(self.mock_target.servicer.write_requests, -(-updates // 50))
+
+        connector = self.connect()
+        self.assertEqual(connector.read_vRouter_port_mappings(), port_entries)
+        self.assertEqual(connector.read_routes(), route_entries)
+        connector.teardown()
+
+    def test_rejected_replay_is_rolled_back(self):
+        """test_rejected_replay_is_rolled_back.
+        """
+        connector = self.connect()
+        connector.insert_route(4242, "10.0.0.0/24", "02:00:00:00:00:02", 1)
+        connector.insert_vRouter_port_mapping(0, 42)
+        connector.teardown()
+
+        connector = self.connect(batch_size=50)
+        with self.assertRaises(RuntimeError):
+            deploy_artifact.replay_artifact(
+                compile_to_buffer(self.controller), connector)
+
+        # Only the already existing entry of port 0 is rejected, the error
+        # carries the decoded update
+        self.assertEqual(len(connector.write_errors), 1)
+        error = connector.write_errors[0]
+        self.assertEqual((error.batch, error.index), (1, 0))
+        self.assertEqual(error.update.entity.table_entry.match[0].exact.value, b"\x00")
+
+        # All accepted inserts were deleted again, the entries which existed
+        # before the replay are kept
+        connector = self.connect()
+        self.assertEqual(connector.read_vRouter_port_mappings(), {0: 42})
+        self.assertEqual(list(connector.read_routes()), [(4242, "10.0.0.0/24")])
+        connector.teardown()
+
+    def test_stale_artifact_is_rejected(self):
+        """test_stale_artifact_is_rejected.
+        """
+        key = deploy_artifact.compute_key(b"ir", b"env", b"p4info")
+        self.assertNotEqual(key, deploy_artifact.compute_key(b"ir", b"env", b"p4info", vRouter_offset=1))
+        self.assertNotEqual(key, deploy_artifact.compute_key(b"ir2", b"env", b"p4info"))
+
+        artifact = compile_to_buffer(self.controller, key)
+        self.assertEqual(deploy_artifact.ArtifactReader(artifact).key, key)
+
+        artifact.seek(0)
+        with self.assertRaises(ValueError):
+            deploy_artifact.replay_artifact(
+                artifact, self.connect(),
+                key=deploy_artifact.compute_key(b"ir2", b"env", b"p4info"))
+        self.assertEqual(self.mock_target.servicer.write_requests, 0)
+
+    def test_truncated_artifact_is_rejected(self):
+        """test_truncated_artifact_is_rejected.
+        """
+        data = compile_to_buffer(self.controller).getvalue()
+
+        for length in (len(deploy_artifact.MAGIC), len(deploy_artifact.MAGIC) + 10):
+            with self.assertRaises(ValueError):
+                deploy_artifact.ArtifactReader(io.BytesIO(data[:length]))
+
+
+################################################
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,371 @@
+import logging
+import threading
+import time
+from concurrent import futures
+
+import grpc
+from google.rpc import code_pb2, status_pb2
+from p4.config.v1 import p4info_pb2
+from p4.v1 import p4runtime_pb2, p4runtime_pb2_grpc
+
+from .deploy_artifact import load_p4info
+from .target_configurator import PORT_MAPPING_TABLE, PORT_MAPPING_ACTION, ROUTE_TABLE, ROUTE_ACTION
+
+
+# Number of table entries sent in one ReadResponse of a wildcard read
+READ_CHUNK_SIZE = 1000
+
+# Object ids of the built-in p4info, prefixed with the P4Runtime resource type
+_ACTION_ID_PREFIX = 0x01 << 24
+_TABLE_ID_PREFIX = 0x02 << 24
+
+
+def _add_action(p4info, action_id, name, params):
+    """_add_action.
+
+    Adds an action with the given (name, bitwidth) params to a P4Info.
+    """
+    action = p4info.actions.add()
+    action.preamble.id = _ACTION_ID_PREFIX | action_id
+    action.preamble.name = name
+    action.preamble.alias = name.split(".")[-1]
+    for param_id, (param_name, bitwidth) in enumerate(params, start=1):
+        param = action.params.add()
+        param.id = param_id
+        param.name = param_name
+        param.bitwidth = bitwidth
+    return action
+
+
+def _add_table(p4info, table_id, name, match_fields, action, size):
+    """_add_table.
+
+    Adds a table with the given (name, bitwidth, match type) match fields and
+    a single action to a P4Info.
+    """
+    table = p4info.tables.add()
+    table.preamble.id = _TABLE_ID_PREFIX | table_id
+    table.preamble.name = name
+    table.preamble.alias = name.split(".")[-1]
+    for field_id, (field_name, bitwidth, match_type) in enumerate(match_fields, start=1):
+        match_field = table.match_fields.add()
+        match_field.id = field_id
+        match_field.name = field_name
+        match_field.bitwidth = bitwidth
+        match_field.match_type = match_type
+    table.action_refs.add().id = action.preamble.id
+    table.size = size
+    return table
+
+
+def build_virntup_p4info(table_size=1 << 20):
+    """build_virntup_p4info.
+
+    Builds a P4Info which contains the two tables of virntup.p4 that are
+    written by the TargetConnector. It can be used if the p4info of the
+    compiled program is not at hand.
+
+    Parameters
+    ----------
+    table_size :
+        int - Size of both tables
+
+    Returns
+    ----------
+    p4info_pb2.P4Info
+    """
+    p4info = p4info_pb2.P4Info()
+    p4info.pkg_info.arch = "v1model"
+
+    port_mapping_action = _add_action(
+        p4info, 1, PORT_MAPPING_ACTION, [("vRouterNumberFromTable", 32)])
+    route_action = _add_action(
+        p4info, 2, ROUTE_ACTION, [("dstAddr", 48), ("port", 9)])
+
+    _add_table(p4info, 1, PORT_MAPPING_TABLE,
+               [("standard_metadata.ingress_port", 9, p4info_pb2.MatchField.EXACT)],
+               port_mapping_action, table_size)
+    _add_table(p4info, 2, ROUTE_TABLE,
+               [("vRouterNumber", 32, p4info_pb2.MatchField.EXACT),
+                ("hdr.ipv4.dstAddr", 32, p4info_pb2.MatchField.LPM)],
+               route_action, table_size)
+
+    return p4info
+
+
+def _p4_error(code, message=""):
+    """_p4_error.
+
+    Creates the p4runtime_pb2.Error which describes the result of one update.
+    """
+    error = p4runtime_pb2.Error()
+    error.canonical_code = code
+    error.message = message
+    return error
+
+
+class MockP4RuntimeServicer(p4runtime_pb2_grpc.P4RuntimeServicer):
+    """MockP4RuntimeServicer.
+
+    In-memory P4Runtime server. It keeps the entries of the tables described
+    by its p4info and supports the RPCs used by the p4runtime-shell:
+    arbitration, pipeline config, Write and wildcard table Reads.
+    Forwarding is not simulated. Inserts into a full table (see the `size`
+    of the p4info) are rejected, Writes with the ROLLBACK_ON_ERROR atomicity
+    are applied completely or not at all.
+    """
+
+    def __init__(self, p4info, latency=0):
+        """__init__.
+
+        Parameters
+        ----------
+        p4info :
+            p4info_pb2.P4Info - Program whose tables are served
+        latency :
+            float - Delay in seconds added to every Write and Read RPC
+        """
+        self.latency = latency
+        self.lock = threading.Lock()
+
+        self.write_requests = 0
+        self.read_requests = 0
+        self.updates = 0
+        # Set to False to answer ROLLBACK_ON_ERROR Writes with UNIMPLEMENTED
+        self.supports_rollback = True
+
+        self.set_p4info(p4info)
+
+    def set_p4info(self, p4info):
+        """set_p4info.
+
+        Replaces the served program. All table entries are dropped.
+        """
+        with self.lock:
+            self.p4info = p4info
+            self.actions = {table.preamble.id: {ref.id for ref in table.action_refs}
+                            for table in p4info.tables}
+            self.tables = {table_id: {} for table_id in self.actions}
+            self.sizes = {table.preamble.id: table.size for table in p4info.tables}
+
+    def table_entries(self, table_id):
+        """table_entries.
+
+        Returns
+        ----------
+        list of p4runtime_pb2.TableEntry : Current entries of a table
+        """
+        with self.lock:
+            return list(self.tables[table_id].values())
+
+    def _delay(self):
+        """_delay.
+        """
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _apply_update(self, update):
+        """_apply_update.
+
+        Applies a single update to the tables.
+
+        Returns
+        ----------
+        p4runtime_pb2.Error : Result of the update
+        """
+        if not update.entity.HasField("table_entry"):
+            return _p4_error(code_pb2.UNIMPLEMENTED, "Only table entries are supported")
+
+        table_entry = update.entity.table_entry
+        table = self.tables.get(table_entry.table_id)
+        if table is None:
+            return _p4_error(code_pb2.NOT_FOUND, "Unknown table id {}".format(
+                table_entry.table_id))
+
+        key = tuple(sorted(field_match.SerializeToString(deterministic=True)
+                           for field_match in table_entry.match))
+
+        if update.type == p4runtime_pb2.Update.DELETE:
+            if table.pop(key, None) is None:
+                return _p4_error(code_pb2.NOT_FOUND, "Entry does not exist")
+            return _p4_error(code_pb2.OK)
+
+        if table_entry.action.action.action_id not in self.actions[table_entry.table_id]:
+            return _p4_error(code_pb2.INVALID_ARGUMENT, "Invalid action id {} for table {}".format(
+                table_entry.action.action.action_id, table_entry.table_id))
+
+        if update.type == p4runtime_pb2.Update.INSERT and key in table:
+            return _p4_error(code_pb2.ALREADY_EXISTS, "Entry already exists")
+        if update.type == p4runtime_pb2.Update.INSERT and \
+                0 < self.sizes[table_entry.table_id] <= len(table):
+            return _p4_error(code_pb2.RESOURCE_EXHAUSTED, "Table is full")
+        if update.type == p4runtime_pb2.Update.MODIFY and key not in table:
+            return _p4_error(code_pb2.NOT_FOUND, "Entry does not exist")
+
+        stored_entry = p4runtime_pb2.TableEntry()
+        stored_entry.CopyFrom(table_entry)
+        table[key] = stored_entry
+        return _p4_error(code_pb2.OK)
+
+    def Write(self, request, context):
+        """Write.
+        """
+        self._delay()
+
+        rollback = request.atomicity == p4runtime_pb2.WriteRequest.ROLLBACK_ON_ERROR
+        if request.atomicity == p4runtime_pb2.WriteRequest.DATAPLANE_ATOMIC or \
+                rollback and not self.supports_rollback:
+            context.abort(grpc.StatusCode.UNIMPLEMENTED, "Unsupported atomicity {}".format(
+                p4runtime_pb2.WriteRequest.Atomicity.Name(request.atomicity)))
+
+        with self.lock:
+            self.write_requests += 1
+            if rollback:
+                snapshot = {table_id: dict(table) for table_id, table in self.tables.items()}
+            results = [self._apply_update(update)
+                       for update in request.updates]
+
+            if rollback and any(result.canonical_code != code_pb2.OK for result in results):
+                self.tables = snapshot
+                results = [result if result.canonical_code != code_pb2.OK else
+                           _p4_error(code_pb2.ABORTED, "Rolled back")
+                           for result in results]
+
+            self.updates += sum(1 for result in results
+                                if result.canonical_code == code_pb2.OK)
+
+        if all(result.canonical_code == code_pb2.OK for result in results):
+            return p4runtime_pb2.WriteResponse()
+
+        # Per update errors are returned as binary details of an UNKNOWN
+        # status, one p4runtime_pb2.Error per update
+        status = status_pb2.Status(code=code_pb2.UNKNOWN,
+                                   message="Write failure")
+        for result in results:
+            status.details.add().Pack(result)
+        context.set_trailing_metadata(
+            (("grpc-status-details-bin", status.SerializeToString()),))
+        context.abort(grpc.StatusCode.UNKNOWN, "Write failure")
+
+    def Read(self, request, context):
+        """Read.
+        """
+        self._delay()
+
+        with self.lock:
+            self.read_requests += 1
+            entries = []
+            for entity in request.entities:
+                if not entity.HasField("table_entry"):
+                    context.abort(grpc.StatusCode.UNIMPLEMENTED,
+                                  "Only table entries can be read")
+                table_id = entity.table_entry.table_id
+                if table_id == 0:
+                    for table in self.tables.values():
+                        entries.extend(table.values())
+                elif table_id in self.tables:
+                    entries.extend(self.tables[table_id].values())
+                else:
+                    context.abort(grpc.StatusCode.NOT_FOUND,
+                                  "Unknown table id {}".format(table_id))
+
+        for start in range(0, len(entries), READ_CHUNK_SIZE):
+            response = p4runtime_pb2.ReadResponse()
+            for table_entry in entries[start:start + READ_CHUNK_SIZE]:
+                response.entities.add().table_entry.CopyFrom(table_entry)
+            yield response
+
+    def SetForwardingPipelineConfig(self, request, context):
+        """SetForwardingPipelineConfig.
+        """
+        self.set_p4info(request.config.p4info)
+        return p4runtime_pb2.SetForwardingPipelineConfigResponse()
+
+    def GetForwardingPipelineConfig(self, request, context):
+        """GetForwardingPipelineConfig.
+        """
+        response = p4runtime_pb2.GetForwardingPipelineConfigResponse()
+        response.config.p4info.CopyFrom(self.p4info)
+        return response
+
+    def StreamChannel(self, request_iterator, context):
+        """StreamChannel.
+
+        Every client becomes primary. Packet I/O is not supported.
+        """
+        for request in request_iterator:
+            if request.HasField("arbitration"):
+                response = p4runtime_pb2.StreamMessageResponse()
+                response.arbitration.CopyFrom(request.arbitration)
+                response.arbitration.status.code = code_pb2.OK
+                yield response
+
+    def Capabilities(self, request, context):
+        """Capabilities.
+        """
+        return p4runtime_pb2.CapabilitiesResponse(p4runtime_api_version="1.3.0")
+
+
+class MockTarget:
+    """MockTarget.
+
+    Local stand-in for a P4 target. Runs a MockP4RuntimeServicer on a gRPC
+    server, so a TargetConnector can deploy topologies without a switch.
+    """
+
+    def __init__(self, p4info_path=None, latency=0, address="localhost", port=0):
+        """__init__.
+
+        Parameters
+        ----------
+        p4info_path :
+            (optional) str - path to the p4info of virntup.p4. By default a
+            p4info with the tables used by virntup is generated.
+        latency :
+            float - Delay in seconds added to every Write and Read RPC
+        address :
+            str - Address the server listens on
+        port :
+            int - gRPC port, 0 picks a free port
+        """
+        if p4info_path is None:
+            p4info = build_virntup_p4info()
+        else:
+            p4info = load_p4info(p4info_path)
+
+        self.servicer = MockP4RuntimeServicer(p4info, latency)
+        self.address = address
+        self.port = port
+        self.server = None
+
+    def start(self):
+        """start.
+
+        Returns
+        ----------
+        int : gRPC port of the server
+        """
+        self.server = grpc.server(futures.ThreadPoolExecutor(max_workers=8))
+        p4runtime_pb2_grpc.add_P4RuntimeServicer_to_server(
+            self.servicer, self.server)
+        self.port = self.server.add_insecure_port(
+            "{}:{}".format(self.address, self.port))
+        self.server.start()
+
+        logging.info("Mock P4Runtime target listening on {}:{}".format(
+            self.address, self.port))
+        return self.port
+
+    def stop(self):
+        """stop.
+        """
+        if self.server is not None:
+            self.server.stop(grace=None)
+            self.server = None
+
+    def wait(self):
+        """wait.
+
+        Blocks until the server is stopped.
+        """
+        self.server.wait_for_termination()
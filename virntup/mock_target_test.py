@@ -0,0 +1,132 @@
+import logging
+import time
+import unittest
+
+from . import topology_generator
+from .mock_target import MockTarget, build_virntup_p4info
+from .target_configurator import TargetConnector
+from .topology_controller import TopologyController
+from .topology_controller_test import env_fd
+
+logging.basicConfig(level=logging.INFO)
+
+
+###########################################################
+class TestMockTarget(unittest.TestCase):
+    """TestMockTarget.
+    """
+
+    def setUp(self):
+        self.mock_target = MockTarget()
+        self.port = self.mock_target.start()
+
+    def tearDown(self):
+        self.mock_target.stop()
+
+    def connect(self, batch_size=1):
+        return TargetConnector("localhost", self.port, batch_size=batch_size)
+
+    def test_deploy_and_read_back(self):
+        """test_deploy_and_read_back.
+        """
+        controller = TopologyController(
+            env_fd(12, 18), topo=topology_generator.generate_topo('large'))
+        controller.deploy(self.connect(batch_size=50))
+
+        connector = self.connect()
+        port_entries, route_entries = controller.get_expected_entries()
+        self.assertEqual(connector.read_vRouter_port_mappings(), port_entries)
+        self.assertEqual(connector.read_routes(), route_entries)
+        connector.teardown()
+
+        # Nothing changed, so an incremental deploy does not write anything
+        connector = self.connect(batch_size=50)
+        controller.deploy_incremental(connector)
+        self.assertEqual(connector.written_updates, 0)
+
+    def test_rejected_updates_keep_their_index(self):
+        """test_rejected_updates_keep_their_index.
+        """
+        connector = self.connect(batch_size=3)
+        connector.insert_vRouter_port_mapping(1, 1)
+        connector.insert_vRouter_port_mapping(2, 1)
+        connector.insert_vRouter_port_mapping(1, 2)
+
+        self.assertEqual([error.index for error in connector.write_errors], [2])
+        self.assertEqual(connector.written_updates, 2)
+        self.assertEqual(connector.read_vRouter_port_mappings(), {1: 1, 2: 1})
+        connector.teardown()
+
+    def test_rejected_deploy_is_rolled_back_and_cleared(self):
+        """test_rejected_deploy_is_rolled_back_and_cleared.
+        """
+        controller = TopologyController(
+            env_fd(12, 18), topo=topology_generator.generate_topo('large'))
+        connector = self.connect()
+        connector.insert_vRouter_port_mapping(0, 42)
+        connector.insert_route(4242, "10.0.0.0/24", "02:00:00:00:00:02", 1)
+        connector.teardown()
+
+        connector = self.connect(batch_size=50)
+        with self.assertRaises(RuntimeError):
+            controller.deploy(connector)
+
+        # The rollback removed the accepted inserts, the rejected mapping of
+        # port 0 belongs to someone else and is kept
+        connector = self.connect()
+        self.assertEqual(connector.read_vRouter_port_mappings(), {0: 42})
+        self.assertEqual(list(connector.read_routes()), [(4242, "10.0.0.0/24")])
+
+        write_requests = self.mock_target.servicer.write_requests
+        self.assertEqual(connector.clear_tables(), (1, 1))
+        self.assertEqual(self.mock_target.servicer.write_requests - write_requests, 1)
+        self.assertEqual(connector.read_vRouter_port_mappings(), {})
+        self.assertEqual(connector.read_routes(), {})
+        connector.teardown()
+
+    def test_rejected_activation_keeps_previous_mapping(self):
+        """test_rejected_activation_keeps_previous_mapping.
+        """
+        # The port mapping table only has room for 10 entries
+        p4info = build_virntup_p4info()
+        p4info.tables[0].size = 10
+        self.mock_target.servicer.set_p4info(p4info)
+
+        active = TopologyController(
+            env_fd(12, 18), topo=topology_generator.generate_topo('medium'))
+        staged = TopologyController(
+            env_fd(12, 18), topo=topology_generator.generate_topo('large'),
+            vRouter_offset=1000)
+        active.deploy(self.connect(batch_size=50))
+        staged.stage(self.connect(batch_size=50))
+        active_ports, _ = active.get_expected_entries()
+
+        for supports_rollback in (True, False):
+            self.mock_target.servicer.supports_rollback = supports_rollback
+            connector = self.connect(batch_size=50)
+            with self.assertRaises(RuntimeError):
+                staged.activate(connector)
+            self.assertEqual(connector.batch_size, 50)
+
+            connector = self.connect()
+            self.assertEqual(connector.read_vRouter_port_mappings(), active_ports)
+            connector.teardown()
+
+    def test_latency_is_added_per_request(self):
+        """test_latency_is_added_per_request.
+        """
+        self.mock_target.servicer.latency = 0.05
+        connector = self.connect(batch_size=10)
+        start = time.perf_counter()
+        for port in range(10):
+            connector.insert_vRouter_port_mapping(port, 1)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05)
+        connector.teardown()
+
+        self.assertEqual(self.mock_target.servicer.write_requests, 1)
+        self.assertEqual(self.mock_target.servicer.updates, 10)
+
+
+################################################
+if __name__ == '__main__':
+    unittest.main()
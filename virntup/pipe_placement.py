@@ -0,0 +1,380 @@
+import logging
+from collections import deque
+
+
+# Placement strategies of the TopologyController. `file` hands out wire loops
+# and host links in the order of the env.json, `pipe` uses
+# `get_pipe_aware_pools()`.
+PLACEMENT_STRATEGIES = ['file', 'pipe']
+
+# Latency model of the placement report: Every pass through the switch
+# pipeline costs HOP_LATENCY_NS, a pass from the ingress pipe of one pipe to
+# the egress pipe of another additionally CROSS_PIPE_LATENCY_NS.
+HOP_LATENCY_NS = 500
+CROSS_PIPE_LATENCY_NS = 150
+
+
+def get_port_metadata(env):
+    """get_port_metadata.
+
+    Returns the optional port metadata of an env.json. It is given as
+
+    ```
+    "ports": {
+        "<port>": {"pipe": 0, "speed": 100},
+        ...
+    }
+    ```
+
+    with the speed in Gbit/s. Ports without metadata are treated as
+    belonging to an unknown pipe (None).
+
+    Parameters
+    ----------
+    env :
+        dict - parsed env.json
+
+    Returns
+    ----------
+    dict : {int port: dict metadata}
+    """
+    return {int(port): metadata for port, metadata in env.get("ports", {}).items()}
+
+
+def get_pipe(metadata, port):
+    """get_pipe.
+
+    Parameters
+    ----------
+    metadata :
+        dict - port metadata, see `get_port_metadata()`
+    port :
+        int - physical port
+
+    Returns
+    ----------
+    int or None : pipe of the port
+    """
+    return metadata.get(int(port), {}).get("pipe")
+
+
+def _get_subtree_demands(ir):
+    """_get_subtree_demands.
+
+    Returns {vRouter id: (wire loops, host links)} needed by the subtree
+    below each vRouter. The vRouters of the IR are in pre-order, so walking
+    them backwards visits all vRouters below a vRouter first.
+    """
+    demands = {}
+    for router_id in reversed(list(ir['vRouter'])):
+        loops = 0
+        host_links = 0
+        for _, neighbour_id, neighbour_type in ir['vRouter'][router_id]["neighbors"]:
+            if neighbour_type == 'vRouter':
+                below_loops, below_host_links = demands[neighbour_id]
+                loops += below_loops + 1
+                host_links += below_host_links
+            else:
+                host_links += 1
+        demands[router_id] = (loops, host_links)
+    return demands
+
+
+class _PipeResources:
+    """_PipeResources.
+
+    Free wire loops and host links, grouped by pipe.
+    """
+
+    def __init__(self, env, metadata):
+        """__init__.
+        """
+        # {(pipe, pipe): deque of loops}, loops connecting two pipes are
+        # stored for both orientations and handed out once
+        self.loops = {}
+        self.host_links = {}
+        self.used = set()
+
+        for loop in env["links"]:
+            local_pipe = get_pipe(metadata, loop[0])
+            remote_pipe = get_pipe(metadata, loop[1])
+            self.loops.setdefault((local_pipe, remote_pipe), deque()).append(
+                (loop[0], loop[1]))
+            if local_pipe != remote_pipe:
+                self.loops.setdefault((remote_pipe, local_pipe), deque()).append(
+                    (loop[1], loop[0]))
+
+        for host_link in env["host_links"]:
+            self.host_links.setdefault(
+                get_pipe(metadata, host_link[1]), deque()).append(host_link)
+
+        self.pipes = sorted(set(pipe for pipes in self.loops for pipe in pipes) |
+                            set(self.host_links), key=lambda pipe: (pipe is None, pipe))
+
+    def free_loops(self, pipe):
+        """free_loops.
+
+        Number of free wire loops with both ends in `pipe`.
+        """
+        return len(self.loops.get((pipe, pipe), ()))
+
+    def free_host_links(self, pipe):
+        """free_host_links.
+        """
+        return len(self.host_links.get(pipe, ()))
+
+    def fits(self, pipe, demand):
+        """fits.
+        """
+        return self.free_loops(pipe) >= demand[0] and self.free_host_links(pipe) >= demand[1]
+
+    def least_used_pipe(self):
+        """least_used_pipe.
+
+        Returns the pipe with the most free resources.
+        """
+        return max(self.pipes, key=lambda pipe: self.free_loops(pipe) + self.free_host_links(pipe))
+
+    def take_loop(self, *orientations):
+        """take_loop.
+
+        Returns a free loop `(local port, remote port)` of the first
+        `(local pipe, remote pipe)` orientation which has one, or of any other
+        orientation.
+        """
+        candidates = list(orientations) + list(self.loops)
+        for key in candidates:
+            pool = self.loops.get(key)
+            while pool:
+                loop = pool.popleft()
+                if frozenset(loop) not in self.used:
+                    self.used.add(frozenset(loop))
+                    return loop
+        raise RuntimeError("The environment has no wire loop left")
+
+    def take_host_link(self, pipe):
+        """take_host_link.
+
+        Returns a free host link of `pipe` or of the pipe with the most free
+        host links.
+        """
+        if not self.free_host_links(pipe):
+            pipe = max(self.pipes, key=self.free_host_links)
+        return self.host_links[pipe].popleft()
+
+    def remaining(self):
+        """remaining.
+
+        Returns the unused wire loops and host links.
+        """
+        loops = []
+        for pool in self.loops.values():
+            for loop in pool:
+                if frozenset(loop) not in self.used:
+                    self.used.add(frozenset(loop))
+                    loops.append(list(loop))
+        host_links = [link for pool in self.host_links.values() for link in pool]
+        return loops, host_links
+
+
+def get_pipe_aware_pools(ir, env):
+    """get_pipe_aware_pools.
+
+    Orders the wire loops and host links of the environment, so that the
+    TopologyController, which hands them out in IR order, places each
+    subtree in as few pipes as possible:
+
+    - Every vRouter has a home pipe. The root starts in the pipe with the
+      most free resources.
+    - A vRouter below stays in the home pipe of its parent if the pipe has
+      enough free wire loops and host links for its whole subtree.
+      Otherwise the subtree moves to the pipe with the most free resources
+      which fits it, which spreads big subtrees over the pipes. If no pipe
+      fits, the subtree stays and is split further down.
+    - A vRouter is linked to its parent with a loop between both home pipes
+      if the environment has one, Hosts get host links of the home pipe.
+
+    Parameters
+    ----------
+    ir :
+        dict - IR of the topology
+    env :
+        dict - parsed env.json with port metadata
+
+    Returns
+    ----------
+    (list, list) : Wire loops as `[local port, remote port]` and host links
+    in the order they are used, followed by the unused ones
+    """
+    metadata = get_port_metadata(env)
+    if not metadata:
+        logging.warning(
+            "env.json contains no port metadata, the placement is not pipe aware")
+
+    resources = _PipeResources(env, metadata)
+    demands = _get_subtree_demands(ir)
+
+    loops = []
+    host_links = []
+    home_pipes = {}
+    for router_id, router in ir['vRouter'].items():
+        if router_id not in home_pipes:
+            home_pipes[router_id] = resources.least_used_pipe()
+        home = home_pipes[router_id]
+
+        for _, neighbour_id, neighbour_type in router["neighbors"]:
+            if neighbour_type == 'host':
+                host_links.append(resources.take_host_link(home))
+                continue
+
+            demand = demands[neighbour_id]
+            if resources.fits(home, (demand[0] + 1, demand[1])):
+                pipe = home
+            else:
+                fitting = [pipe for pipe in resources.pipes
+                           if pipe != home and resources.fits(pipe, (demand[0] + 1, demand[1]))]
+                if fitting:
+                    pipe = max(fitting, key=lambda p: resources.free_loops(p) + resources.free_host_links(p))
+                elif resources.free_loops(home) or resources.free_host_links(home):
+                    pipe = home
+                else:
+                    pipe = resources.least_used_pipe()
+
+            home_pipes[neighbour_id] = pipe
+            loops.append(list(resources.take_loop(
+                (home, pipe), (pipe, pipe), (home, home))))
+
+    remaining_loops, remaining_host_links = resources.remaining()
+    return loops + remaining_loops, host_links + remaining_host_links
+
+
+def analyze_placement(controller, hop_latency=HOP_LATENCY_NS, cross_pipe_latency=CROSS_PIPE_LATENCY_NS):
+    """analyze_placement.
+
+    Predicts the cost of the host to host paths of a mapped topology. A
+    packet passes the switch once per vRouter on its path and crosses pipes
+    if the ingress and egress port of the pass are in different pipes.
+
+    The statistics over all (ordered) host pairs are calculated per vRouter
+    from the number of hosts behind each of its ports, the maximum with a
+    tree walk, so no path is enumerated.
+
+    Parameters
+    ----------
+    controller :
+        TopologyController - mapped topology
+    hop_latency :
+        int - latency of a pass through the switch in ns
+    cross_pipe_latency :
+        int - additional latency of a pass crossing pipes in ns
+
+    Returns
+    ----------
+    dict : `paths`, `mean_hops`, `mean_cross_pipe`, `mean_latency_ns`,
+    `max_latency_ns` and the used `ports_per_pipe`
+    """
+    ir = controller.ir
+    metadata = get_port_metadata(controller.env)
+
+    hosts_below = {}
+    for router_id in reversed(list(ir['vRouter'])):
+        hosts_below[router_id] = sum(
+            hosts_below[neighbour_id] if neighbour_type == 'vRouter' else 1
+            for _, neighbour_id, neighbour_type in ir['vRouter'][router_id]["neighbors"])
+
+    root = next(iter(ir['vRouter']))
+    hosts = hosts_below[root]
+
+    hop_sum = 0
+    cross_sum = 0
+    ports_per_pipe = {}
+    # Maximum latency from the uplink of a vRouter down to one of its hosts
+    max_down = {}
+    max_latency = 0
+    for router_id in reversed(list(ir['vRouter'])):
+        ports = controller.port_mapping[router_id]
+        uplink_pipe = None if router_id == root else get_pipe(metadata, ports[0])
+
+        # (pipe, hosts behind, maximum latency behind) of every port
+        behind = []
+        for port, neighbour_id, neighbour_type in ir['vRouter'][router_id]["neighbors"]:
+            pipe = get_pipe(metadata, controller.port_of(router_id, port))
+            if neighbour_type == 'vRouter':
+                behind.append((pipe, hosts_below[neighbour_id], max_down[neighbour_id]))
+            else:
+                behind.append((pipe, 1, 0))
+
+        for pipe in [uplink_pipe] * (router_id != root) + [entry[0] for entry in behind]:
+            ports_per_pipe[pipe] = ports_per_pipe.get(pipe, 0) + 1
+
+        host_counts = [(pipe, count) for pipe, count, _ in behind]
+        if router_id != root:
+            host_counts.append((uplink_pipe, hosts - hosts_below[router_id]))
+
+        per_pipe = {}
+        for pipe, count in host_counts:
+            per_pipe[pipe] = per_pipe.get(pipe, 0) + count
+        hop_sum += hosts * hosts - sum(count * count for _, count in host_counts)
+        cross_sum += hosts * hosts - sum(count * count for count in per_pipe.values())
+
+        if router_id != root:
+            max_down[router_id] = max(
+                [hop_latency + cross_pipe_latency * (pipe != uplink_pipe) + latency
+                 for pipe, _, latency in behind] or [0])
+
+        # Longest path turning at this vRouter: the two longest branches of
+        # one pipe or the longest branches of two pipes
+        best_per_pipe = {}
+        for pipe, _, latency in behind:
+            best_per_pipe.setdefault(pipe, []).append(latency)
+        tops = []
+        for pipe, latencies in best_per_pipe.items():
+            latencies.sort(reverse=True)
+            if len(latencies) > 1:
+                max_latency = max(max_latency, hop_latency + latencies[0] + latencies[1])
+            tops.append(latencies[0])
+        if len(tops) > 1:
+            tops.sort(reverse=True)
+            max_latency = max(max_latency, hop_latency + cross_pipe_latency + tops[0] + tops[1])
+
+    paths = hosts * (hosts - 1)
+    return {
+        "paths": paths,
+        "mean_hops": hop_sum / paths if paths else 0,
+        "mean_cross_pipe": cross_sum / paths if paths else 0,
+        "mean_latency_ns": (hop_sum * hop_latency + cross_sum * cross_pipe_latency) / paths if paths else 0,
+        "max_latency_ns": max_latency,
+        "ports_per_pipe": {str(pipe): count for pipe, count in sorted(
+            ports_per_pipe.items(), key=lambda item: (item[0] is None, item[0]))}
+    }
+
+
+def format_report(reports):
+    """format_report.
+
+    Formats the results of `analyze_placement()` of several placements as a
+    table.
+
+    Parameters
+    ----------
+    reports :
+        dict - {placement strategy: result of `analyze_placement()`}
+    """
+    rows = [
+        ("host pairs", "paths", "{}"),
+        ("mean vRouter hops", "mean_hops", "{:.2f}"),
+        ("mean pipe crossings", "mean_cross_pipe", "{:.2f}"),
+        ("mean latency [ns]", "mean_latency_ns", "{:.0f}"),
+        ("max latency [ns]", "max_latency_ns", "{:.0f}"),
+    ]
+    strategies = list(reports)
+
+    lines = ["{:<22}".format("") + "".join("{:>14}".format(s) for s in strategies)]
+    for title, key, value_format in rows:
+        lines.append("{:<22}".format(title) + "".join(
+            "{:>14}".format(value_format.format(reports[s][key])) for s in strategies))
+    for strategy in strategies:
+        lines.append("ports per pipe ({}): {}".format(
+            strategy, ", ".join("{}: {}".format(pipe, count)
+                                for pipe, count in reports[strategy]["ports_per_pipe"].items())))
+    return "\n".join(lines)
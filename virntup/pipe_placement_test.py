@@ -0,0 +1,139 @@
+import io
+import json
+import logging
+import unittest
+
+from . import pipe_placement
+from . import topology_generator
+from .simulator import DataPlaneSimulator
+from .topology_controller import TopologyController
+
+logging.basicConfig(level=logging.INFO)
+
+
+def pipe_env_fd(pipes, links_per_pipe, host_links_per_pipe):
+    """pipe_env_fd.
+
+    Returns an env.json with port metadata, whose wire loops and host links
+    are listed round robin over the pipes, so handing them out in file order
+    spreads every subtree over all pipes.
+    """
+    env = {"links": [], "host_links": [], "ports": {}}
+    for i in range(links_per_pipe):
+        for pipe in range(pipes):
+            port = pipe * 128 + 2 * i
+            env["links"].append([port, port + 1])
+            env["ports"][str(port)] = {"pipe": pipe, "speed": 100}
+            env["ports"][str(port + 1)] = {"pipe": pipe, "speed": 100}
+    for i in range(host_links_per_pipe):
+        for pipe in range(pipes):
+            port = pipe * 128 + 64 + i
+            env["host_links"].append(["h{}".format(len(env["host_links"]) + 1), port])
+            env["ports"][str(port)] = {"pipe": pipe, "speed": 100}
+    return io.StringIO(json.dumps(env))
+
+
+def brute_force_cross_pipe(controller):
+    """brute_force_cross_pipe.
+
+    Returns the mean number of vRouter passes and pipe crossings over all host
+    pairs by walking every path.
+    """
+    ir = controller.ir
+    metadata = pipe_placement.get_port_metadata(controller.env)
+    root = next(iter(ir['vRouter']))
+
+    # {node id: (parent vRouter id, port of the parent)}
+    parents = {}
+    for router_id, router in ir['vRouter'].items():
+        for port, neighbour_id, _ in router["neighbors"]:
+            parents[neighbour_id] = (router_id, port)
+
+    def pipe_of(router_id, port):
+        ports = controller.port_mapping[router_id]
+        if port is None:
+            return pipe_placement.get_pipe(metadata, ports[0])
+        return pipe_placement.get_pipe(metadata, controller.port_of(router_id, port))
+
+    def path_up(node_id):
+        # [(vRouter id, port the packet arrives or leaves on)]
+        path = []
+        while node_id != root:
+            router_id, port = parents[node_id]
+            path.append((router_id, port))
+            node_id = router_id
+        return path
+
+    hosts = list(ir['Host'])
+    hops = 0
+    crossings = 0
+    for src in hosts:
+        for dst in hosts:
+            if src == dst:
+                continue
+            up = path_up(src)
+            down = path_up(dst)
+            while len(up) > 1 and len(down) > 1 and up[-2][0] == down[-2][0]:
+                up.pop()
+                down.pop()
+            turn = (up[-1][0], up[-1][1], down[-1][1])
+            passes = [(r, p, None) for r, p in up[:-1]] + [turn] + \
+                [(r, None, p) for r, p in reversed(down[:-1])]
+            for router_id, ingress, egress in passes:
+                hops += 1
+                crossings += pipe_of(router_id, ingress) != pipe_of(router_id, egress)
+
+    paths = len(hosts) * (len(hosts) - 1)
+    return hops / paths, crossings / paths
+
+
+###########################################################
+class TestPipePlacement(unittest.TestCase):
+    """TestPipePlacement.
+    """
+
+    def test_pipe_placement_reduces_cross_pipe_hops(self):
+        """test_pipe_placement_reduces_cross_pipe_hops.
+        """
+        topo = topology_generator.generate_topo('large')
+        reports = {}
+        for placement in pipe_placement.PLACEMENT_STRATEGIES:
+            controller = TopologyController(
+                pipe_env_fd(4, 8, 8), topo=topo, placement=placement)
+            reports[placement] = pipe_placement.analyze_placement(controller)
+
+            result = DataPlaneSimulator(controller).run()
+            self.assertEqual(list(result.failed_pairs()), [])
+
+        self.assertEqual(reports['pipe']['mean_hops'], reports['file']['mean_hops'])
+        self.assertLess(reports['pipe']['mean_cross_pipe'],
+                        reports['file']['mean_cross_pipe'] / 2)
+        self.assertLess(reports['pipe']['max_latency_ns'],
+                        reports['file']['max_latency_ns'])
+
+    def test_analysis_matches_path_enumeration(self):
+        """test_analysis_matches_path_enumeration.
+        """
+        topo = topology_generator.generate_topo(
+            'random', routers=15, hosts=25, seed=5)
+        for placement in pipe_placement.PLACEMENT_STRATEGIES:
+            controller = TopologyController(
+                pipe_env_fd(3, 6, 9), topo=topo, placement=placement)
+            report = pipe_placement.analyze_placement(controller)
+            mean_hops, mean_cross_pipe = brute_force_cross_pipe(controller)
+
+            self.assertAlmostEqual(report['mean_hops'], mean_hops)
+            self.assertAlmostEqual(report['mean_cross_pipe'], mean_cross_pipe)
+
+    def test_invalid_placement_is_rejected(self):
+        """test_invalid_placement_is_rejected.
+        """
+        with self.assertRaises(ValueError):
+            TopologyController(pipe_env_fd(2, 2, 2),
+                               topo=topology_generator.generate_topo('minimal'),
+                               placement='random')
+
+
+################################################
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from . import topology
+from .topology_controller import TopologyController
+
+
+class ArtifactWriter:
+    """ArtifactWriter.
+
+    Writes artifacts (IR, host config, DOT representation) in a background
+    thread, so storing them overlaps with the deployment. The written data
+    must not be changed after it was handed to the writer.
+    """
+
+    def __init__(self):
+        """__init__.
+        """
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._futures = []
+
+    def write_json(self, data, fd, indent=4):
+        """write_json.
+
+        Parameters
+        ----------
+        data :
+            json serializable data
+        fd :
+            file descriptor the json is written to. It is closed afterwards.
+        indent :
+            int (default: 4) - indentation of the json file
+        """
+        def write():
+            with fd:
+                json.dump(data, fd, indent=indent)
+            logging.info("Stored {}".format(fd.name))
+
+        self._futures.append(self._executor.submit(write))
+
+    def write_dot(self, topo, fd, with_routingtable=True, **options):
+        """write_dot.
+
+        Parameters
+        ----------
+        topo :
+            V_topology - topology whose DOT representation is stored
+        fd :
+            file descriptor the DOT representation is streamed to. It is
+            closed afterwards.
+        with_routingtable :
+            Bool (default: True) - add the routing tables to the vRouters
+        options :
+            collapse and routing table options, see
+            `topology.write_dot_representation()`
+        """
+        def write():
+            with fd:
+                topology.write_dot_representation(
+                    topo, fd, with_routingtable, **options)
+            logging.info("Stored {}".format(fd.name))
+
+        self._futures.append(self._executor.submit(write))
+
+    def wait(self):
+        """wait.
+
+        Waits until all artifacts are stored. Errors of the background writes
+        are raised here.
+        """
+        self._executor.shutdown(wait=True)
+        for future in self._futures:
+            future.result()
+
+
+def run_up(topo, env_fd, connect, ir_fd=None, host_fd=None, dot_fd=None, incremental=False,
+           dot_options=None, placement='file'):
+    """run_up.
+
+    Maps and deploys an in-memory topology in a single process. The topology
+    is neither serialized nor parsed again, artifacts are only stored if a
+    file descriptor is given and are written while the deployment runs.
+
+    Parameters
+    ----------
+    topo :
+        V_topology - topology with calculated routing tables
+    env_fd :
+        file descriptor for the env.json file
+    connect :
+        callable - returns the target_connector the topology is deployed with.
+        It is called after the mapping was created.
+    ir_fd :
+        (optional) file descriptor the IR is stored to
+    host_fd :
+        (optional) file descriptor the host config is stored to
+    dot_fd :
+        (optional) file descriptor the DOT representation is stored to
+    incremental :
+        Bool (default: False) - only write the difference to the current
+        table entries of the target
+    dot_options :
+        dict (optional) - options of the DOT representation, see
+        `topology.write_dot_representation()`
+    placement :
+        str (default: 'file') - placement strategy of the wire loops and host
+        links, see `TopologyController`
+
+    Returns
+    ----------
+    (TopologyController, target_connector) : controller holding the deployed
+    mapping and the connector used for the deployment. Raises a RuntimeError
+    if the topology can not be deployed, e.g. for an IPv6 address space.
+    """
+    writer = ArtifactWriter()
+    try:
+        if dot_fd is not None:
+            writer.write_dot(topo, dot_fd, **(dot_options or {}))
+
+        controller = TopologyController(env_fd, topo=topo, placement=placement)
+        # Fails for IPv6 topologies before any artifact is written
+        controller.get_address_space()
+
+        if ir_fd is not None:
+            writer.write_json(controller.ir, ir_fd)
+        if host_fd is not None:
+            writer.write_json(controller.host_env, host_fd)
+
+        connector = connect()
+        if incremental:
+            controller.deploy_incremental(connector)
+        else:
+            controller.deploy(connector)
+    finally:
+        writer.wait()
+
+    return controller, connector
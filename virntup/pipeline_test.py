@@ -0,0 +1,67 @@
+import io
+import json
+import logging
+import os
+import tempfile
+import unittest
+
+from . import topology_generator
+from .pipeline import run_up
+from .topology_controller import TopologyController
+from .topology_controller_test import FakeConnector, env_fd
+
+logging.basicConfig(level=logging.INFO)
+
+
+###########################################################
+class TestPipeline(unittest.TestCase):
+    """TestPipeline.
+    """
+
+    def test_up_deploys_and_stores_artifacts(self):
+        """test_up_deploys_and_stores_artifacts.
+        """
+        connector = FakeConnector(batch_size=100)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            ir_path = os.path.join(tmp_dir, "ir.json")
+            host_path = os.path.join(tmp_dir, "host.json")
+
+            _, used_connector = run_up(
+                topology_generator.generate_topo('large'),
+                env_fd(12, 18),
+                lambda: connector,
+                ir_fd=open(ir_path, 'w'),
+                host_fd=open(host_path, 'w'))
+
+            with open(ir_path) as ir_fd:
+                ir = json.load(ir_fd)
+            with open(host_path) as host_fd:
+                host_env = json.load(host_fd)
+
+        self.assertIs(used_connector, connector)
+        self.assertTrue(connector.torn_down)
+
+        # The stored artifacts equal the ones of the multi stage workflow
+        reference = TopologyController(env_fd(12, 18), ir_fd=io.StringIO(json.dumps(ir)))
+        self.assertEqual(ir, topology_generator.generate_topo(
+            'large').get_IR_representation())
+        self.assertEqual(host_env, reference.host_env)
+
+        port_entries, route_entries = reference.get_expected_entries()
+        self.assertEqual(connector.port_table, port_entries)
+        self.assertEqual(connector.route_table, route_entries)
+
+    def test_artifacts_are_optional(self):
+        """test_artifacts_are_optional.
+        """
+        connector = FakeConnector()
+        run_up(topology_generator.generate_topo('minimal'),
+               env_fd(0, 2), lambda: connector)
+
+        self.assertEqual(connector.written_updates, 5)
+
+
+################################################
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import logging
+
+from . import pipe_placement
+
+
+# FEC of ports without `fec` in the port metadata of the env.json
+DEFAULT_FEC = "NONE"
+
+# Speed in Gbit/s of ports without `speed` in the port metadata
+DEFAULT_SPEED = 100
+
+
+def get_used_ports(controller):
+    """get_used_ports.
+
+    Returns the physical ports of the mapped topology, i.e. the ends of all
+    assigned wire loops and host links.
+
+    Parameters
+    ----------
+    controller :
+        TopologyController - mapped topology
+    """
+    return sorted({int(port) for ports in controller.port_mapping.values() for port in ports})
+
+
+def generate_port_setup(controller, clear=False):
+    """generate_port_setup.
+
+    Generates the bf_shell commands which add and enable only the ports the
+    mapped topology uses. All ports of the env.json are deleted first, so
+    ports an earlier topology enabled go down and a redeploy does not add
+    existing ports again. Ports which are not part of the env.json, e.g. of
+    other tenants, are left untouched. Speed, FEC and the front panel name
+    (`fp`, e.g. `"1/0"`) of a port are taken from the port metadata of the
+    env.json:
+
+    ```
+    "ports": {
+        "132": {"pipe": 1, "fp": "1/0", "speed": 100, "fec": "RS"},
+        ...
+    }
+    ```
+
+    Parameters
+    ----------
+    controller :
+        TopologyController - mapped topology
+    clear :
+        bool (default: False) - Delete all ports of the switch instead of
+        the ports of the env.json (also the ports of other topologies on the
+        same switch)
+
+    Returns
+    ----------
+    list of list of str : Batches of commands. The first batch enters the
+    port manager and deletes the ports, every further batch adds and enables
+    the ports of one pipe
+    """
+    metadata = pipe_placement.get_port_metadata(controller.env)
+    ports = get_used_ports(controller)
+
+    missing = [port for port in ports if "fp" not in metadata.get(port, {})]
+    if missing:
+        raise ValueError("The port metadata of the env.json has no front panel port (`fp`) for ports {}".format(
+            missing))
+
+    per_pipe = {}
+    for port in ports:
+        per_pipe.setdefault(pipe_placement.get_pipe(metadata, port), []).append(port)
+
+    if clear:
+        port_deletes = ["port-del -/-"]
+    else:
+        # Ports without front panel name can not be addressed, they are
+        # neither used nor enabled by virntup
+        port_deletes = ["port-del {}".format(metadata[port]["fp"])
+                        for port in sorted(controller.get_env_ports())
+                        if "fp" in metadata.get(port, {})]
+
+    batches = [["ucli", "pm"] + port_deletes]
+    for pipe in sorted(per_pipe, key=lambda pipe: (pipe is None, pipe)):
+        port_adds = []
+        port_enables = []
+        for port in per_pipe[pipe]:
+            port_metadata = metadata[port]
+            port_adds.append("port-add {} {}G {}".format(
+                port_metadata["fp"], port_metadata.get("speed", DEFAULT_SPEED),
+                port_metadata.get("fec", DEFAULT_FEC)))
+            port_enables.append("port-enb {}".format(port_metadata["fp"]))
+        batches.append(port_adds + port_enables)
+
+        logging.debug("Port setup of pipe {}: {}".format(pipe, per_pipe[pipe]))
+
+    logging.info("Port setup for {} ports in {} pipes".format(len(ports), len(per_pipe)))
+    return batches
+
+
+def write_port_setup(batches, fd):
+    """write_port_setup.
+
+    Writes the commands of `generate_port_setup()` as a port configuration
+    file, which can be passed to `deploy --port_config`.
+    """
+    for batch in batches:
+        for command in batch:
+            fd.write(command + "\n")
+
+
+def run_port_setup(client, batches):
+    """run_port_setup.
+
+    Sends the batches of `generate_port_setup()` to the bf_shell. The
+    commands of a batch are pipelined, the next batch starts once all
+    commands of the previous one are answered.
+
+    Parameters
+    ----------
+    client :
+        bf_shell.BfShellClient - connected client
+    batches :
+        list of list of str - command batches
+
+    Returns
+    ----------
+    list of bf_shell.BfShellResult : Results of all commands
+    """
+    results = []
+    for batch in batches:
+        results.extend(client.run_commands(batch, window=len(batch)))
+    return results
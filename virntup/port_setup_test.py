@@ -0,0 +1,85 @@
+import io
+import json
+import logging
+import unittest
+
+from . import port_setup
+from . import topology_generator
+from .bf_shell import BfShellClient
+from .bf_shell_test import FakeBfShell
+from .topology_controller import TopologyController
+
+logging.basicConfig(level=logging.INFO)
+
+
+def tofino_env_fd(with_front_panel=True):
+    """tofino_env_fd.
+
+    Returns an env.json with more wire loops and host links than the medium
+    topology needs, spread over two pipes.
+    """
+    env = {
+        "links": [[0, 1], [128, 129], [2, 3]],
+        "host_links": [["h1", 130], ["h2", 4], ["h3", 131]],
+        "ports": {}
+    }
+    for port in (0, 1, 2, 3, 4, 128, 129, 130, 131):
+        env["ports"][str(port)] = {"pipe": port // 128, "speed": 100 if port % 2 else 25}
+        if with_front_panel:
+            env["ports"][str(port)]["fp"] = "{}/{}".format(port // 4 + 1, port % 4)
+    env["ports"]["1"]["fec"] = "RS"
+    return io.StringIO(json.dumps(env))
+
+
+###########################################################
+class TestPortSetup(unittest.TestCase):
+    """TestPortSetup.
+    """
+
+    def test_only_used_ports_are_enabled(self):
+        """test_only_used_ports_are_enabled.
+        """
+        # Loop 0 - 1 and host links 130 and 4 are used, all ports of the
+        # env.json are deleted first
+        controller = TopologyController(
+            tofino_env_fd(), topo=topology_generator.generate_topo('medium'))
+        batches = port_setup.generate_port_setup(controller)
+
+        self.assertEqual(batches, [
+            ["ucli", "pm", "port-del 1/0", "port-del 1/1", "port-del 1/2", "port-del 1/3",
+             "port-del 2/0", "port-del 33/0", "port-del 33/1", "port-del 33/2", "port-del 33/3"],
+            ["port-add 1/0 25G NONE", "port-add 1/1 100G RS", "port-add 2/0 25G NONE",
+             "port-enb 1/0", "port-enb 1/1", "port-enb 2/0"],
+            ["port-add 33/2 25G NONE", "port-enb 33/2"]
+        ])
+
+    def test_ports_without_front_panel_are_rejected(self):
+        """test_ports_without_front_panel_are_rejected.
+        """
+        controller = TopologyController(
+            tofino_env_fd(with_front_panel=False), topo=topology_generator.generate_topo('medium'))
+        with self.assertRaises(ValueError):
+            port_setup.generate_port_setup(controller)
+
+    def test_batches_are_sent_to_the_shell(self):
+        """test_batches_are_sent_to_the_shell.
+        """
+        controller = TopologyController(
+            tofino_env_fd(), topo=topology_generator.generate_topo('medium'))
+        batches = port_setup.generate_port_setup(controller, clear=True)
+
+        shell = FakeBfShell()
+        try:
+            with BfShellClient("localhost", shell.port, timeout=5) as client:
+                results = port_setup.run_port_setup(client, batches)
+        finally:
+            shell.stop()
+
+        self.assertEqual(shell.commands, [command for batch in batches for command in batch])
+        self.assertEqual(shell.commands[2], "port-del -/-")
+        self.assertFalse(any(result.error for result in results))
+
+
+################################################
+if __name__ == '__main__':
+    unittest.main()
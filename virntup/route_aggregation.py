@@ -0,0 +1,216 @@
+import bisect
+import ipaddress
+import logging
+
+
+class AssignedPrefixes:
+    """AssignedPrefixes.
+
+    Sorted index over all networks which are assigned to _Nodes of a
+    topology. It is used to decide whether a summarized route would cover
+    addresses which are routed somewhere else.
+
+    All assigned networks have to be disjoint.
+    """
+
+    def __init__(self, networks):
+        """__init__.
+
+        Parameters
+        ----------
+        networks :
+            iterable of IPv4Network - All networks assigned in the topology
+        """
+        ranges = sorted((int(n.network_address), int(n.broadcast_address))
+                        for n in networks)
+        self.starts = [r[0] for r in ranges]
+        self.ends = [r[1] for r in ranges]
+
+    def _overlapping_range(self, network):
+        """_overlapping_range.
+
+        Returns the index range of all assigned networks overlapping `network`.
+        """
+        lo = int(network.network_address)
+        hi = int(network.broadcast_address)
+
+        left = bisect.bisect_left(self.starts, lo)
+        right = bisect.bisect_right(self.starts, hi)
+
+        # An assigned network starting before `network` can still contain it
+        if left > 0 and self.ends[left - 1] >= lo:
+            left -= 1
+        return left, right
+
+    def count_overlapping(self, network):
+        """count_overlapping.
+
+        Parameters
+        ----------
+        network :
+            IPv4Network
+
+        Returns
+        ----------
+        int : Number of assigned networks overlapping `network`
+        """
+        left, right = self._overlapping_range(network)
+        return right - left
+
+    def overlapping_addresses(self, network):
+        """overlapping_addresses.
+
+        Parameters
+        ----------
+        network :
+            IPv4Network
+
+        Returns
+        ----------
+        list of int : First address of every assigned network overlapping
+        `network`
+        """
+        left, right = self._overlapping_range(network)
+        return self.starts[left:right]
+
+
+def _covering_network(networks):
+    """_covering_network.
+
+    Returns the smallest network which contains all given networks.
+    """
+    lo = min(int(n.network_address) for n in networks)
+    hi = max(int(n.broadcast_address) for n in networks)
+    prefixlen = networks[0].max_prefixlen - (lo ^ hi).bit_length()
+    return type(networks[0])((lo, prefixlen), strict=False)
+
+
+def _summarize(networks, assigned):
+    """_summarize.
+
+    Recursively replaces `networks` with as few covering networks as possible.
+    A covering network is only used if every assigned network it overlaps is
+    already part of `networks`, hence only unassigned addresses are added.
+
+    Parameters
+    ----------
+    networks :
+        list of IPv4Network - collapsed, disjoint networks of one egress port
+    assigned :
+        AssignedPrefixes
+    """
+    if len(networks) == 1:
+        return networks
+
+    supernet = _covering_network(networks)
+    covered = sum(assigned.count_overlapping(n) for n in networks)
+    if assigned.count_overlapping(supernet) == covered:
+        return [supernet]
+
+    lower, upper = supernet.subnets(prefixlen_diff=1)
+    lower_networks = [n for n in networks if n.subnet_of(lower)]
+    upper_networks = [n for n in networks if n.subnet_of(upper)]
+
+    return _summarize(lower_networks, assigned) + _summarize(upper_networks, assigned)
+
+
+def summarize_routing_table(routingtable, assigned):
+    """summarize_routing_table.
+
+    Summarizes the routes of each egress port of a routing table.
+
+    Parameters
+    ----------
+    routingtable :
+        list of (port, IPv4Network) tuples
+    assigned :
+        AssignedPrefixes - All networks assigned in the topology
+
+    Returns
+    ----------
+    list of (port, IPv4Network) tuples : The summarized routing table. Ports
+    keep the order of their first appearance in `routingtable`.
+    """
+    networks_per_port = {}
+    for port, network in routingtable:
+        networks_per_port.setdefault(port, []).append(network)
+
+    summarized = []
+    for port, networks in networks_per_port.items():
+        collapsed = list(ipaddress.collapse_addresses(networks))
+        for network in _summarize(collapsed, assigned):
+            summarized.append((port, network))
+
+    return summarized
+
+
+def _lpm_lookup_table(routingtable):
+    """_lpm_lookup_table.
+
+    Creates a list of (prefixlen, {network: port}) tuples sorted from the
+    longest to the shortest prefix.
+    """
+    by_length = {}
+    for port, network in routingtable:
+        by_length.setdefault(network.prefixlen, {})[
+            int(network.network_address)] = port
+    return sorted(by_length.items(), reverse=True)
+
+
+def _lpm_lookup(table, address, max_prefixlen):
+    """_lpm_lookup.
+
+    Returns the egress port for `address` or None if no route matches.
+    """
+    for prefixlen, networks in table:
+        mask = ((1 << prefixlen) - 1) << (max_prefixlen - prefixlen)
+        port = networks.get(address & mask)
+        if port is not None:
+            return port
+    return None
+
+
+def compare_forwarding(original, summarized, assigned):
+    """compare_forwarding.
+
+    Checks that both routing tables forward every assigned network to the same
+    egress port. Destinations neither table has a route for use the default
+    route in both cases and are therefore equivalent.
+
+    Parameters
+    ----------
+    original :
+        list of (port, IPv4Network) tuples - unaggregated routing table
+    summarized :
+        list of (port, IPv4Network) tuples - summarized routing table
+    assigned :
+        AssignedPrefixes - All networks assigned in the topology
+
+    Returns
+    ----------
+    list of (address, original port, summarized port) tuples : All assigned
+    networks which are forwarded differently
+    """
+    if not summarized:
+        return []
+
+    max_prefixlen = summarized[0][1].max_prefixlen
+    original_table = _lpm_lookup_table(original)
+    summarized_table = _lpm_lookup_table(summarized)
+
+    # Every route of the original table is covered by the summarized table,
+    # so probing all assigned networks below summarized routes is sufficient
+    probes = set()
+    for _, network in summarized:
+        probes.update(assigned.overlapping_addresses(network))
+
+    mismatches = []
+    for address in sorted(probes):
+        original_port = _lpm_lookup(original_table, address, max_prefixlen)
+        summarized_port = _lpm_lookup(summarized_table, address, max_prefixlen)
+        if original_port != summarized_port:
+            mismatches.append((address, original_port, summarized_port))
+
+    logging.debug("Compared forwarding of {} destinations, {} mismatches".format(
+        len(probes), len(mismatches)))
+    return mismatches
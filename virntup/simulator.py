@@ -0,0 +1,391 @@
+import ipaddress
+import logging
+import math
+
+import numpy as np
+
+
+# Result of sending a packet from one host to another
+DELIVERED = 0     # Packet reached the destination host with its MAC address
+MISDELIVERED = 1  # Packet left the switch on a host link, but not to the destination
+DROPPED = 2       # No port mapping, no matching route or an unconnected egress port
+LOOP = 3          # Packet never leaves the switch
+
+STATUS_NAMES = {
+    DELIVERED: "delivered",
+    MISDELIVERED: "misdelivered",
+    DROPPED: "dropped",
+    LOOP: "loop"
+}
+
+# Action index of an LPM lookup without matching route
+NO_ROUTE = -1
+
+# Upper bound of the number of (vRouter, destination) states processed at once
+MAX_CHUNK_STATES = 1 << 22
+
+# Match keys are `vRouter index << KEY_SHIFT | IPv4 address`. 33 bits are
+# needed as an interval may end at 2^32.
+KEY_SHIFT = 33
+
+
+def _mac_to_int(mac):
+    """_mac_to_int.
+    """
+    return int(mac.replace(":", ""), 16)
+
+
+class CompiledLPM:
+    """CompiledLPM.
+
+    The LPM tables of all vRouters compiled into one sorted array of disjoint
+    address intervals. Each interval holds the action of the longest prefix
+    covering it, so a lookup is a single binary search, vectorized with
+    `numpy.searchsorted` over arbitrary many (vRouter, address) pairs.
+    """
+
+    def __init__(self, routes, router_count):
+        """__init__.
+
+        Parameters
+        ----------
+        routes :
+            list of lists - routes[vRouter index] contains
+            (IPv4Network, action index) tuples
+        router_count :
+            int - number of vRouters
+        """
+        starts = []
+        actions = []
+
+        for router_index in range(router_count):
+            base = router_index << KEY_SHIFT
+
+            # Interval start -> action, later writes at the same start win
+            boundaries = {0: NO_ROUTE}
+
+            # Sorting by start and decreasing size visits enclosing prefixes
+            # before the prefixes nested in them
+            prefixes = sorted(
+                ((int(network.network_address), int(network.broadcast_address), action)
+                 for network, action in routes[router_index]),
+                key=lambda prefix: (prefix[0], -prefix[1]))
+
+            # Stack of enclosing prefixes (end, action)
+            stack = []
+            for start, end, action in prefixes:
+                while stack and stack[-1][0] < start:
+                    enclosing_end, _ = stack.pop()
+                    boundaries[enclosing_end + 1] = stack[-1][1] if stack else NO_ROUTE
+                boundaries[start] = action
+                stack.append((end, action))
+            while stack:
+                enclosing_end, _ = stack.pop()
+                boundaries[enclosing_end + 1] = stack[-1][1] if stack else NO_ROUTE
+
+            for start in sorted(boundaries):
+                starts.append(base | start)
+                actions.append(boundaries[start])
+
+        self.starts = np.array(starts, dtype=np.int64)
+        self.actions = np.array(actions, dtype=np.int64)
+
+    def lookup(self, router_indices, addresses):
+        """lookup.
+
+        Parameters
+        ----------
+        router_indices :
+            numpy array of int - vRouter index of every lookup
+        addresses :
+            numpy array of int - IPv4 address of every lookup (broadcastable
+            to `router_indices`)
+
+        Returns
+        ----------
+        numpy array : action index of every lookup or NO_ROUTE
+        """
+        keys = (np.asarray(router_indices, dtype=np.int64) << KEY_SHIFT) | \
+            np.asarray(addresses, dtype=np.int64)
+        return self.actions[np.searchsorted(self.starts, keys, side='right') - 1]
+
+
+class SimulationResult:
+    """SimulationResult.
+
+    Outcome of all host pairs. Hosts attached to the same vRouter share their
+    path, so the results are stored per start state (vRouter) and destination
+    host instead of per host pair.
+    """
+
+    def __init__(self, hosts, host_start, status, hops):
+        """__init__.
+
+        Parameters
+        ----------
+        hosts :
+            list of str - host names (as in the env.json)
+        host_start :
+            numpy array - start state (row of `status`) of every host
+        status :
+            numpy array - status of every (start state, destination host)
+        hops :
+            numpy array - number of traversed vRouters of every (start state,
+            destination host)
+        """
+        self.hosts = hosts
+        self.host_start = host_start
+        self.status = status
+        self.hops = hops
+
+    def get_status(self, src, dst):
+        """get_status.
+
+        Parameters
+        ----------
+        src :
+            int - index of the source host
+        dst :
+            int - index of the destination host
+
+        Returns
+        ----------
+        int : DELIVERED, MISDELIVERED, DROPPED or LOOP
+        """
+        return int(self.status[self.host_start[src], dst])
+
+    def get_hops(self, src, dst):
+        """get_hops.
+
+        Returns
+        ----------
+        int : Number of vRouters the packet traverses
+        """
+        return int(self.hops[self.host_start[src], dst])
+
+    def count(self):
+        """count.
+
+        Returns
+        ----------
+        dict : {status: number of host pairs} of all pairs of different hosts
+        """
+        counts = np.zeros(len(STATUS_NAMES), dtype=np.int64)
+        starts, hosts_per_start = np.unique(self.host_start, return_counts=True)
+        for start, weight in zip(starts, hosts_per_start):
+            counts += weight * np.bincount(self.status[start],
+                                           minlength=len(STATUS_NAMES))
+
+        # Remove the pairs of a host with itself
+        np.subtract.at(counts, self.status[self.host_start,
+                                           np.arange(len(self.hosts))], 1)
+        return {status: int(counts[status]) for status in STATUS_NAMES}
+
+    def failed_pairs(self):
+        """failed_pairs.
+
+        Yields
+        ----------
+        (str, str, str, int) : source host, destination host, status name and
+        hops of every pair which is not delivered
+        """
+        for src, start in enumerate(self.host_start):
+            for dst in np.flatnonzero(self.status[start] != DELIVERED):
+                if dst != src:
+                    yield (self.hosts[src], self.hosts[dst],
+                           STATUS_NAMES[int(self.status[start, dst])],
+                           int(self.hops[start, dst]))
+
+    def max_hops(self):
+        """max_hops.
+
+        Returns
+        ----------
+        int : Longest path of a delivered pair
+        """
+        starts = np.unique(self.host_start)
+        delivered = self.status[starts] == DELIVERED
+        if not delivered.any():
+            return 0
+        return int(self.hops[starts][delivered].max())
+
+    def __str__(self):
+        """__str__.
+        """
+        counts = self.count()
+        return "{} hosts, {} pairs: ".format(len(self.hosts), sum(counts.values())) + \
+            ", ".join("{} {}".format(counts[status], name)
+                      for status, name in STATUS_NAMES.items()) + \
+            " - longest path {} hops".format(self.max_hops())
+
+
+class DataPlaneSimulator:
+    """DataPlaneSimulator.
+
+    Offline model of the virntup data plane of a TopologyController mapping.
+    It uses the entries of `vRouterNumberMatching` and `ipv4NextHopLPM` (as
+    they are deployed, including the default routes) and the wire loops and
+    host links of the env.json.
+
+    A packet enters the switch on the port of its source host, is assigned to
+    a vRouter by its ingress port and forwarded by the LPM lookup of this
+    vRouter. Leaving on a wire loop port it re-enters on the other end of the
+    loop, leaving on a host link it is delivered to this host.
+    """
+
+    def __init__(self, controller):
+        """__init__.
+
+        Parameters
+        ----------
+        controller :
+            TopologyController - mapping which is simulated
+        """
+        port_entries, route_entries = controller.get_expected_entries()
+
+        router_numbers = sorted(set(port_entries.values()) |
+                                {vRouter for vRouter, _ in route_entries})
+        router_index = {number: index for index,
+                        number in enumerate(router_numbers)}
+        self.router_count = len(router_numbers)
+
+        # States: vRouters 0..V-1 and the terminal states
+        self.delivered_state = self.router_count
+        self.misdelivered_state = self.router_count + 1
+        self.dropped_state = self.router_count + 2
+        self.state_count = self.router_count + 3
+
+        # Hosts connected to the topology, in order of the env.json
+        hostnames = [link[0] for link in controller.env["host_links"]
+                     if link[0] in controller.host_env]
+        host_ports = {link[0]: int(link[1])
+                      for link in controller.env["host_links"]}
+        self.hosts = hostnames
+        self.host_addresses = np.array(
+            [int(ipaddress.IPv4Interface(controller.host_env[name]['ip']).ip) for name in hostnames],
+            dtype=np.int64)
+        self.host_macs = np.array(
+            [_mac_to_int(controller.host_env[name]['mac']) for name in hostnames], dtype=np.int64)
+
+        ports = set(port_entries) | set(host_ports.values())
+        ports |= {int(port) for link in controller.env["links"]
+                  for port in link}
+        ports |= {port for _, port in route_entries.values()}
+        port_count = max(ports) + 1 if ports else 1
+
+        # Ingress port -> vRouter index (or dropped)
+        self.ingress_state = np.full(
+            port_count, self.dropped_state, dtype=np.int64)
+        for port, vRouter in port_entries.items():
+            self.ingress_state[port] = router_index[vRouter]
+
+        # Egress port -> state after leaving on this port (or a host)
+        self.egress_state = np.full(
+            port_count, self.dropped_state, dtype=np.int64)
+        for port_a, port_b in controller.env["links"]:
+            self.egress_state[int(port_a)] = self.ingress_state[int(port_b)]
+            self.egress_state[int(port_b)] = self.ingress_state[int(port_a)]
+        self.egress_host = np.full(port_count, -1, dtype=np.int64)
+        for index, name in enumerate(hostnames):
+            self.egress_host[host_ports[name]] = index
+
+        self.host_start = self.ingress_state[[host_ports[name]
+                                              for name in hostnames]]
+
+        # Actions of the routing table
+        routes = [[] for _ in range(self.router_count)]
+        action_ports = []
+        action_macs = []
+        for (vRouter, network), (mac, port) in route_entries.items():
+            routes[router_index[vRouter]].append(
+                (ipaddress.IPv4Network(network), len(action_ports)))
+            action_ports.append(port)
+            action_macs.append(_mac_to_int(mac))
+        # A placeholder action keeps the arrays indexable without routes
+        self.action_ports = np.array(action_ports or [0], dtype=np.int64)
+        self.action_macs = np.array(action_macs or [0], dtype=np.int64)
+
+        self.lpm = CompiledLPM(routes, self.router_count)
+
+        logging.debug("Simulator with {} vRouters, {} hosts and {} routes".format(
+            self.router_count, len(self.hosts), len(action_ports)))
+
+    def _transitions(self, destinations):
+        """_transitions.
+
+        Calculates the next state of every (state, destination host) pair
+        after one vRouter lookup.
+
+        Parameters
+        ----------
+        destinations :
+            numpy array - indices of the destination hosts
+
+        Returns
+        ----------
+        numpy array : next state, shape (states, destinations)
+        """
+        routers = np.arange(self.router_count)[:, np.newaxis]
+        actions = self.lpm.lookup(
+            routers, self.host_addresses[destinations][np.newaxis, :])
+
+        routed = actions != NO_ROUTE
+        actions = np.where(routed, actions, 0)
+        egress_ports = self.action_ports[actions]
+
+        next_state = self.egress_state[egress_ports]
+
+        # Leaving on a host link: delivered if it is the destination and the
+        # destination MAC address was set correctly
+        hosts = self.egress_host[egress_ports]
+        correct = (hosts == destinations[np.newaxis, :]) & \
+            (self.action_macs[actions] == self.host_macs[destinations][np.newaxis, :])
+        next_state = np.where(hosts >= 0, np.where(correct, self.delivered_state,
+                                                   self.misdelivered_state), next_state)
+        next_state = np.where(routed, next_state, self.dropped_state)
+
+        terminal = np.arange(self.router_count, self.state_count)[:, np.newaxis]
+        return np.vstack([next_state, np.broadcast_to(terminal, (3, len(destinations)))])
+
+    def run(self):
+        """run.
+
+        Simulates packets between all host pairs. The paths are resolved by
+        pointer doubling: after k rounds every state knows the state it
+        reaches after 2^k lookups, so ceil(log2(V)) + 1 rounds of vectorized
+        gathers cover every loop free path.
+
+        Returns
+        ----------
+        SimulationResult
+        """
+        host_count = len(self.hosts)
+        status = np.zeros((self.state_count, host_count), dtype=np.int8)
+        hops = np.zeros((self.state_count, host_count), dtype=np.int32)
+
+        rounds = max(1, math.ceil(math.log2(self.router_count + 1))) + 1
+        chunk_size = max(1, MAX_CHUNK_STATES // self.state_count)
+
+        for chunk_start in range(0, host_count, chunk_size):
+            destinations = np.arange(
+                chunk_start, min(host_count, chunk_start + chunk_size))
+
+            jump = self._transitions(destinations)
+            # Every lookup of a vRouter is one hop, terminal states stay
+            jump_hops = np.zeros(jump.shape, dtype=np.int32)
+            jump_hops[:self.router_count] = 1
+
+            for _ in range(rounds):
+                jump_hops = jump_hops + \
+                    np.take_along_axis(jump_hops, jump, axis=0)
+                jump = np.take_along_axis(jump, jump, axis=0)
+
+            chunk_status = np.full(jump.shape, LOOP, dtype=np.int8)
+            chunk_status[jump == self.delivered_state] = DELIVERED
+            chunk_status[jump == self.misdelivered_state] = MISDELIVERED
+            chunk_status[jump == self.dropped_state] = DROPPED
+
+            status[:, destinations] = chunk_status
+            hops[:, destinations] = jump_hops
+
+        return SimulationResult(self.hosts, self.host_start, status, hops)
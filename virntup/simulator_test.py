@@ -0,0 +1,94 @@
+import ipaddress
+import logging
+import random
+import unittest
+
+import numpy as np
+
+from . import topology_generator
+from .simulator import CompiledLPM, DataPlaneSimulator, NO_ROUTE, DELIVERED, DROPPED, LOOP
+from .topology_controller import TopologyController
+from .topology_controller_test import env_fd
+
+logging.basicConfig(level=logging.INFO)
+
+
+###########################################################
+class TestCompiledLPM(unittest.TestCase):
+    """TestCompiledLPM.
+    """
+
+    def test_lookup_matches_longest_prefix(self):
+        """test_lookup_matches_longest_prefix.
+        """
+        generator = random.Random(42)
+        routes = []
+        for _ in range(3):
+            networks = {ipaddress.IPv4Network((generator.getrandbits(32), prefix), strict=False)
+                        for prefix in [generator.choice([0, 8, 16, 20, 24, 28, 32]) for _ in range(50)]}
+            routes.append([(network, index)
+                          for index, network in enumerate(networks)])
+        lpm = CompiledLPM(routes, len(routes))
+
+        addresses = [generator.getrandbits(32) for _ in range(200)]
+        # Addresses inside and around every network
+        for router_routes in routes:
+            for network, _ in router_routes:
+                addresses += [int(network.network_address),
+                              int(network.broadcast_address),
+                              (int(network.broadcast_address) + 1) % (1 << 32)]
+
+        for router_index, router_routes in enumerate(routes):
+            expected = []
+            for address in addresses:
+                matches = [(network.prefixlen, action) for network, action in router_routes
+                           if ipaddress.IPv4Address(address) in network]
+                expected.append(max(matches)[1] if matches else NO_ROUTE)
+
+            self.assertEqual(lpm.lookup(np.full(len(addresses), router_index),
+                                        np.array(addresses)).tolist(), expected)
+
+
+###########################################################
+class TestDataPlaneSimulator(unittest.TestCase):
+    """TestDataPlaneSimulator.
+    """
+
+    def test_all_pairs_are_delivered(self):
+        """test_all_pairs_are_delivered.
+        """
+        controller = TopologyController(
+            env_fd(12, 18), topo=topology_generator.generate_topo('large'))
+        result = DataPlaneSimulator(controller).run()
+
+        self.assertEqual(result.count()[DELIVERED], 18 * 17)
+        self.assertEqual(list(result.failed_pairs()), [])
+        # Hosts of the same leaf router and hosts of different subtrees
+        self.assertEqual(result.get_hops(0, 1), 1)
+        self.assertEqual(result.max_hops(), 5)
+
+    def test_broken_mapping_is_detected(self):
+        """test_broken_mapping_is_detected.
+        """
+        controller = TopologyController(
+            env_fd(1, 2), topo=topology_generator.generate_topo('medium'))
+
+        # vRouter2 loses the route to its host, the default route sends the
+        # packets back to vRouter1, which forwards them to vRouter2 again
+        controller.route_mapping["2"] = []
+        result = DataPlaneSimulator(controller).run()
+
+        src = result.hosts.index("h1")
+        dst = result.hosts.index("h2")
+        self.assertEqual(result.get_status(src, dst), LOOP)
+        self.assertEqual(result.get_status(dst, src), DELIVERED)
+
+        # Without port mapping the packets of a host are dropped
+        controller.port_mapping["1"] = controller.port_mapping["1"][:1]
+        result = DataPlaneSimulator(controller).run()
+        self.assertEqual(result.get_status(src, dst), DROPPED)
+
+
+################################################
+if __name__ == '__main__':
+    unittest.main()
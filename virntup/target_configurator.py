@@ -1,8 +1,106 @@
-import socket
+import ipaddress
 import logging
+from collections import namedtuple
+
+import grpc
 import p4runtime_sh.shell as shell
+from p4runtime_sh.context import P4Type
+from google.rpc import code_pb2, status_pb2
+from p4.v1 import p4runtime_pb2
+
+from . import bf_shell
+from . import port_setup
+from .topology_controller import PORT_MAPPING, ROUTES
+
+
+# A WriteError describes a single update which was rejected by the target
+# while a batch was written. `batch` is the sequence number of the batch,
+# `index` the position of the update inside this batch.
+WriteError = namedtuple("WriteError", ["batch", "index", "update", "message"])
+
+# Tables and actions of the virntup.p4 program
+PORT_MAPPING_TABLE = "MyIngress.vRouterNumberMatching"
+PORT_MAPPING_ACTION = "MyIngress.setVSwitchNumber"
+ROUTE_TABLE = "MyIngress.ipv4NextHopLPM"
+ROUTE_ACTION = "MyIngress.ipv4Forward"
+
+# Minimum number of DELETEs per WriteRequest when the tables are cleared
+BULK_BATCH_SIZE = 1000
+
 
-from time import sleep
+def _decode_int(value):
+    """_decode_int.
+
+    Decodes a P4Runtime bytestring to an integer.
+    """
+    return int.from_bytes(value, byteorder='big')
+
+
+def _decode_mac(value):
+    """_decode_mac.
+
+    Decodes a P4Runtime bytestring to a MAC address string.
+    """
+    mac_hex = "{:012x}".format(_decode_int(value))
+    return ":".join(mac_hex[i:i + 2] for i in range(0, 12, 2))
+
+
+def _get_write_errors(grpc_error):
+    """_get_write_errors.
+
+    Extracts the per update errors of a failed Write RPC. The target sends
+    one p4runtime_pb2.Error per update of the batch as binary details of the
+    gRPC status, successful updates have the canonical code OK.
+    (The error iterator of p4runtime-shell does not advance over OK entries,
+    hence the details are decoded here.)
+
+    Parameters
+    ----------
+    grpc_error :
+        grpc.RpcError
+
+    Returns
+    ----------
+    list of (int, p4runtime_pb2.Error) : Index and error of every rejected update
+    """
+    status = None
+    for key, value in grpc_error.trailing_metadata() or ():
+        if key == "grpc-status-details-bin":
+            status = status_pb2.Status()
+            status.ParseFromString(value)
+            break
+
+    if grpc_error.code() != grpc.StatusCode.UNKNOWN or status is None:
+        raise RuntimeError("Write failed without per update errors: {} - {}".format(
+            grpc_error.code(), grpc_error.details()))
+
+    errors = []
+    for index, detail in enumerate(status.details):
+        p4_error = p4runtime_pb2.Error()
+        detail.Unpack(p4_error)
+        if p4_error.canonical_code != code_pb2.OK:
+            errors.append((index, p4_error))
+    return errors
+
+
+def _get_field_match(table_entry, field_id):
+    """_get_field_match.
+
+    Returns the FieldMatch with the given id of a p4runtime_pb2.TableEntry.
+    """
+    for field_match in table_entry.match:
+        if field_match.field_id == field_id:
+            return field_match
+    raise RuntimeError("Table entry has no match field {}".format(field_id))
+
+
+def _get_action_params(table_entry):
+    """_get_action_params.
+
+    Returns the action parameters of a p4runtime_pb2.TableEntry as
+    {param id: value}.
+    """
+    return {param.param_id: param.value for param in table_entry.action.action.params}
 
 
 class TargetConnector:
@@ -14,7 +112,7 @@ class TargetConnector:
 
     """
 
-    def __init__(self, target_ip, target_port, p4info_path=None, p4binary_path=None):
+    def __init__(self, target_ip, target_port, p4info_path=None, p4binary_path=None, batch_size=1):
         """__init__.
 
         Parameters
@@ -29,10 +127,28 @@ class TargetConnector:
             (optional) p4binary_path path to binary which should be deployed.
             IMPORTANT: For tofino tagets this binary has to be modified!
             See -> https://github.com/p4lang/p4runtime-shell#target-specific-support
+        batch_size :
+            (optional) int - Number of table entries which are collected and
+            sent in a single WriteRequest. With the default of 1 every entry
+            is written on its own. Call `flush()` to send a partially filled
+            batch.
         """
         self.target_ip = target_ip
         self.target_port = target_port
 
+        self.batch_size = batch_size
+        self._pending_updates = []
+        self._batch_count = 0
+        self._pending_keys = []
+        self.write_errors = []
+        self.written_updates = 0
+        # Send the batches with the ROLLBACK_ON_ERROR atomicity, so a batch is
+        # applied completely or not at all
+        self.atomic = False
+        # Journal of the inserted entries accepted by the target as
+        # (PORT_MAPPING, port) or (ROUTES, (vRouter number, network))
+        self.installed_entries = []
+
         if p4info_path is None or p4binary_path is None:
             shell.setup(device_id=0,
                         grpc_addr=str(self.target_ip) + ":" +
@@ -48,6 +164,38 @@ class TargetConnector:
                         config=shell.FwdPipeConfig(p4info_path, p4binary_path)
                         )
 
+    def _route_entry(self, match_vRouter_number, match_ipv4address,
+                     action_dest_mac=None, action_egress_port=None):
+        """_route_entry.
+
+        Creates an entry of the routing table. The action is only set if a
+        destination MAC address is given (not necessary for deletes).
+        """
+        if action_dest_mac is None:
+            entry = shell.TableEntry(ROUTE_TABLE)
+        else:
+            entry = shell.TableEntry(ROUTE_TABLE)(action=ROUTE_ACTION)
+            entry.action["port"] = str(action_egress_port)
+            entry.action["dstAddr"] = str(action_dest_mac)
+        entry.match["vRouterNumber"] = str(match_vRouter_number)
+        entry.match["hdr.ipv4.dstAddr"] = str(match_ipv4address)
+        return entry
+
+    def _port_mapping_entry(self, match_ingress_port, action_vRouter_number=None):
+        """_port_mapping_entry.
+
+        Creates an entry of the port mapping table. The action is only set if
+        a vRouter number is given (not necessary for deletes).
+        """
+        if action_vRouter_number is None:
+            entry = shell.TableEntry(PORT_MAPPING_TABLE)
+        else:
+            entry = shell.TableEntry(PORT_MAPPING_TABLE)(
+                action=PORT_MAPPING_ACTION)
+            entry.action["vRouterNumberFromTable"] = str(action_vRouter_number)
+        entry.match["standard_metadata.ingress_port"] = str(match_ingress_port)
+        return entry
+
     def insert_route(self, match_vRouter_number,
                      match_ipv4address,
                      action_dest_mac,
@@ -67,14 +215,48 @@ class TargetConnector:
         action_egress_port :
             int
         """
+        entry = self._route_entry(match_vRouter_number, match_ipv4address,
+                                  action_dest_mac, action_egress_port)
+        self._write_entry(entry, p4runtime_pb2.Update.INSERT,
+                          (ROUTES, (match_vRouter_number, match_ipv4address)))
 
-        entry = shell.TableEntry("MyIngress.ipv4NextHopLPM")(
-            action="MyIngress.ipv4Forward")
-        entry.match["vRouterNumber"] = str(match_vRouter_number)
-        entry.match["hdr.ipv4.dstAddr"] = str(match_ipv4address)
-        entry.action["port"] = str(action_egress_port)
-        entry.action["dstAddr"] = str(action_dest_mac)
-        entry.insert()
+    def modify_route(self, match_vRouter_number,
+                     match_ipv4address,
+                     action_dest_mac,
+                     action_egress_port):
+        """modify_route.
+
+        Change the next hop of an existing routing table entry
+
+        Parameters
+        ----------
+        match_vRouter_number :
+            int
+        match_ipv4address :
+            string
+        action_dest_mac :
+            string
+        action_egress_port :
+            int
+        """
+        entry = self._route_entry(match_vRouter_number, match_ipv4address,
+                                  action_dest_mac, action_egress_port)
+        self._write_entry(entry, p4runtime_pb2.Update.MODIFY)
+
+    def delete_route(self, match_vRouter_number, match_ipv4address):
+        """delete_route.
+
+        Remove a routing table entry
+
+        Parameters
+        ----------
+        match_vRouter_number :
+            int
+        match_ipv4address :
+            string
+        """
+        entry = self._route_entry(match_vRouter_number, match_ipv4address)
+        self._write_entry(entry, p4runtime_pb2.Update.DELETE)
 
     def insert_vRouter_port_mapping(self, match_ingress_port, action_vRouter_number):
         """insert_vRouter_port_mapping.
@@ -88,16 +270,386 @@ class TargetConnector:
         action_vRouter_number :
             int
         """
+        entry = self._port_mapping_entry(
+            match_ingress_port, action_vRouter_number)
+        self._write_entry(entry, p4runtime_pb2.Update.INSERT,
+                          (PORT_MAPPING, match_ingress_port))
 
-        entry = shell.TableEntry("MyIngress.vRouterNumberMatching")(
-            action="MyIngress.setVSwitchNumber")
-        entry.match["standard_metadata.ingress_port"] = str(match_ingress_port)
-        entry.action["vRouterNumberFromTable"] = str(action_vRouter_number)
-        entry.insert()
+    def modify_vRouter_port_mapping(self, match_ingress_port, action_vRouter_number):
+        """modify_vRouter_port_mapping.
+
+        Assign an already mapped ingress port to another vRouter
+
+        Parameters
+        ----------
+        match_ingress_port :
+            int
+        action_vRouter_number :
+            int
+        """
+        entry = self._port_mapping_entry(
+            match_ingress_port, action_vRouter_number)
+        self._write_entry(entry, p4runtime_pb2.Update.MODIFY)
+
+    def delete_vRouter_port_mapping(self, match_ingress_port):
+        """delete_vRouter_port_mapping.
+
+        Remove the vRouter assignment of an ingress port
+
+        Parameters
+        ----------
+        match_ingress_port :
+            int
+        """
+        entry = self._port_mapping_entry(match_ingress_port)
+        self._write_entry(entry, p4runtime_pb2.Update.DELETE)
+
+    def _read_table(self, table_name):
+        """_read_table.
+
+        Reads all entries of a table with one wildcard read. The entries are
+        yielded while the response stream is received.
+
+        Parameters
+        ----------
+        table_name :
+            str
+
+        Yields
+        ----------
+        p4runtime_pb2.TableEntry
+        """
+        entity = p4runtime_pb2.Entity()
+        entity.table_entry.table_id = shell.context.get_obj_id(
+            P4Type.table, table_name)
+
+        for response in shell.client.read_one(entity):
+            for response_entity in response.entities:
+                yield response_entity.table_entry
+
+    def read_vRouter_port_mappings(self):
+        """read_vRouter_port_mappings.
+
+        Reads the current content of the port mapping table.
 
-    def send_bf_shell_commands(self, telnet_port,  port_config_fd):
+        Returns
+        ----------
+        dict : {ingress port (int): vRouter number (int)}
+        """
+        port_field = shell.context.get_mf_id(
+            PORT_MAPPING_TABLE, "standard_metadata.ingress_port")
+        vRouter_param = shell.context.get_param_id(
+            PORT_MAPPING_ACTION, "vRouterNumberFromTable")
+
+        mappings = {}
+        for table_entry in self._read_table(PORT_MAPPING_TABLE):
+            match = _get_field_match(table_entry, port_field)
+            params = _get_action_params(table_entry)
+            mappings[_decode_int(match.exact.value)] = _decode_int(
+                params[vRouter_param])
+        return mappings
+
+    def read_routes(self):
+        """read_routes.
+
+        Reads the current content of the routing table.
+
+        Returns
+        ----------
+        dict : {(vRouter number (int), network (str)): (MAC (str), egress port (int))}
+        """
+        vRouter_field = shell.context.get_mf_id(ROUTE_TABLE, "vRouterNumber")
+        address_field = shell.context.get_mf_id(
+            ROUTE_TABLE, "hdr.ipv4.dstAddr")
+        mac_param = shell.context.get_param_id(ROUTE_ACTION, "dstAddr")
+        port_param = shell.context.get_param_id(ROUTE_ACTION, "port")
+
+        routes = {}
+        for table_entry in self._read_table(ROUTE_TABLE):
+            vRouter = _get_field_match(table_entry, vRouter_field)
+            address = _get_field_match(table_entry, address_field)
+            params = _get_action_params(table_entry)
+
+            network = ipaddress.IPv4Network(
+                (_decode_int(address.lpm.value), address.lpm.prefix_len))
+            key = (_decode_int(vRouter.exact.value), network.compressed)
+            routes[key] = (_decode_mac(params[mac_param]),
+                           _decode_int(params[port_param]))
+        return routes
+
+    def _write_entry(self, entry, update_type, key=None):
+        """_write_entry.
+
+        Writes the entry directly to the target if batching is disabled.
+        Otherwise the update is queued and the batch is sent as soon as it
+        reaches `batch_size` updates.
+
+        Parameters
+        ----------
+        entry :
+            shell.TableEntry - Entry which should be written
+        update_type :
+            p4runtime_pb2.Update.Type - INSERT, MODIFY or DELETE
+        key :
+            (optional) tuple - key of an inserted entry, journaled in
+            `installed_entries` once the target accepted the insert
+        """
+        if self.batch_size <= 1:
+            if update_type == p4runtime_pb2.Update.INSERT:
+                entry.insert()
+            elif update_type == p4runtime_pb2.Update.MODIFY:
+                entry.modify()
+            else:
+                entry.delete()
+            self.written_updates += 1
+            if key is not None:
+                self.installed_entries.append(key)
+            return
+
+        update = p4runtime_pb2.Update()
+        update.type = update_type
+        update.entity.table_entry.CopyFrom(entry.msg())
+        self._queue_update(update, key)
+
+    def _queue_update(self, update, key=None):
+        """_queue_update.
+
+        Queues an update and sends the batch as soon as it reaches
+        `batch_size` updates.
+        """
+        self._pending_updates.append(update)
+        self._pending_keys.append(key)
+
+        if len(self._pending_updates) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """flush.
+
+        Sends all queued updates in one WriteRequest. The request uses the
+        CONTINUE_ON_ERROR atomicity, so the target applies every valid update
+        even if some updates of the batch are rejected. Rejected updates are
+        logged and collected in `write_errors`.
+
+        If `atomic` is set, the ROLLBACK_ON_ERROR atomicity is used and a
+        rejected batch is not applied at all. Targets without support for it
+        get the batch with CONTINUE_ON_ERROR.
+
+        Returns
+        ----------
+        list of WriteError : Errors reported by the target for this batch
+        """
+        if not self._pending_updates:
+            return []
+
+        updates = self._pending_updates
+        keys = self._pending_keys
+        self._pending_updates = []
+        self._pending_keys = []
+        self._batch_count += 1
+
+        request = self._new_write_request()
+        request.updates.extend(updates)
+
+        logging.debug("Write batch {} with {} updates".format(
+            self._batch_count, len(updates)))
+
+        errors = []
+        try:
+            try:
+                shell.client.stub.Write(request)
+            except grpc.RpcError as e:
+                if request.atomicity != p4runtime_pb2.WriteRequest.ROLLBACK_ON_ERROR or \
+                        e.code() != grpc.StatusCode.UNIMPLEMENTED:
+                    raise
+                logging.warning("Target does not support ROLLBACK_ON_ERROR - writing batch {} with CONTINUE_ON_ERROR".format(
+                    self._batch_count))
+                request.atomicity = p4runtime_pb2.WriteRequest.CONTINUE_ON_ERROR
+                shell.client.stub.Write(request)
+        except grpc.RpcError as e:
+            for index, p4_error in _get_write_errors(e):
+                errors.append(WriteError(
+                    self._batch_count, index, updates[index], p4_error.message))
+
+        if errors and request.atomicity == p4runtime_pb2.WriteRequest.ROLLBACK_ON_ERROR:
+            # The target rolled back the whole batch, nothing was written
+            return self._record_batch(errors, len(errors))
+
+        self._journal_inserts(keys, errors)
+        return self._record_batch(errors, len(updates))
+
+    def clear_tables(self, batch_size=BULK_BATCH_SIZE):
+        """clear_tables.
+
+        Deletes all entries of both virntup tables, e.g. to reset the target
+        between experiments without reloading the pipeline. Each table is
+        read with one wildcard read and the read entries are deleted as they
+        are, in batches of at least `batch_size` DELETEs. The port mapping is
+        cleared first, so no traffic reaches the vRouters whose routes are
+        deleted.
+
+        Parameters
+        ----------
+        batch_size :
+            int (default: BULK_BATCH_SIZE) - minimum number of DELETEs per
+            WriteRequest, a larger `batch_size` of the connector is kept
+
+        Returns
+        ----------
+        (int, int) : Number of deleted port mappings and routes, rejected
+        DELETEs are collected in `write_errors`
+        """
+        self.flush()
+
+        configured_batch_size = self.batch_size
+        self.batch_size = max(configured_batch_size, batch_size)
+        try:
+            deleted = tuple(self._delete_all_entries(table_name)
+                            for table_name in (PORT_MAPPING_TABLE, ROUTE_TABLE))
+            self.flush()
+        finally:
+            self.batch_size = configured_batch_size
+
+        logging.info("Cleared {} port mappings and {} routes".format(*deleted))
+        return deleted
+
+    def _delete_all_entries(self, table_name):
+        """_delete_all_entries.
+
+        Queues a DELETE for every entry of a table.
+
+        Returns
+        ----------
+        int : Number of queued DELETEs
+        """
+        table_entries = list(self._read_table(table_name))
+        for table_entry in table_entries:
+            update = p4runtime_pb2.Update()
+            update.type = p4runtime_pb2.Update.DELETE
+            update.entity.table_entry.CopyFrom(table_entry)
+            self._queue_update(update)
+        return len(table_entries)
+
+    def write_serialized_updates(self, updates):
+        """write_serialized_updates.
+
+        Writes updates which are already serialized as `updates` fields of a
+        WriteRequest (see deploy_artifact). Every batch of `batch_size`
+        frames is appended to the serialized request header and sent as is,
+        neither the table entries nor the request are built in Python.
+        Rejected updates are collected in `write_errors` like by `flush()`,
+        the keys of the accepted ones are journaled in `installed_entries`.
+
+        Parameters
+        ----------
+        updates :
+            iterable of (key, bytes) - key of the entry (see
+            `installed_entries`) and serialized `updates` field
+        """
+        self.flush()
+
+        header = self._new_write_request().SerializeToString()
+        write = shell.client.channel.unary_unary(
+            "/p4.v1.P4Runtime/Write",
+            response_deserializer=p4runtime_pb2.WriteResponse.FromString)
+
+        keys = []
+        frames = []
+        for key, frame in updates:
+            keys.append(key)
+            frames.append(frame)
+            if len(frames) >= max(self.batch_size, 1):
+                self._write_serialized_batch(write, header, keys, frames)
+                keys = []
+                frames = []
+        if frames:
+            self._write_serialized_batch(write, header, keys, frames)
+
+    def _write_serialized_batch(self, write, header, keys, frames):
+        """_write_serialized_batch.
+
+        Sends one batch of `write_serialized_updates()`. Only the updates
+        rejected by the target are decoded for the error report.
+        """
+        self._batch_count += 1
+        request = header + b"".join(frames)
+
+        logging.debug("Write serialized batch {} with {} updates".format(
+            self._batch_count, len(frames)))
+
+        errors = []
+        try:
+            write(request)
+        except grpc.RpcError as e:
+            updates = p4runtime_pb2.WriteRequest.FromString(request).updates
+            for index, p4_error in _get_write_errors(e):
+                errors.append(WriteError(
+                    self._batch_count, index, updates[index], p4_error.message))
+
+        self._journal_inserts(keys, errors)
+        return self._record_batch(errors, len(frames))
+
+    def _new_write_request(self):
+        """_new_write_request.
+
+        Returns a WriteRequest without updates for the connected device with
+        the CONTINUE_ON_ERROR atomicity, or ROLLBACK_ON_ERROR if `atomic` is
+        set.
+        """
+        request = p4runtime_pb2.WriteRequest()
+        request.device_id = shell.client.device_id
+        request.election_id.high = shell.client.election_id[0]
+        request.election_id.low = shell.client.election_id[1]
+        if self.atomic:
+            request.atomicity = p4runtime_pb2.WriteRequest.ROLLBACK_ON_ERROR
+        else:
+            request.atomicity = p4runtime_pb2.WriteRequest.CONTINUE_ON_ERROR
+        return request
+
+    def _journal_inserts(self, keys, errors):
+        """_journal_inserts.
+
+        Adds the keys of the inserts of a batch which were not rejected to
+        `installed_entries`. Updates without key (None) are not journaled.
+        """
+        rejected = {error.index for error in errors}
+        self.installed_entries.extend(key for index, key in enumerate(keys)
+                                      if key is not None and index not in rejected)
+
+    def _record_batch(self, errors, count):
+        """_record_batch.
+
+        Counts the written updates of a batch and logs and collects its
+        errors.
+
+        Parameters
+        ----------
+        errors :
+            list of WriteError - errors of the batch
+        count :
+            int - number of updates in the batch
+
+        Returns
+        ----------
+        list of WriteError : errors
+        """
+        self.written_updates += count - len(errors)
+
+        if errors:
+            logging.error("Batch {}: {} of {} updates were rejected".format(
+                self._batch_count, len(errors), count))
+            for error in errors:
+                logging.error("Batch {} - update {}: {}\n{}".format(
+                    error.batch, error.index, error.message, error.update))
+            self.write_errors.extend(errors)
+
+        return errors
+
+    def send_bf_shell_commands(self, telnet_port, port_config_fd, window=1, timeout=30):
         """send_bf_shell_command
-        Opens a telnet connection to the p4 target and sends the contents of the provided file to it.
+        Opens a telnet connection to the p4 target and sends the commands of the provided file to it.
+        Every command waits for the prompt of the bf_shell instead of a fixed delay. Raises a
+        RuntimeError if a command failed.
 
         Parameters
         ----------
@@ -105,23 +657,60 @@ class TargetConnector:
             int - Port to connect to 
         port_config_fd :
             port_config_fd - file-descriptor to the file, containing the bf_shell commands 
-        """
-        logging.info("Connecting to {}:{}".format(self.target_ip, telnet_port))
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        s.connect((self.target_ip, telnet_port))
-        s_fd = s.makefile('rw')
+        window :
+            int (default: 1) - Number of commands sent before their response is awaited
+        timeout :
+            float (default: 30) - seconds to wait for the response of a command
 
+        Returns
+        ----------
+        list of bf_shell.BfShellResult : Results of all commands
+        """
         logging.info("Submiting content of {}".format(port_config_fd))
+        commands = bf_shell.read_commands(port_config_fd)
+
+        with bf_shell.BfShellClient(self.target_ip, telnet_port, timeout=timeout) as client:
+            results = client.run_commands(commands, window)
+
+        return self._check_bf_shell_results(results)
 
-        for line in port_config_fd:
-            logging.debug(line.rstrip('\n'))
-            s_fd.write(line)
-            s_fd.flush()
-            sleep(0.05)
+    def send_port_setup(self, telnet_port, batches, timeout=30):
+        """send_port_setup.
+
+        Sends a port setup generated from the mapping (see
+        `port_setup.generate_port_setup()`) to the bf_shell. Raises a
+        RuntimeError if a command failed.
+
+        Parameters
+        ----------
+        telnet_port :
+            int - Port to connect to
+        batches :
+            list of list of str - command batches, the commands of a batch are pipelined
+        timeout :
+            float (default: 30) - seconds to wait for the response of a command
+
+        Returns
+        ----------
+        list of bf_shell.BfShellResult : Results of all commands
+        """
+        with bf_shell.BfShellClient(self.target_ip, telnet_port, timeout=timeout) as client:
+            results = port_setup.run_port_setup(client, batches)
+
+        return self._check_bf_shell_results(results)
+
+    def _check_bf_shell_results(self, results):
+        """_check_bf_shell_results.
+
+        Raises a RuntimeError if a bf_shell command failed.
+        """
+        failed = [result for result in results if result.error]
+        if failed:
+            raise RuntimeError("{} of {} bf_shell commands failed - see log for details".format(
+                len(failed), len(results)))
 
-        logging.info("Closing Telnet")
-        s_fd.close()
-        s.close()
+        logging.info("Sent {} bf_shell commands".format(len(results)))
+        return results
 
     def teardown(self):
         """teardown.
@@ -0,0 +1,116 @@
+import io
+import json
+import logging
+
+from .topology_controller import TopologyController, get_required_resources
+
+
+def pack_tenants(irs, env, base_offset=0, placement='file'):
+    """pack_tenants.
+
+    Packs several independent topologies (tenants) onto one environment.
+    Every placed tenant gets a disjoint share of the wire loops and host
+    links and a disjoint range of vRouter numbers. As all routes are keyed
+    by the vRouter number, each tenant also has its own address namespace,
+    the address spaces of the tenants may overlap.
+
+    To place as many tenants as possible, they are taken in the order of
+    their demand relative to the environment (smallest first) as long as the
+    remaining wire loops and host links suffice.
+
+    Parameters
+    ----------
+    irs :
+        dict - {tenant name: IR}, tenants are placed in this order
+    env :
+        dict - parsed env.json
+    base_offset :
+        int (default: 0) - vRouter offset of the first tenant
+    placement :
+        str (default: 'file') - placement strategy within the share of each
+        tenant, see `pipe_placement.PLACEMENT_STRATEGIES`. It is stored in
+        the manifest, so every tenant is mapped the same way when its host
+        configuration is created and when it is deployed.
+
+    Returns
+    ----------
+    dict : manifest `{"tenants": {name: {"vRouter_offset": int, "env":
+    env.json of the tenant}}, "unplaced": [names], "placement": str}`
+    """
+    free_links = len(env["links"])
+    free_host_links = len(env["host_links"])
+
+    demands = {name: get_required_resources(ir) for name, ir in irs.items()}
+
+    def relative_demand(name):
+        links, host_links = demands[name]
+        return links / max(free_links, 1) + host_links / max(free_host_links, 1)
+
+    placed = set()
+    for name in sorted(irs, key=relative_demand):
+        links, host_links = demands[name]
+        if links <= free_links and host_links <= free_host_links:
+            placed.add(name)
+            free_links -= links
+            free_host_links -= host_links
+
+    metadata = env.get("ports")
+    manifest = {"tenants": {}, "unplaced": [], "placement": placement}
+    next_link = 0
+    next_host_link = 0
+    vRouter_offset = base_offset
+    for name, ir in irs.items():
+        if name not in placed:
+            logging.warning("Tenant {} needs {} wire loops and {} host links and does not fit".format(
+                name, *demands[name]))
+            manifest["unplaced"].append(name)
+            continue
+
+        links, host_links = demands[name]
+        tenant_env = {
+            "links": env["links"][next_link:next_link + links],
+            "host_links": env["host_links"][next_host_link:next_host_link + host_links]
+        }
+        next_link += links
+        next_host_link += host_links
+
+        if metadata:
+            ports = {str(port) for link in tenant_env["links"] for port in link}
+            ports |= {str(link[1]) for link in tenant_env["host_links"]}
+            tenant_env["ports"] = {port: value for port, value in metadata.items()
+                                   if port in ports}
+
+        manifest["tenants"][name] = {
+            "vRouter_offset": vRouter_offset,
+            "env": tenant_env
+        }
+        logging.info("Tenant {}: {} wire loops, {} host links, vRouter numbers from {}".format(
+            name, links, host_links, vRouter_offset + 1))
+
+        vRouter_offset += max((int(router_id) for router_id in ir['vRouter']), default=0)
+
+    return manifest
+
+
+def create_tenant_controller(manifest, name, ir_fd):
+    """create_tenant_controller.
+
+    Maps the topology of a tenant onto its share of the environment with the
+    placement strategy of the manifest.
+
+    Parameters
+    ----------
+    manifest :
+        dict - result of `pack_tenants()`
+    name :
+        str - name of the tenant
+    ir_fd :
+        File descriptor for the intermediate representation of the tenant
+    """
+    if name not in manifest["tenants"]:
+        raise ValueError("`{}` is not a placed tenant of the manifest".format(name))
+
+    tenant = manifest["tenants"][name]
+    return TopologyController(io.StringIO(json.dumps(tenant["env"])), ir_fd=ir_fd,
+                              placement=manifest.get("placement", 'file'),
+                              vRouter_offset=tenant["vRouter_offset"])
@@ -0,0 +1,119 @@
+import io
+import json
+import logging
+import unittest
+
+from . import tenants
+from . import topology_generator
+from .simulator import DataPlaneSimulator
+from .topology_controller import TopologyController
+from .topology_controller_test import FakeConnector
+
+logging.basicConfig(level=logging.INFO)
+
+
+def tenant_irs():
+    """tenant_irs.
+
+    Returns the IRs of three tenants, which all use the default address
+    space.
+    """
+    return {
+        "large": topology_generator.generate_topo('large').get_IR_representation(),
+        "medium": topology_generator.generate_topo('medium').get_IR_representation(),
+        "hops": topology_generator.generate_topo('n_hops', hops=4).get_IR_representation()
+    }
+
+
+def shared_env():
+    """shared_env.
+
+    Returns an env.json with room for the large and one more small tenant.
+    """
+    return {
+        "host_links": [["h{}".format(i + 1), 100 + i] for i in range(21)],
+        "links": [[2 * i, 2 * i + 1] for i in range(14)]
+    }
+
+
+def create_controllers(irs, manifest):
+    """create_controllers.
+    """
+    return {name: tenants.create_tenant_controller(
+        manifest, name, io.StringIO(json.dumps(irs[name])))
+        for name in manifest["tenants"]}
+
+
+###########################################################
+class TestTenantPacking(unittest.TestCase):
+    """TestTenantPacking.
+    """
+
+    def test_packing_places_most_tenants(self):
+        """test_packing_places_most_tenants.
+        """
+        irs = tenant_irs()
+        manifest = tenants.pack_tenants(irs, shared_env())
+
+        # The large tenant leaves room for one of the small ones only, so
+        # both small ones are placed instead
+        self.assertEqual(list(manifest["tenants"]), ["medium", "hops"])
+        self.assertEqual(manifest["unplaced"], ["large"])
+
+        ports = [port for tenant in manifest["tenants"].values()
+                 for link in tenant["env"]["links"] for port in link]
+        ports += [link[1] for tenant in manifest["tenants"].values()
+                  for link in tenant["env"]["host_links"]]
+        self.assertEqual(len(ports), len(set(ports)))
+
+        vRouter_numbers = [number for controller in create_controllers(irs, manifest).values()
+                           for number in set(controller.get_expected_entries()[0].values())]
+        self.assertEqual(len(vRouter_numbers), len(set(vRouter_numbers)))
+
+    def test_tenants_are_deployed_and_removed_independently(self):
+        """test_tenants_are_deployed_and_removed_independently.
+        """
+        irs = tenant_irs()
+        del irs["large"]
+        manifest = tenants.pack_tenants(irs, shared_env())
+        controllers = create_controllers(irs, manifest)
+
+        connector = FakeConnector(batch_size=20)
+        for controller in controllers.values():
+            controller.deploy(connector)
+            self.assertEqual(list(DataPlaneSimulator(controller).run().failed_pairs()), [])
+        hops_ports, hops_routes = controllers["hops"].get_expected_entries()
+
+        # Redeploying one tenant does not touch the entries of the other
+        port_diff, route_diff = controllers["medium"].deploy_incremental(
+            connector, scoped=True)
+        self.assertEqual(sum(len(updates) for updates in port_diff + route_diff), 0)
+
+        controllers["medium"].remove(connector)
+        self.assertEqual(connector.port_table, hops_ports)
+        self.assertEqual(connector.route_table, hops_routes)
+
+    def test_manifest_keeps_the_placement(self):
+        """test_manifest_keeps_the_placement.
+        """
+        irs = {"large": tenant_irs()["large"]}
+        env = shared_env()
+        # Every second wire loop and host link is in pipe 1
+        env["ports"] = {str(port): {"pipe": (port // 2) % 2}
+                        for port in range(28)}
+        env["ports"].update({str(100 + i): {"pipe": i % 2} for i in range(21)})
+
+        manifest = tenants.pack_tenants(irs, env, placement='pipe')
+        self.assertEqual(manifest["placement"], 'pipe')
+
+        tenant = manifest["tenants"]["large"]
+        mapped = {placement: TopologyController(
+            io.StringIO(json.dumps(tenant["env"])), ir_fd=io.StringIO(json.dumps(irs["large"])),
+            placement=placement).port_mapping for placement in ('file', 'pipe')}
+        self.assertNotEqual(mapped['file'], mapped['pipe'])
+        self.assertEqual(create_controllers(irs, manifest)["large"].port_mapping, mapped['pipe'])
+
+
+################################################
+if __name__ == '__main__':
+    unittest.main()
@@ -1,16 +1,94 @@
-import ipaddress
 from abc import abstractmethod, ABC
+from collections import namedtuple
 import logging
 
+from . import address_allocator
+from . import route_aggregation
 
-# The ADDRESS_SPACE variable holds the IP Address space used for topology
-# generation. The Each _Node gets a  portion from this ADDRESS_SPACE
-# during initialization.
-ADDRESS_SPACE = ipaddress.IPv4Network("10.42.0.0/16")
 
-# The SUBNET_PREFIX allows to configure the desired network size each _Node
-# gets assinged during initialization.
-SUBNET_PREFIX = 24
+# The ADDRESS_SPACE variable holds the default IP Address space used for
+# topology generation. Each _Node gets a portion from the address space of
+# its AddressAllocator during initialization.
+ADDRESS_SPACE = address_allocator.DEFAULT_ADDRESS_SPACE
+
+# The SUBNET_PREFIX is the default network size each _Node gets assinged
+# during initialization.
+SUBNET_PREFIX = address_allocator.DEFAULT_PREFIX
+
+# A pre-order visitor returns SKIP_SUBTREE from `visit_vRouter()` to skip the
+# neighbors of the vRouter, see `traverse()`.
+SKIP_SUBTREE = object()
+
+# A RouteDelta holds the changes of an incremental topology update.
+# `added` and `removed` contain (vRouter id, port, network) routes, `linked`
+# and `unlinked` the (vRouter, port, _Node) links which were created or
+# removed, in pre-order. Ports of `unlinked` are the ports before the removal.
+RouteDelta = namedtuple("RouteDelta", ["added", "removed", "linked", "unlinked"])
+
+
+def traverse(root, visitor):
+    """traverse.
+
+    Walks the tree below `root` with an explicit stack and applies the
+    visitor to every _Node. `AbstractPreOderVTopologyVisitor`s visit a
+    vRouter before its neighbors, `AbstractPostOrderVTopologyVisitor`s after
+    its neighbors. Hosts are visited by every visitor. If `visit_vRouter()`
+    of a pre-order visitor returns `SKIP_SUBTREE`, the _Nodes below the
+    vRouter are not visited.
+
+    The traversal order is decided once per walk and the visit method is
+    looked up by the `type` of the _Node, so there is neither an
+    `isinstance` check per _Node nor a recursion depth limit.
+
+    Parameters
+    ----------
+    root :
+        _Node - Root of the (sub-)tree to walk
+    visitor :
+        AbstractVTopologyVisitor - Visitor to be applied on all _Nodes
+    """
+    visit_host = visitor.visit_Host
+    visit_router = visitor.visit_vRouter
+
+    if isinstance(visitor, AbstractPreOderVTopologyVisitor):
+        stack = [root]
+        pop = stack.pop
+        extend = stack.extend
+        while stack:
+            node = pop()
+            if node.type == 'vRouter':
+                if visit_router(node) is not SKIP_SUBTREE:
+                    extend(reversed(node.neighbors))
+            else:
+                visit_host(node)
+
+    elif isinstance(visitor, AbstractPostOrderVTopologyVisitor):
+        # Each stack element is (node, expanded). A vRouter is visited once
+        # all its neighbors (pushed on top of it) were visited.
+        stack = [(root, False)]
+        pop = stack.pop
+        append = stack.append
+        while stack:
+            node, expanded = pop()
+            if node.type != 'vRouter':
+                visit_host(node)
+            elif expanded:
+                visit_router(node)
+            else:
+                append((node, True))
+                for neighbor in reversed(node.neighbors):
+                    append((neighbor, False))
+
+    else:
+        stack = [root]
+        pop = stack.pop
+        extend = stack.extend
+        while stack:
+            node = pop()
+            if node.type == 'vRouter':
+                extend(reversed(node.neighbors))
+            else:
+                visit_host(node)
 
 
 class V_topology:
@@ -19,44 +97,86 @@ class V_topology:
     `AbstractPreOderVTopologyVisitor` to walk the topology tree.
     """
 
-    _next_subnet = 0
-    available_subnets = list(ADDRESS_SPACE.subnets(new_prefix=SUBNET_PREFIX))
-
-    def __init__(self, router):
+    def __init__(self, router=None, allocator=None):
         """__init__.
 
+        Each V_topology owns the id and address allocation of its _Nodes.
+        Hence several topologies can be built independently of each other in
+        one process. _Nodes are created for a topology, either directly
+        (`vRouter(topo=topo)`) or with `add_vRouter()` / `add_Host()`.
+
         Parameters
         ----------
         router :
-            router
+            vRouter - (optional) root router of the topology. Has to be
+            created for this topology. Can be set later using
+            `set_root_router()` or `add_vRouter()`.
+        allocator :
+            AddressAllocator - Address plan of the topology. Defaults to a
+            new `AddressAllocator()` (10.42.0.0/16 with /24 networks).
         """
 
-        assert isinstance(router, vRouter)
+        assert router is None or isinstance(router, vRouter)
         self.router = router
+        self.allocator = allocator if allocator is not None else address_allocator.AddressAllocator()
+        self._next_id = 1
+        self.summarized = False
         logging.info("V_topology initialized")
 
-        logging.info("Using {} /{} subnets in {} ".format(
-            len(V_topology.available_subnets), SUBNET_PREFIX, ADDRESS_SPACE))
+        logging.info("Using address plan {}".format(self.allocator))
+
+    def next_node_id(self):
+        """next_node_id.
+
+        Returns the next free _Node id of this topology. Ids start at 1.
+        """
+        node_id = self._next_id
+        self._next_id += 1
+        return node_id
 
-    def get_next_free_subnet(node):
-        """get_next_free_subnet.
+    def add_vRouter(self, parent=None, name="vRouter"):
+        """add_vRouter.
 
-        This class-method manages the sub-net assignment.
+        Creates a new vRouter for this topology. Without a parent the vRouter
+        becomes the root router.
 
         Parameters
         ----------
-        node :
-            node
+        parent :
+            vRouter - (optional) vRouter the new vRouter is linked to
+        name :
+            string - name prefix of the vRouter
 
-        Returns:
-        ---------
-        IPv4Network : An Network inside of ADDRESS_SPACE of size SUBNET_PREFIX
+        Returns
+        ----------
+        vRouter : The new vRouter
         """
+        router = vRouter(name, topo=self)
+        if parent is None:
+            self.set_root_router(router)
+        else:
+            parent.add_link(router)
+        return router
+
+    def add_Host(self, parent, name="Host"):
+        """add_Host.
 
-        V_topology._next_subnet += 1
-        logging.debug("Assigned {} to {}".format(
-            V_topology.available_subnets[V_topology._next_subnet - 1], node))
-        return V_topology.available_subnets[V_topology._next_subnet - 1]
+        Creates a new Host for this topology and links it to `parent`.
+
+        Parameters
+        ----------
+        parent :
+            vRouter - vRouter the Host is connected to
+        name :
+            string - name prefix of the Host
+
+        Returns
+        ----------
+        Host : The new Host
+        """
+        host = Host(name, topo=self)
+        parent.add_link(host)
+        return host
 
     def set_root_router(self, router):
         """set_root_router.
@@ -78,13 +198,15 @@ class V_topology:
 
         This meta-function applies a AbstractVTopologyVisitor to the topology.
         The visitor has to be a subclass of AbstractVTopologyVisitor!
+        The topology is walked iteratively (see `traverse()`), hence arbitrary
+        deep topologies can be visited.
 
         Parameters
         ----------
         visitor :
             AbstractVTopologyVisitor
         """
-        self.router.accept(visitor)
+        traverse(self.router, visitor)
 
     def update_all_routing_tables(self):
         """update_all_routing_tables.
@@ -96,6 +218,225 @@ class V_topology:
         """
         rt_visitor = UpdateRoutingTableVisitor()
         self.apply_visitor(rt_visitor)
+        self.summarized = False
+
+    def assign_aggregatable_subnets(self):
+        """assign_aggregatable_subnets.
+
+        Re-assigns the uplink networks of all _Nodes, so that every subtree
+        occupies one contiguous block of subnets. The routes towards a subtree
+        can then be summarized into few prefixes (see
+        `summarize_routing_tables()`).
+
+        The blocks of the children are placed in descending alignment at the
+        beginning of the block of a vRouter, its own uplink network fills the
+        first alignment gap or follows after the children. A block is rounded
+        up to an aligned block of 2^k slots (see `AddressAllocator`), which is
+        summarized into a single route, as long as this at most doubles the
+        number of slots of the subtree. Deep subtrees, e.g. long chains, keep
+        their exact size instead and need a few routes, so the topology never
+        needs more than about twice as many slots as it has _Nodes.
+        Raises a ValueError if the address space has not enough slots.
+
+        Routing tables have to be (re-)computed after calling this method.
+        """
+        block_visitor = SubnetBlockSizeVisitor()
+        self.apply_visitor(block_visitor)
+
+        required = block_visitor.block_sizes[self.router]
+        available = self.allocator.slot_count()
+        if required > available:
+            raise ValueError("Topology needs {} /{} subnets, but {} only provides {}".format(
+                required, self.allocator.slot_prefix, self.allocator.address_space, available))
+
+        assign_visitor = AggregatableSubnetVisitor(block_visitor, self.allocator)
+        assign_visitor.block_starts[self.router] = 0
+        self.apply_visitor(assign_visitor)
+
+        # _Nodes added later get networks after the assigned block
+        self.allocator.allocate_after_slots(required)
+
+        logging.info("Assigned aggregatable subnets using {} of {} /{} subnets".format(
+            required, available, self.allocator.slot_prefix))
+
+    def summarize_routing_tables(self, verify=False):
+        """summarize_routing_tables.
+
+        Replaces the routing table of each vRouter with a summarized one. All
+        routes of an egress port are merged into as few prefixes as possible,
+        without covering any network which is routed elsewhere. Combined with
+        `assign_aggregatable_subnets()` each vRouter ends up with one route
+        per port.
+
+        Parameters
+        ----------
+        verify :
+            Bool (default: False) - Check that each summarized table forwards
+            every assigned network to the same port as the original table.
+            Raises a RuntimeError otherwise.
+        """
+        networks_visitor = AssignedNetworksVisitor()
+        self.apply_visitor(networks_visitor)
+        assigned = route_aggregation.AssignedPrefixes(networks_visitor.networks)
+
+        summarize_visitor = SummarizeRoutingTableVisitor(assigned, verify)
+        self.apply_visitor(summarize_visitor)
+
+        self.summarized = True
+
+        logging.info("Summarized routing tables from {} to {} routes".format(
+            summarize_visitor.routes_before, summarize_visitor.routes_after))
+
+    def _update_path(self, router, added, removed):
+        """_update_path.
+
+        Recomputes the routing tables of `router` and all vRouters above it
+        and collects the changed routes. The tables of all other vRouters do
+        not depend on the change.
+        """
+        while router is not None:
+            old_table = router.routingtable
+            router.set_routing_table()
+
+            old_routes = set(old_table)
+            new_routes = set(router.routingtable)
+            removed.extend((router.id, port, network) for port, network in old_table
+                           if (port, network) not in new_routes)
+            added.extend((router.id, port, network) for port, network in router.routingtable
+                         if (port, network) not in old_routes)
+
+            router = router.parent
+
+    def _check_incremental_update(self):
+        """_check_incremental_update.
+        """
+        if self.summarized:
+            raise RuntimeError(
+                "Summarized routing tables can not be updated incrementally")
+
+    def add_subtree(self, parent, node):
+        """add_subtree.
+
+        Links a _Node (and the subtree below it) to `parent` and updates the
+        routing tables incrementally: The tables of the new subtree are
+        calculated and only the tables on the path from `parent` to the root
+        are recomputed. The routing tables of the topology have to be up to
+        date before.
+
+        Parameters
+        ----------
+        parent :
+            vRouter - vRouter of the topology the subtree is linked to
+        node :
+            _Node - Root of the subtree. It has to be created for this
+            topology and must not be linked yet.
+
+        Returns
+        ----------
+        RouteDelta : Routes and links which were added. The new subtree is
+        linked to the last port of `parent`.
+        """
+        self._check_incremental_update()
+        if node.parent is not None or node is self.router:
+            raise RuntimeError("{} is already part of the topology".format(node))
+
+        parent.add_link(node)
+        traverse(node, UpdateRoutingTableVisitor())
+
+        added = []
+        linked = [(parent, len(parent.neighbors), node)]
+        link_visitor = LinkCollectorVisitor(linked)
+        traverse(node, link_visitor)
+        for router in link_visitor.routers:
+            added.extend((router.id, port, network)
+                         for port, network in router.routingtable)
+
+        self._update_path(parent, added, [])
+
+        logging.info("Added subtree {} to {}: {} routes added".format(
+            node, parent, len(added)))
+        return RouteDelta(added, [], linked, [])
+
+    def remove_subtree(self, node):
+        """remove_subtree.
+
+        Unlinks a _Node (and the subtree below it) from its parent and
+        updates the routing tables on the path to the root. The neighbours
+        behind the removed one move up by one port.
+
+        Parameters
+        ----------
+        node :
+            _Node - Root of the subtree, must not be the root router
+
+        Returns
+        ----------
+        RouteDelta : Routes and links which were removed, including all
+        routes of the vRouters in the subtree. As the ports of the following
+        neighbours change, their routes are removed and added again.
+        """
+        self._check_incremental_update()
+        parent = node.parent
+        if parent is None:
+            raise RuntimeError(
+                "{} is the root or not part of the topology".format(node))
+
+        unlinked = [(parent, parent.neighbors.index(node) + 1, node)]
+        link_visitor = LinkCollectorVisitor(unlinked)
+        traverse(node, link_visitor)
+
+        removed = []
+        for router in link_visitor.routers:
+            removed.extend((router.id, port, network)
+                           for port, network in router.routingtable)
+
+        parent.remove_link(node)
+
+        added = []
+        self._update_path(parent, added, removed)
+
+        logging.info("Removed subtree {} from {}: {} routes removed, {} added".format(
+            node, parent, len(removed), len(added)))
+        return RouteDelta(added, removed, [], unlinked)
+
+    def insert_Host(self, parent, name="Host"):
+        """insert_Host.
+
+        Creates a new Host, links it to `parent` and updates the routing
+        tables incrementally, see `add_subtree()`.
+
+        Parameters
+        ----------
+        parent :
+            vRouter - vRouter the Host is connected to
+        name :
+            string - name prefix of the Host
+
+        Returns
+        ----------
+        (Host, RouteDelta) : The new Host and the changes
+        """
+        host = Host(name, topo=self)
+        return host, self.add_subtree(parent, host)
+
+    def remove_Host(self, host):
+        """remove_Host.
+
+        Unlinks a Host and updates the routing tables incrementally, see
+        `remove_subtree()`.
+
+        Parameters
+        ----------
+        host :
+            Host
+
+        Returns
+        ----------
+        RouteDelta
+        """
+        if host.type != 'host':
+            raise RuntimeError("{} is not a Host".format(host))
+        return self.remove_subtree(host)
 
     def get_IR_representation(self):
         """get_IR_representation.
@@ -125,12 +466,14 @@ class V_topology:
                     "uplink_network" : "10.0.5.0/24",
                 },
                 ...
-            }
+            },
+            "address_space" : "10.42.0.0/16"
         }
         ```
         """
         ir_visit = IntermediateRepresentationVisitor()
         self.apply_visitor(ir_visit)
+        ir_visit.builder["address_space"] = self.allocator.address_space.compressed
         return ir_visit.builder
 
 
@@ -140,20 +483,40 @@ class _Node(ABC):
     Abstract _Node implementation. This class specifies how a topology node has
     to look like. This class must not be initialized!
     """
-    next_id = 1
 
-    def __init__(self, name):
+    def __init__(self, name, topo):
         """__init__.
 
         Parameters
         ----------
         name :
-            string
+            string - name prefix, the id of the _Node is appended
+        topo :
+            V_topology - Topology the _Node belongs to. The id and the uplink
+            network are allocated by this topology.
         """
-        self.name = name
-        self.uplink_network = V_topology.get_next_free_subnet(self)
-        self.ipv4Adress = self.uplink_network.network_address + 1
+        if topo is None:
+            raise RuntimeError("A _Node has to be created for a V_topology")
+
+        self.id = topo.next_node_id()
+        self.name = name + str(self.id)
+        self.parent = None
         self.routingtable = []
+        self.set_uplink_network(topo.allocator.allocate(self.type))
+        logging.debug("Assigned {} to {}".format(self.uplink_network, self))
+
+    def set_uplink_network(self, network):
+        """set_uplink_network.
+
+        Assigns the network shared with the parent _Node.
+
+        Parameters
+        ----------
+        network :
+            IPv4Network
+        """
+        self.uplink_network = network
+        self.ipv4Adress = self.uplink_network.network_address + 1
 
     @ abstractmethod
     def get_IR_representation(self, dict_builder):
@@ -186,7 +549,6 @@ class _Node(ABC):
     def __str__(self):
         """__str__.
         """
-        # pylint: disable=no-member
         return "(" + self.name + "_" + str(self.id) + ")"
 
 
@@ -194,20 +556,20 @@ class vRouter(_Node):
     """vRouter.
     """
 
-    def __init__(self, name="vRouter"):
+    def __init__(self, name="vRouter", topo=None):
         """__init__.
 
         Parameters
         ----------
         name :
             name
+        topo :
+            V_topology - Topology the vRouter belongs to
         """
 
-        self.id = _Node.next_id
         self.type = 'vRouter'
-        _Node.next_id += 1
         self.neighbors = []
-        super().__init__(name + str(self.id))
+        super().__init__(name, topo)
 
     def add_link(self, other_node):
         """add_link.
@@ -218,6 +580,18 @@ class vRouter(_Node):
             _Node (So either vRouter or Host)
         """
         self.neighbors.append(other_node)
+        other_node.parent = self
+
+    def remove_link(self, other_node):
+        """remove_link.
+
+        Parameters
+        ----------
+        other_node :
+            _Node - neighbour to be unlinked
+        """
+        self.neighbors.remove(other_node)
+        other_node.parent = None
 
     def accept(self, visitor):
         """accept.
@@ -227,14 +601,7 @@ class vRouter(_Node):
         visitor :
             AbstractVTopologyVisitor - Visitor to be applied on the Node
         """
-        if isinstance(visitor, AbstractPreOderVTopologyVisitor):
-            visitor.visit_vRouter(self)
-
-        for neighbor in self.neighbors:
-            neighbor.accept(visitor)
-
-        if isinstance(visitor, AbstractPostOrderVTopologyVisitor):
-            visitor.visit_vRouter(self)
+        traverse(self, visitor)
 
     def get_dot_representation(self, with_routingtable=False):
         """get_dot_representation.
@@ -245,20 +612,17 @@ class vRouter(_Node):
             Bool (default: False) - Specifies if the dot representation should
             contain the routing table
         """
-        edges = ""
-        for idx, n in enumerate(self.neighbors):
-            edges += '{} -- {} [headlabel = 0, taillabel="{}"] \n'.format(self.id, n.id, idx + 1) 
-
-        router_box = ""
         if with_routingtable:
-            router_box = str(self.id) + "[\nlabel = \"{" + str(self.name)
-            for route in self.routingtable:
-                router_box += "|" + str(route)
-            router_box += "}\" \nshape=\"record\"]\n"
+            parts = [str(self.id), "[\nlabel = \"{", str(self.name)]
+            parts.extend("|" + str(route) for route in self.routingtable)
+            parts.append("}\" \nshape=\"record\"]\n")
         else:
-            router_box += str(self.id) + "[shape=box]\n"
+            parts = [str(self.id), "[shape=box]\n"]
+
+        parts.extend('{} -- {} [headlabel = 0, taillabel="{}"] \n'.format(self.id, n.id, idx + 1)
+                     for idx, n in enumerate(self.neighbors))
 
-        return router_box + edges
+        return "".join(parts)
 
     def get_IR_representation(self, dict_builder):
         """get_IR_representation.
@@ -285,7 +649,11 @@ class vRouter(_Node):
 
     def set_routing_table(self):
         """set_routing_table.
+
+        Calculates the routing table from the tables of the neighbours. A
+        previous table is replaced.
         """
+        self.routingtable = []
         for i in range(len(self.neighbors)):
 
             # Store the current neighbour in a varaible for easy access
@@ -303,6 +671,32 @@ class vRouter(_Node):
         logging.debug("{} has new routing table: {}".format(
             self, self.routingtable))
 
+    def summarize_routing_table(self, assigned, verify=False):
+        """summarize_routing_table.
+
+        Parameters
+        ----------
+        assigned :
+            route_aggregation.AssignedPrefixes - All networks assigned in the
+            topology
+        verify :
+            Bool (default: False) - Raise a RuntimeError if the summarized
+            table forwards any assigned network differently
+        """
+        summarized = route_aggregation.summarize_routing_table(
+            self.routingtable, assigned)
+
+        if verify:
+            mismatches = route_aggregation.compare_forwarding(
+                self.routingtable, summarized, assigned)
+            if mismatches:
+                raise RuntimeError("Summarized routing table of {} forwards {} networks differently: {}".format(
+                    self, len(mismatches), mismatches[:10]))
+
+        logging.debug("{} summarized routing table from {} to {} routes".format(
+            self, len(self.routingtable), len(summarized)))
+        self.routingtable = summarized
+
 
 class Host(_Node):
     """Host.
@@ -311,25 +705,40 @@ class Host(_Node):
     leaf _Node.
     """
 
-    def __init__(self, name="Host"):
+    # A Host never has neighbors below it
+    neighbors = ()
+
+    def __init__(self, name="Host", topo=None):
         """__init__.
 
         Parameters
         ----------
         name :
             string - hostname of the Host
+        topo :
+            V_topology - Topology the Host belongs to
         """
 
-        self.id = _Node.next_id
         self.type = "host"
-        _Node.next_id += 1
 
-        super().__init__(name + str(self.id))
+        super().__init__(name, topo)
+
+    def set_uplink_network(self, network):
+        """set_uplink_network.
+
+        Assigns the network shared with the parent vRouter and derives the
+        address configuration of the Host from it.
+
+        Parameters
+        ----------
+        network :
+            IPv4Network
+        """
+        super().set_uplink_network(network)
 
-        subnet = self.uplink_network.compressed.split('.')[2]
-        self.mac_address = "08:00:00:00:{}:{}".format(subnet, 1)
+        self.mac_address = address_allocator.derive_mac_address(network)
         self.ip_address = str(
-            self.uplink_network[1]) + "/" + str(SUBNET_PREFIX)
+            self.uplink_network[1]) + "/" + str(self.uplink_network.prefixlen)
 
     def accept(self, visitor):
         """accept.
@@ -447,6 +856,46 @@ class UpdateRoutingTableVisitor(AbstractPostOrderVTopologyVisitor):
         host.set_routing_table()
 
 
+class LinkCollectorVisitor(AbstractPreOderVTopologyVisitor):
+    """LinkCollectorVisitor.
+
+    Collects all links of a (sub-)tree as (vRouter, port, _Node) tuples and
+    all vRouters in pre-order.
+    """
+
+    def __init__(self, links=None):
+        """__init__.
+
+        Parameters
+        ----------
+        links :
+            list - (optional) list the links are appended to
+        """
+        self.links = links if links is not None else []
+        self.routers = []
+
+    def visit_vRouter(self, router):
+        """visit_vRouter.
+
+        Parameters
+        ----------
+        router :
+            vRouter
+        """
+        self.routers.append(router)
+        self.links.extend((router, port, neighbor)
+                          for port, neighbor in enumerate(router.neighbors, start=1))
+
+    def visit_Host(self, host):
+        """visit_Host.
+
+        Parameters
+        ----------
+        host :
+            host
+        """
+
+
 class PostOrderPrintNodeVisitor(AbstractPostOrderVTopologyVisitor):
     """PostOrderPrintNodeVisitor.
     """
@@ -505,12 +954,20 @@ class DotRepresentationVisitor(AbstractPreOderVTopologyVisitor):
 
     It can be specified if the visualization should also contain the routing table.
     This is switched of by default as it gets quite messy for big topologies.
+    The routing tables can also be limited to selected vRouters.
 
-    After the visitor was applied to the topology, the results can be obtained
-    by calling the `get_representation()` method.
+    To keep big topologies readable, subtrees can be collapsed into a single
+    summary node, either below a maximum depth or if they contain more than a
+    maximum number of _Nodes. The root router is never collapsed.
+
+    If a file descriptor is given, the representation is streamed to it while
+    the topology is walked and `close()` has to be called afterwards.
+    Otherwise the results can be obtained by calling the
+    `get_representation()` method after the visitor was applied.
     """
 
-    def __init__(self, with_routingtable=False):
+    def __init__(self, with_routingtable=False, fd=None, routingtable_routers=None,
+                 max_depth=None, subtree_sizes=None, max_subtree_size=None):
         """__init__.
 
         Parameters
@@ -518,19 +975,51 @@ class DotRepresentationVisitor(AbstractPreOderVTopologyVisitor):
         with_routingtable :
             Bool (default: False) - Specifies if the dot representation should
             contain the routing table
+        fd :
+            File Descriptor (optional) - the representation is streamed to
+        routingtable_routers :
+            set of int (optional) - ids of the vRouters whose routing table is
+            shown. Implies `with_routingtable`.
+        max_depth :
+            int (optional) - vRouters at this depth (the root has depth 0)
+            are drawn as summary of their subtree
+        subtree_sizes :
+            dict (optional) - {vRouter id: (vRouters, Hosts)} below each
+            vRouter as calculated by `SubtreeSizeVisitor`. Required for
+            collapsing.
+        max_subtree_size :
+            int (optional) - subtrees with more _Nodes (including their
+            vRouter) are drawn as summary node
         """
+        if (max_depth is not None or max_subtree_size is not None) and subtree_sizes is None:
+            raise ValueError("Collapsing subtrees requires the subtree sizes")
+
         self.prefix = "graph graphname {\n"
-        self.node_rep = ""
         self.suffix = "}"
         self.with_routingtable = with_routingtable
+        self.routingtable_routers = routingtable_routers
+        self.max_depth = max_depth
+        self.subtree_sizes = subtree_sizes
+        self.max_subtree_size = max_subtree_size
         self.was_executed = False
 
+        # {vRouter id: depth} of the vRouters which are not visited yet
+        self._depths = {}
+
+        self.fd = fd
+        self._parts = []
+        self._write = fd.write if fd is not None else self._parts.append
+        self._write(self.prefix)
+
     def get_representation(self):
         """get_representation.
 
         Returns a string containing the DOT representation of the topology.
         """
-        return self.prefix + self.node_rep + self.suffix
+        if self.fd is not None:
+            raise RuntimeError(
+                "The DOT representation was streamed to {}".format(self.fd))
+        return "".join(self._parts) + self.suffix
 
     def store_representation_to_file(self, file_fd):
         """store_representation_to_file.
@@ -543,6 +1032,25 @@ class DotRepresentationVisitor(AbstractPreOderVTopologyVisitor):
 
         file_fd.write(self.get_representation())
 
+    def close(self):
+        """close.
+
+        Finishes a streamed representation. The file descriptor is not
+        closed.
+        """
+        self.fd.write(self.suffix)
+
+    def _is_collapsed(self, router, depth):
+        """_is_collapsed.
+        """
+        if depth == 0 or not router.neighbors:
+            return False
+        if self.max_depth is not None and depth >= self.max_depth:
+            return True
+        if self.max_subtree_size is not None:
+            return 1 + sum(self.subtree_sizes[router.id]) > self.max_subtree_size
+        return False
+
     def visit_vRouter(self, router):
         """visit_vRouter.
 
@@ -552,8 +1060,23 @@ class DotRepresentationVisitor(AbstractPreOderVTopologyVisitor):
             vRouter
         """
         self.was_executed = True
-        self.node_rep += router.get_dot_representation(
-            with_routingtable=self.with_routingtable)
+        depth = self._depths.pop(router.id, 0)
+
+        if self._is_collapsed(router, depth):
+            routers, hosts = self.subtree_sizes[router.id]
+            self._write('{} [shape=box3d, label="{} \n +{} vRouters, {} hosts"]\n'.format(
+                router.id, router.name, routers, hosts))
+            return SKIP_SUBTREE
+
+        for neighbor in router.neighbors:
+            if neighbor.type == 'vRouter':
+                self._depths[neighbor.id] = depth + 1
+
+        with_routingtable = self.with_routingtable
+        if self.routingtable_routers is not None:
+            with_routingtable = router.id in self.routingtable_routers
+        self._write(router.get_dot_representation(
+            with_routingtable=with_routingtable))
 
     def visit_Host(self, host):
         """visit_Host.
@@ -564,7 +1087,81 @@ class DotRepresentationVisitor(AbstractPreOderVTopologyVisitor):
             host
         """
         self.was_executed = True
-        self.node_rep += host.get_dot_representation()
+        self._write(host.get_dot_representation())
+
+
+class SubtreeSizeVisitor(AbstractPostOrderVTopologyVisitor):
+    """SubtreeSizeVisitor.
+
+    Counts the vRouters and Hosts below each vRouter.
+    """
+
+    def __init__(self):
+        """__init__.
+        """
+        self.subtree_sizes = {}
+
+    def visit_vRouter(self, router):
+        """visit_vRouter.
+
+        Parameters
+        ----------
+        router :
+            vRouter
+        """
+        routers = 0
+        hosts = 0
+        for neighbor in router.neighbors:
+            if neighbor.type == 'vRouter':
+                below_routers, below_hosts = self.subtree_sizes[neighbor.id]
+                routers += below_routers + 1
+                hosts += below_hosts
+            else:
+                hosts += 1
+        self.subtree_sizes[router.id] = (routers, hosts)
+
+    def visit_Host(self, host):
+        """visit_Host.
+
+        Parameters
+        ----------
+        host :
+            host
+        """
+
+
+def write_dot_representation(topo, fd, with_routingtable=False, routingtable_routers=None,
+                             max_depth=None, max_subtree_size=None):
+    """write_dot_representation.
+
+    Streams the DOT representation of a topology to a file, see
+    `DotRepresentationVisitor`.
+
+    Parameters
+    ----------
+    topo :
+        V_topology - topology with calculated routing tables
+    fd :
+        File Descriptor the representation is written to. It is not closed.
+    with_routingtable :
+        Bool (default: False) - show the routing tables of all vRouters
+    routingtable_routers :
+        set of int (optional) - only show the routing tables of these vRouters
+    max_depth :
+        int (optional) - collapse the subtrees of vRouters at this depth
+    max_subtree_size :
+        int (optional) - collapse subtrees with more _Nodes
+    """
+    subtree_sizes = None
+    if max_depth is not None or max_subtree_size is not None:
+        size_visitor = SubtreeSizeVisitor()
+        topo.apply_visitor(size_visitor)
+        subtree_sizes = size_visitor.subtree_sizes
+
+    dot_visitor = DotRepresentationVisitor(
+        with_routingtable, fd, routingtable_routers, max_depth, subtree_sizes, max_subtree_size)
+    topo.apply_visitor(dot_visitor)
+    dot_visitor.close()
 
 
 class IntermediateRepresentationVisitor(AbstractPreOderVTopologyVisitor):
@@ -601,3 +1198,203 @@ class IntermediateRepresentationVisitor(AbstractPreOderVTopologyVisitor):
             host
         """
         host.get_IR_representation(self.builder)
+
+
+class SubnetBlockSizeVisitor(AbstractPostOrderVTopologyVisitor):
+    """SubnetBlockSizeVisitor.
+
+    Calculates for each _Node the block of allocator slots its subtree
+    occupies if addresses are assigned aggregatable, see
+    `Topology.assign_aggregatable_subnets()`.
+    """
+
+    def __init__(self):
+        """__init__.
+        """
+        # {_Node: number of slots of the block}
+        self.block_sizes = {}
+        # {_Node: power of two the start of the block has to be aligned to}
+        self.alignments = {}
+        # {_Node: offset of the block in the block of its parent}
+        self.offsets = {}
+        # {vRouter: offset of its uplink network in its block}
+        self.uplink_offsets = {}
+        # {_Node: number of _Nodes in the subtree}
+        self.node_counts = {}
+
+    def visit_vRouter(self, router):
+        """visit_vRouter.
+
+        Parameters
+        ----------
+        router :
+            vRouter
+        """
+        children = sorted(router.neighbors, key=lambda n: -self.alignments[n])
+
+        # Children in descending alignment, the own uplink network goes into
+        # the first alignment gap or after the children
+        offset = 0
+        uplink_offset = None
+        for child in children:
+            alignment = self.alignments[child]
+            start = -(-offset // alignment) * alignment
+            if uplink_offset is None and start > offset:
+                uplink_offset = offset
+            self.offsets[child] = start
+            offset = start + self.block_sizes[child]
+        if uplink_offset is None:
+            uplink_offset = offset
+            offset += 1
+        self.uplink_offsets[router] = uplink_offset
+
+        node_count = 1 + sum(self.node_counts[n] for n in router.neighbors)
+        self.node_counts[router] = node_count
+
+        # An aligned 2^k block is summarized into one route, but is only used
+        # while it wastes less than half of its slots. Otherwise the doubling
+        # compounds along deep paths.
+        aligned_size = 1 << (offset - 1).bit_length()
+        if aligned_size <= 2 * node_count:
+            self.block_sizes[router] = aligned_size
+            self.alignments[router] = aligned_size
+        else:
+            self.block_sizes[router] = offset
+            self.alignments[router] = self.alignments[children[0]]
+
+    def visit_Host(self, host):
+        """visit_Host.
+
+        Parameters
+        ----------
+        host :
+            host
+        """
+        self.block_sizes[host] = 1
+        self.alignments[host] = 1
+        self.node_counts[host] = 1
+
+
+class AggregatableSubnetVisitor(AbstractPreOderVTopologyVisitor):
+    """AggregatableSubnetVisitor.
+
+    Assigns each _Node its uplink network based on the blocks calculated by
+    the `SubnetBlockSizeVisitor`. The block start of the root _Node has to be
+    set before the visitor is applied.
+    """
+
+    def __init__(self, block_visitor, allocator):
+        """__init__.
+
+        Parameters
+        ----------
+        block_visitor :
+            SubnetBlockSizeVisitor - applied to the topology
+        allocator :
+            AddressAllocator - Allocator of the topology
+        """
+        self.block_visitor = block_visitor
+        self.block_starts = {}
+        self.allocator = allocator
+
+    def visit_vRouter(self, router):
+        """visit_vRouter.
+
+        Parameters
+        ----------
+        router :
+            vRouter
+        """
+        start = self.block_starts[router]
+        for neighbor in router.neighbors:
+            self.block_starts[neighbor] = start + self.block_visitor.offsets[neighbor]
+
+        router.set_uplink_network(self.allocator.slot_network(
+            start + self.block_visitor.uplink_offsets[router], router.type))
+
+    def visit_Host(self, host):
+        """visit_Host.
+
+        Parameters
+        ----------
+        host :
+            host
+        """
+        host.set_uplink_network(
+            self.allocator.slot_network(self.block_starts[host], host.type))
+
+
+class AssignedNetworksVisitor(AbstractPreOderVTopologyVisitor):
+    """AssignedNetworksVisitor.
+
+    Collects the uplink networks of all _Nodes.
+    """
+
+    def __init__(self):
+        """__init__.
+        """
+        self.networks = []
+
+    def visit_vRouter(self, router):
+        """visit_vRouter.
+
+        Parameters
+        ----------
+        router :
+            vRouter
+        """
+        self.networks.append(router.uplink_network)
+
+    def visit_Host(self, host):
+        """visit_Host.
+
+        Parameters
+        ----------
+        host :
+            host
+        """
+        self.networks.append(host.uplink_network)
+
+
+class SummarizeRoutingTableVisitor(AbstractPreOderVTopologyVisitor):
+    """SummarizeRoutingTableVisitor.
+
+    Summarizes the routing table of each vRouter. See
+    `V_topology.summarize_routing_tables()`.
+    """
+
+    def __init__(self, assigned, verify=False):
+        """__init__.
+
+        Parameters
+        ----------
+        assigned :
+            route_aggregation.AssignedPrefixes
+        verify :
+            Bool (default: False) - Verify forwarding equivalence
+        """
+        self.assigned = assigned
+        self.verify = verify
+        self.routes_before = 0
+        self.routes_after = 0
+
+    def visit_vRouter(self, router):
+        """visit_vRouter.
+
+        Parameters
+        ----------
+        router :
+            vRouter
+        """
+        self.routes_before += len(router.routingtable)
+        router.summarize_routing_table(self.assigned, self.verify)
+        self.routes_after += len(router.routingtable)
+
+    def visit_Host(self, host):
+        """visit_Host.
+
+        Parameters
+        ----------
+        host :
+            host
+        """
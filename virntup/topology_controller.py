@@ -1,16 +1,233 @@
+import ipaddress
 import json
 import logging
+from collections import deque, namedtuple
 
+from . import binary_ir
+from . import pipe_placement
 from . import topology
 
 
+# Destination MAC used for routes towards other vRouters
+DEFAULT_MAC = "08:00:00:00:00:00"
+
+# vRouter numbers are 32 bit match keys / action parameters of virntup.p4
+MAX_VROUTER_NUMBER = 2 ** 32 - 1
+
+# Table names of the keys journaled in `installed_entries` of a connector
+PORT_MAPPING = "port_mapping"
+ROUTES = "routes"
+
+# Minimum number of DELETEs per WriteRequest when a failed deployment is
+# rolled back
+ROLLBACK_BATCH_SIZE = 1000
+
+# A TableDiff holds the updates necessary to turn the current content of a
+# table into the expected one. `insert` and `modify` contain (key, value)
+# tuples, `delete` only keys.
+TableDiff = namedtuple("TableDiff", ["insert", "modify", "delete"])
+
+
+def get_required_resources(ir):
+    """get_required_resources.
+
+    Counts the links of a topology by the type of the neighbour.
+
+    Parameters
+    ----------
+    ir :
+        dict - IR of a topology
+
+    Returns
+    ----------
+    (int, int) : Number of wire loops and number of host links the topology
+    needs
+    """
+    required_links = 0
+    required_host_links = 0
+    for router in ir['vRouter'].values():
+        for neighbour in router["neighbors"]:
+            if neighbour[2] == 'vRouter':
+                required_links += 1
+            elif neighbour[2] == 'host':
+                required_host_links += 1
+    return required_links, required_host_links
+
+
+def diff_entries(expected, current):
+    """diff_entries.
+
+    Compares the expected with the current entries of a table.
+
+    Parameters
+    ----------
+    expected :
+        dict - {match key: action} entries the table should contain
+    current :
+        dict - {match key: action} entries the table contains
+
+    Returns
+    ----------
+    TableDiff
+    """
+    insert = []
+    modify = []
+    for key, value in expected.items():
+        current_value = current.get(key)
+        if current_value is None:
+            insert.append((key, value))
+        elif current_value != value:
+            modify.append((key, value))
+
+    delete = [key for key in current if key not in expected]
+
+    return TableDiff(insert, modify, delete)
+
+
+def finish_deployment(target_connector):
+    """finish_deployment.
+
+    Sends the remaining batched entries, closes the connection and raises a
+    RuntimeError if the target rejected any entry.
+
+    Parameters
+    ----------
+    target_connector :
+        target_connector object which was used for the deployment
+    """
+    target_connector.flush()
+
+    target_connector.teardown()
+
+    check_write_errors(target_connector)
+
+    logging.info("Deployed {} table entries".format(
+        target_connector.written_updates))
+
+
+def check_write_errors(target_connector):
+    """check_write_errors.
+
+    Raises a RuntimeError if the target rejected any entry.
+    """
+    if target_connector.write_errors:
+        raise RuntimeError("{} table entries were rejected by the target - see log for details".format(
+            len(target_connector.write_errors)))
+
+
+def deploy_transactionally(target_connector, write_entries, rollback=True):
+    """deploy_transactionally.
+
+    Runs a deployment which inserts entries through the target connector.
+    If an entry is rejected or the deployment fails otherwise, the entries
+    journaled in `installed_entries` are deleted again (see
+    `rollback_deployment()`) before the error is raised. Otherwise the
+    deployment is finished, see `finish_deployment()`.
+
+    Parameters
+    ----------
+    target_connector :
+        target_connector object which is used for the deployment
+    write_entries :
+        callable - writes the entries of the deployment
+    rollback :
+        bool (default: True) - Roll back the installed entries on failure
+    """
+    target_connector.installed_entries = []
+    try:
+        write_entries()
+        target_connector.flush()
+        check_write_errors(target_connector)
+    except (Exception, KeyboardInterrupt):
+        if rollback:
+            rollback_deployment(target_connector)
+        target_connector.teardown()
+        raise
+
+    finish_deployment(target_connector)
+
+
+def rollback_deployment(target_connector):
+    """rollback_deployment.
+
+    Deletes the entries a failed deployment installed, as journaled by the
+    connector in `installed_entries`, in batches of at least
+    ROLLBACK_BATCH_SIZE DELETEs. Queued inserts are sent first, so they are
+    journaled and removed as well. The port mappings are deleted before the
+    routes, so no traffic reaches the vRouters whose routes are removed.
+
+    Failures of the rollback are only logged, so the error of the
+    deployment is not hidden.
+
+    Parameters
+    ----------
+    target_connector :
+        target_connector object which was used for the deployment
+
+    Returns
+    ----------
+    int : Number of deleted entries
+    """
+    batch_size = target_connector.batch_size
+    target_connector.batch_size = max(batch_size, ROLLBACK_BATCH_SIZE)
+    try:
+        target_connector.flush()
+
+        entries = target_connector.installed_entries
+        target_connector.installed_entries = []
+        errors = len(target_connector.write_errors)
+        logging.warning("Rolling back {} installed table entries".format(len(entries)))
+
+        for table, key in entries:
+            if table == PORT_MAPPING:
+                target_connector.delete_vRouter_port_mapping(key)
+        for table, key in entries:
+            if table == ROUTES:
+                target_connector.delete_route(*key)
+        target_connector.flush()
+    except Exception as e:
+        logging.error("Rollback failed, entries of the deployment may remain - run `virntup teardown`: {}".format(e))
+        return 0
+    finally:
+        target_connector.batch_size = batch_size
+
+    failed = len(target_connector.write_errors) - errors
+    if failed:
+        logging.error("{} DELETEs of the rollback were rejected - run `virntup teardown`".format(failed))
+    return len(entries) - failed
+
+
+class InsufficientEnvironmentError(RuntimeError):
+    """InsufficientEnvironmentError.
+
+    Raised if the environment does not provide enough wire loops or host
+    links for a topology.
+    """
+
+    def __init__(self, missing_links, missing_host_links, message):
+        """__init__.
+
+        Parameters
+        ----------
+        missing_links :
+            int - Number of missing wire loops
+        missing_host_links :
+            int - Number of missing host links
+        message :
+            str
+        """
+        super().__init__(message)
+        self.missing_links = missing_links
+        self.missing_host_links = missing_host_links
+
+
 class TopologyController:
     """TopologyController.
 
     Component which generates a mapping between a created topolgoy and a configured environment
     """
 
-    def __init__(self, env_json_fd, topo=None, ir_fd=None):
+    def __init__(self, env_json_fd, topo=None, ir_fd=None, placement='file', vRouter_offset=0):
         """__init__.
 
         Parameters
@@ -20,19 +237,29 @@ class TopologyController:
         topo :
             topo - topology object which should be deployed to the target
         ir_fd :
-            ir_fd - File descriptor for the intermediate_representation json
+            ir_fd - File descriptor for the intermediate representation, either
+            json or binary IR (opened in binary mode)
+        placement :
+            str (default: 'file') - Order in which wire loops and host links
+            are assigned, one of `pipe_placement.PLACEMENT_STRATEGIES`
+        vRouter_offset :
+            int (default: 0) - Added to the vRouter ids of the IR to get the
+            vRouter numbers of the table entries. Topologies with disjoint
+            vRouter numbers can be installed at the same time, see `stage()`
         """
         logging.debug(
             "New TopologyController with \n|->env:{}, \n|->topo: {}, \n|->ir: {}".format(env_json_fd, topo, ir_fd))
 
         if topo is None and ir_fd is None:
             raise RuntimeError("Neither topology nor IR is defiend")
+        if placement not in pipe_placement.PLACEMENT_STRATEGIES:
+            raise ValueError("`{}` is not a placement strategy".format(placement))
+        if not 0 <= vRouter_offset <= MAX_VROUTER_NUMBER:
+            raise ValueError("vRouter offset {} is out of range".format(vRouter_offset))
 
         self.ir = {}
         self.topo = topo
-
-        if ir_fd is not None:
-            self.ir = json.load(ir_fd)
+        self.vRouter_offset = vRouter_offset
 
         self.env = json.load(env_json_fd)
 
@@ -42,6 +269,17 @@ class TopologyController:
         self.route_mapping = {}
 
         self.host_env = {}
+        # host_mapping contains {"Host": hostname of the host link}
+        self.host_mapping = {}
+
+        if topo is None and binary_ir.is_binary_ir(ir_fd):
+            # The pipe aware placement needs the whole IR before mapping
+            if placement == 'file':
+                self._map_binary_ir(ir_fd)
+                return
+            self.ir = binary_ir.load_binary_ir(ir_fd)
+        elif ir_fd is not None:
+            self.ir = json.load(ir_fd)
 
         # Optain the Intermediate Representation from the topology object
         if self.topo is not None:
@@ -52,87 +290,723 @@ class TopologyController:
             self.port_mapping[vRouter_id] = []
             self.route_mapping[vRouter_id] = []
 
-        for vRouter_id in self.ir['vRouter']:
-            router = self.ir['vRouter'][vRouter_id]
-            for neighbour in router["neighbors"]:
+        self.check_environment()
+
+        # Resource pools of the environment, handed out in file order or
+        # ordered by the pipe aware placement
+        if placement == 'pipe':
+            links, host_links = pipe_placement.get_pipe_aware_pools(
+                self.ir, self.env)
+        else:
+            links, host_links = self.env["links"], self.env["host_links"]
+        self.link_pool = deque(links)
+        self.host_link_pool = deque(host_links)
+
+        for vRouter_id, router in self.ir['vRouter'].items():
+            self._map_router(vRouter_id, router)
+
+    def _map_binary_ir(self, ir_fd):
+        """_map_binary_ir.
+
+        Maps a binary IR while it is read. Each vRouter is mapped as soon as
+        its record is read and its routing table is dropped afterwards, so
+        the routing tables are not held a second time in `self.ir`.
+        Raises an `InsufficientEnvironmentError` if the environment is too
+        small, like `check_environment()`.
+
+        Parameters
+        ----------
+        ir_fd :
+            binary file descriptor of the binary IR
+        """
+        reader = binary_ir.BinaryIRReader(ir_fd)
+        self.ir = {"vRouter": {}, "Host": {},
+                   "address_space": reader.address_space}
+
+        self.link_pool = deque(self.env["links"])
+        self.host_link_pool = deque(self.env["host_links"])
+
+        required_links = 0
+        required_host_links = 0
+        for node_type, node_id, node in reader:
+            self.ir[node_type][node_id] = node
+            if node_type != 'vRouter':
+                continue
+
+            self.port_mapping.setdefault(node_id, [])
+            self.route_mapping.setdefault(node_id, [])
+
+            for neighbour in node["neighbors"]:
                 if neighbour[2] == 'vRouter':
+                    required_links += 1
+                else:
+                    required_host_links += 1
+
+            # Once the environment is exhausted, the remaining vRouters are
+            # only counted for the error message
+            if required_links <= len(self.env["links"]) and \
+                    required_host_links <= len(self.env["host_links"]):
+                self._map_router(node_id, node)
+
+            del node["routingtable"]
+
+        self.check_environment()
+
+    def get_required_resources(self):
+        """get_required_resources.
+
+        Returns
+        ----------
+        (int, int) : Number of wire loops and number of host links the
+        topology needs, see `get_required_resources()` of the module
+        """
+        return get_required_resources(self.ir)
+
+    def check_environment(self):
+        """check_environment.
+
+        Checks that the environment provides enough wire loops and host links
+        for the topology. Raises an `InsufficientEnvironmentError` otherwise.
+        """
+        required_links, required_host_links = self.get_required_resources()
+        missing_links = max(0, required_links - len(self.env["links"]))
+        missing_host_links = max(
+            0, required_host_links - len(self.env["host_links"]))
+
+        if missing_links or missing_host_links:
+            raise InsufficientEnvironmentError(
+                missing_links, missing_host_links,
+                "The environment is too small for the topology: {} of {} wire loops and {} of {} host links are missing".format(
+                    missing_links, required_links, missing_host_links, required_host_links))
+
+        logging.debug("Topology uses {} of {} wire loops and {} of {} host links".format(
+            required_links, len(self.env["links"]), required_host_links, len(self.env["host_links"])))
+
+    def _map_router(self, vRouter_id, router):
+        """_map_router.
+
+        Assigns wire loops and host links to all neighbours of a vRouter and
+        translates its routing table to physical egress ports.
+
+        Parameters
+        ----------
+        vRouter_id :
+            str - id of the vRouter in the IR
+        router :
+            dict - IR of the vRouter
+        """
+        # Index the routing table by logical port once, instead of scanning
+        # the whole table for every neighbour
+        routes_per_port = {}
+        for entry in router['routingtable']:
+            routes_per_port.setdefault(entry[0], []).append(entry[1])
+
+        for neighbour in router["neighbors"]:
+            networks = routes_per_port.get(neighbour[0], ())
+
+            if neighbour[2] == 'vRouter':
+
+                # Get one available link-loop from the environment file
+                link = self.link_pool.popleft()
+
+                # Give Link-endpoints descriptive names
+                local_port = link[0]
+                remote_port = link[1]
+
+                # Assign link endpoints to current switch and current neighbor
+                self.port_mapping[vRouter_id].append(local_port)
+                self.port_mapping.setdefault(
+                    neighbour[1], []).append(remote_port)
+
+                # Add all routes of the current port to the mapping
+                for network in networks:
+                    self.route_mapping[vRouter_id].append(
+                        (network, local_port, DEFAULT_MAC))
+
+            elif neighbour[2] == 'host':
+
+                # Get one available host link from environmnent file
+                link = self.host_link_pool.popleft()
+
+                # Give Entry descriptive names
+                hostname = link[0]
+                switch_port = link[1]
+
+                host = self.ir['Host'][neighbour[1]]
+                self.host_env[hostname] = host
+                self.host_mapping[neighbour[1]] = hostname
+
+                # Assign Link enpoint to current switch
+                self.port_mapping[vRouter_id].append(switch_port)
+
+                # Add all routes of the current port to the mapping
+                for network in networks:
+                    self.route_mapping[vRouter_id].append(
+                        (network, switch_port, host['mac']))
+
+    def get_address_space(self):
+        """get_address_space.
+
+        Returns
+        ----------
+        IPv4Network : Address space of the topology, used for the default
+        routes. Raises a RuntimeError for IPv6 topologies, as the virntup P4
+        program only forwards IPv4.
+        """
+        address_space = ipaddress.ip_network(
+            self.ir.get('address_space', topology.ADDRESS_SPACE))
+        if address_space.version != 4:
+            raise RuntimeError("The virntup P4 program only forwards IPv4 - {} can not be deployed".format(
+                address_space))
+        return address_space
+
+    def get_expected_entries(self):
+        """get_expected_entries.
+
+        Translates the mapping into the entries of both P4 tables, including
+        the default route of each vRouter towards its uplink.
+
+        Returns
+        ----------
+        (dict, dict) : The port mapping entries
+        `{ingress port: vRouter number}` and the routing entries
+        `{(vRouter number, network): (MAC, egress port)}`
+        """
+        return self._get_router_entries(self.port_mapping)
+
+    def get_vRouter_number(self, router_index):
+        """get_vRouter_number.
+
+        Returns the number of a vRouter in the table entries, its IR id plus
+        the vRouter offset.
+
+        Parameters
+        ----------
+        router_index :
+            str - id of the vRouter in the IR
+        """
+        vRouter_number = int(router_index) + self.vRouter_offset
+        if vRouter_number > MAX_VROUTER_NUMBER:
+            raise ValueError("vRouter number {} of vRouter {} exceeds 32 bit, use a smaller vRouter offset".format(
+                vRouter_number, router_index))
+        return vRouter_number
+
+    def _get_router_entries(self, router_indices):
+        """_get_router_entries.
+
+        Returns the expected entries of the given vRouters, see
+        `get_expected_entries()`.
+
+        Parameters
+        ----------
+        router_indices :
+            iterable of str - ids of mapped vRouters
+        """
+        default_route = self.get_address_space().compressed
+
+        port_entries = {}
+        route_entries = {}
+        for router_index in router_indices:
+            ports = self.port_mapping[router_index]
+            vRouter_number = self.get_vRouter_number(router_index)
 
-                    # Get one available link-loop from the environment file
-                    link = self.env["links"].pop(0)
+            for port in ports:
+                port_entries[int(port)] = vRouter_number
 
-                    # Give Link-endpoints descriptive names
-                    local_port = link[0]
-                    remote_port = link[1]
+            for network, egress_port, mac in self.route_mapping[router_index]:
+                route_entries[(vRouter_number, str(network))] = (
+                    mac.lower(), int(egress_port))
 
-                    # Assign link endpoints to current switch and current neighbor
-                    self.port_mapping[vRouter_id].append(local_port)
-                    self.port_mapping[neighbour[1]].append(remote_port)
+            # Add default route to uplink router
+            route_entries[(vRouter_number, default_route)] = (
+                DEFAULT_MAC, int(ports[0]))
 
-                    # Iterate over Routingtable and find all entries which match the current port/neighbor
-                    for entry in router['routingtable']:
+        return port_entries, route_entries
 
-                        # Check if current entry in routing table applies to the current neighbor
-                        if entry[0] == neighbour[0]:
+    def apply_route_delta(self, delta):
+        """apply_route_delta.
 
-                            # Add routing entry to mapping
-                            self.route_mapping[vRouter_id].append(
-                                (entry[1], local_port, "08:00:00:00:00:00"))
+        Updates the mapping after an incremental topology change (see
+        `V_topology.add_subtree()` and `V_topology.remove_subtree()`). Links
+        of removed _Nodes are returned to the resource pools, new links are
+        taken from them. Only the entries of the vRouters touched by the
+        change are compared, so the work scales with the size of the change.
+        `self.ir` is not updated.
+
+        Parameters
+        ----------
+        delta :
+            topology.RouteDelta - changes of the topology
+
+        Returns
+        ----------
+        (TableDiff, TableDiff) : Changes of the port mapping and the routing
+        table entries
+        """
+        touched = {str(router_id) for router_id, _, _ in delta.added + delta.removed}
+        for router, _, node in delta.linked + delta.unlinked:
+            touched.add(str(router.id))
+            if node.type == 'vRouter':
+                touched.add(str(node.id))
 
-                elif neighbour[2] == 'host':
+        old_port_entries, old_route_entries = self._get_router_entries(
+            touched & set(self.port_mapping))
 
-                    # Get one available host link from environmnent file
-                    link = self.env["host_links"].pop(0)
+        self._unlink(delta.unlinked)
 
-                    # Give Entry descriptive names
-                    hostname = link[0]
-                    switch_port = link[1]
+        removed_routes = {}
+        for router_id, _, network in delta.removed:
+            removed_routes.setdefault(str(router_id), set()).add(network.compressed)
+        for router_index, networks in removed_routes.items():
+            if router_index in self.route_mapping:
+                self.route_mapping[router_index] = [
+                    route for route in self.route_mapping[router_index] if route[0] not in networks]
 
-                    self.host_env[hostname] = self.ir['Host'][neighbour[1]]
+        self._link(delta.linked)
 
-                    # Assign Link enpoint to current switch
-                    self.port_mapping[vRouter_id].append(switch_port)
+        # The MAC of a route is the one of the host behind the egress port
+        host_macs = {switch_port: self.host_env[hostname]['mac']
+                     for hostname, switch_port in self.env["host_links"]
+                     if hostname in self.host_env}
+        for router_id, port, network in delta.added:
+            egress_port = self.port_of(str(router_id), port)
+            self.route_mapping[str(router_id)].append(
+                (network.compressed, egress_port, host_macs.get(egress_port, DEFAULT_MAC)))
 
-                    # Iterate over Routingtable and find all entries which match the current port/neighbor
-                    for entry in router['routingtable']:
+        new_port_entries, new_route_entries = self._get_router_entries(
+            touched & set(self.port_mapping))
 
-                        # Check if current entry in routing table applies to the current neighbor
-                        if entry[0] == neighbour[0]:
+        return diff_entries(new_port_entries, old_port_entries), \
+            diff_entries(new_route_entries, old_route_entries)
 
-                            # Get mac address of host from IR
-                            mac = self.ir['Host'][neighbour[1]]['mac']
+    def port_of(self, router_id, port):
+        """port_of.
+
+        Returns the physical switch port a logical port of a vRouter is
+        mapped to.
+
+        Parameters
+        ----------
+        router_id :
+            str - id of the vRouter in the IR
+        port :
+            int - logical port of the vRouter as used by the `neighbors` of
+            the IR
+        """
+        return self.port_mapping[router_id][self._port_index(router_id, port)]
+
+    def _port_index(self, router_index, port):
+        """_port_index.
+
+        Returns the index of a logical port in the port mapping of a vRouter.
+        The port mapping of all vRouters except the root starts with the
+        uplink port.
+        """
+        if router_index == next(iter(self.ir['vRouter'])):
+            return port - 1
+        return port
 
-                            # Add routing entry to mapping
-                            self.route_mapping[vRouter_id].append(
-                                (entry[1], switch_port, mac))
+    def _unlink(self, unlinked):
+        """_unlink.
 
-    def deploy(self, target_connector):
+        Returns the physical links of removed links to the resource pools and
+        drops the mapping of removed vRouters.
+        """
+        removed_routers = {str(node.id) for _, _, node in unlinked
+                           if node.type == 'vRouter'}
+
+        for router, port, node in unlinked:
+            router_index = str(router.id)
+            ports = self.port_mapping[router_index]
+            # The vRouter the subtree was linked to keeps its other ports
+            if router_index in removed_routers:
+                local_port = ports[self._port_index(router_index, port)]
+            else:
+                local_port = ports.pop(self._port_index(router_index, port))
+
+            if node.type == 'vRouter':
+                self.link_pool.append(
+                    [local_port, self.port_mapping[str(node.id)][0]])
+            else:
+                hostname = self.host_mapping.pop(str(node.id))
+                del self.host_env[hostname]
+                self.host_link_pool.append([hostname, local_port])
+
+        for router_index in removed_routers:
+            del self.port_mapping[router_index]
+            del self.route_mapping[router_index]
+
+    def _link(self, linked):
+        """_link.
+
+        Assigns wire loops and host links of the resource pools to new links.
+        """
+        for router, port, node in linked:
+            router_index = str(router.id)
+            ports = self.port_mapping.setdefault(router_index, [])
+            self.route_mapping.setdefault(router_index, [])
+            if self._port_index(router_index, port) != len(ports):
+                raise RuntimeError("New link of {} has to use the next free port, not {}".format(
+                    router, port))
+
+            if node.type == 'vRouter':
+                if not self.link_pool:
+                    raise InsufficientEnvironmentError(
+                        1, 0, "The environment has no wire loop left for {}".format(node))
+                local_port, remote_port = self.link_pool.popleft()
+                ports.append(local_port)
+                self.port_mapping.setdefault(
+                    str(node.id), []).append(remote_port)
+                self.route_mapping.setdefault(str(node.id), [])
+            else:
+                if not self.host_link_pool:
+                    raise InsufficientEnvironmentError(
+                        0, 1, "The environment has no host link left for {}".format(node))
+                hostname, switch_port = self.host_link_pool.popleft()
+                ports.append(switch_port)
+                self.host_env[hostname] = {
+                    "name": node.name,
+                    "ip": str(node.ip_address),
+                    "mac": node.mac_address
+                }
+                self.host_mapping[str(node.id)] = hostname
+
+    def deploy(self, target_connector, rollback=True):
         """deploy.
 
+        Inserts all table entries of the mapping. The deployment is
+        transactional: if an entry is rejected or the deployment fails
+        otherwise, the entries it installed are deleted again (see
+        `rollback_deployment()`), so the target is not left half-configured.
+
         Parameters
         ----------
         target_connector :
             target_connector object which is used to deploy the mappping
+        rollback :
+            bool (default: True) - Roll back the installed entries on failure
         """
 
         logging.debug(self.port_mapping)
         logging.debug(self.route_mapping)
 
-        for router_index in self.port_mapping:
-            ports = self.port_mapping[router_index]
-            for port in ports:
-                target_connector.insert_vRouter_port_mapping(
-                    port, router_index)
+        port_entries, route_entries = self.get_expected_entries()
 
-            routing_entries = self.route_mapping[router_index]
-            for entry in routing_entries:
-                target_connector.insert_route(
-                    router_index, entry[0], entry[2], entry[1])
+        def write_entries():
+            for port, vRouter_number in port_entries.items():
+                target_connector.insert_vRouter_port_mapping(port, vRouter_number)
 
-            # Add default route to uplink router
-            target_connector.insert_route(
-                router_index, topology.ADDRESS_SPACE.compressed, "08:00:00:00:00:00", ports[0])
+            for (vRouter_number, network), (mac, port) in route_entries.items():
+                target_connector.insert_route(vRouter_number, network, mac, port)
 
-        target_connector.teardown()
+        deploy_transactionally(target_connector, write_entries, rollback)
+
+    def deploy_incremental(self, target_connector, scoped=False):
+        """deploy_incremental.
+
+        Reads the current content of both tables from the target and only
+        writes the difference to the mapping. Hence the number of writes
+        scales with the size of the change, not with the size of the
+        topology.
+
+        The updates are applied in phases, so the target never forwards to
+        ports or vRouters which are not configured yet: new and changed
+        routes first, then the port mapping, finally the deletion of stale
+        port mappings and routes.
+
+        Parameters
+        ----------
+        target_connector :
+            target_connector object which is used to deploy the mappping
+        scoped :
+            bool (default: False) - Only compare the entries of the ports of
+            the environment and of the vRouter numbers of the topology, so
+            entries of other topologies on the same target (see
+            `tenants.pack_tenants()`) are neither modified nor deleted
+
+        Returns
+        ----------
+        (TableDiff, TableDiff) : Applied changes of the port mapping and the
+        routing table
+        """
+        port_entries, route_entries = self.get_expected_entries()
+
+        current_ports = target_connector.read_vRouter_port_mappings()
+        current_routes = target_connector.read_routes()
+        if scoped:
+            current_ports, current_routes = self.get_own_entries(
+                current_ports, current_routes)
+
+        port_diff = diff_entries(port_entries, current_ports)
+        route_diff = diff_entries(route_entries, current_routes)
+
+        self._write_diffs(target_connector, port_diff, route_diff)
+        self._finish_deployment(target_connector)
+
+        return port_diff, route_diff
+
+    def remove(self, target_connector):
+        """remove.
+
+        Deletes the entries of the topology from the target, i.e. all port
+        mappings of the ports of the environment and all routes of the
+        vRouter numbers of the topology. Entries of other topologies on the
+        same target are left untouched.
+
+        Parameters
+        ----------
+        target_connector :
+            target_connector object which is used to deploy the mappping
+
+        Returns
+        ----------
+        (TableDiff, TableDiff) : Applied changes of the port mapping and the
+        routing table
+        """
+        current_ports, current_routes = self.get_own_entries(
+            target_connector.read_vRouter_port_mappings(),
+            target_connector.read_routes())
+
+        port_diff = diff_entries({}, current_ports)
+        route_diff = diff_entries({}, current_routes)
+
+        self._write_diffs(target_connector, port_diff, route_diff)
+        self._finish_deployment(target_connector)
+
+        return port_diff, route_diff
+
+    def get_env_ports(self):
+        """get_env_ports.
+
+        Returns
+        ----------
+        set of int : Ports of all wire loops and host links of the
+        environment, used or not
+        """
+        ports = {int(port) for link in self.env["links"] for port in link}
+        ports |= {int(link[1]) for link in self.env["host_links"]}
+        return ports
+
+    def get_own_entries(self, port_entries, route_entries):
+        """get_own_entries.
+
+        Returns the entries of the ports of the environment and of the
+        vRouter numbers of the topology, i.e. drops the entries of other
+        topologies on the same target.
+
+        Parameters
+        ----------
+        port_entries :
+            dict - {port: vRouter_number} port mapping entries of the target
+        route_entries :
+            dict - {(vRouter_number, network): (mac, port)} routing table
+            entries of the target
+
+        Returns
+        ----------
+        (dict, dict) : own port mapping and routing table entries
+        """
+        own_ports = self.get_env_ports()
+        own_numbers = {self.get_vRouter_number(router_index)
+                       for router_index in self.port_mapping}
+
+        return {port: vRouter_number for port, vRouter_number in port_entries.items()
+                if port in own_ports}, \
+            {key: value for key, value in route_entries.items()
+             if key[0] in own_numbers}
+
+    def deploy_route_delta(self, delta, target_connector):
+        """deploy_route_delta.
+
+        Applies an incremental topology change to the mapping (see
+        `apply_route_delta()`) and writes only the resulting changes to the
+        target, without reading the tables.
+
+        Parameters
+        ----------
+        delta :
+            topology.RouteDelta - changes of the topology
+        target_connector :
+            target_connector object which is used to deploy the mappping
+
+        Returns
+        ----------
+        (TableDiff, TableDiff) : Applied changes of the port mapping and the
+        routing table
+        """
+        port_diff, route_diff = self.apply_route_delta(delta)
+
+        self._write_diffs(target_connector, port_diff, route_diff)
+        self._finish_deployment(target_connector)
+
+        return port_diff, route_diff
+
+    def stage(self, target_connector):
+        """stage.
+
+        Installs the routes of the topology without touching the port
+        mapping, so the currently active topology keeps forwarding. The
+        routes of all other vRouter numbers are left untouched, hence the
+        topology has to use a vRouter offset (see `__init__()`) disjoint to
+        the active one. Stale routes of an earlier topology staged with the
+        same vRouter numbers are deleted. Raises a RuntimeError if a port is
+        mapped to one of the vRouter numbers, i.e. they are active.
+
+        Parameters
+        ----------
+        target_connector :
+            target_connector object which is used to deploy the mappping
+
+        Returns
+        ----------
+        TableDiff : Applied changes of the routing table
+        """
+        _, route_entries = self.get_expected_entries()
+        vRouter_numbers = set(vRouter_number for vRouter_number, _ in route_entries)
+
+        active = vRouter_numbers & set(
+            target_connector.read_vRouter_port_mappings().values())
+        if active:
+            target_connector.teardown()
+            raise RuntimeError("vRouter numbers {} are active, stage the topology with a different vRouter offset".format(
+                sorted(active)))
+
+        current_routes = {key: value for key, value in target_connector.read_routes().items()
+                          if key[0] in vRouter_numbers}
+        route_diff = diff_entries(route_entries, current_routes)
+
+        self._write_diffs(target_connector, TableDiff([], [], []), route_diff)
+        self._finish_deployment(target_connector)
+
+        logging.info("Staged {} vRouters starting at vRouter number {}, activate to switch over".format(
+            len(self.port_mapping), min(vRouter_numbers)))
+
+        return route_diff
+
+    def activate(self, target_connector, check_staged=True):
+        """activate.
+
+        Switches the target over to a topology installed with `stage()` by
+        rewriting only the port mapping. All changes of the port mapping,
+        including the deletion of ports of the environment the topology does
+        not use, are sent in one WriteRequest, so the switchover costs
+        O(ports) writes and the previous topology stays staged under its
+        vRouter numbers. Port mappings of other ports, e.g. of other tenants
+        (see `tenants.pack_tenants()`), are left untouched.
+
+        The WriteRequest uses the ROLLBACK_ON_ERROR atomicity. If the target
+        rejects the switchover (or applied a part of it because it does not
+        support this atomicity), the previous port mapping is restored and a
+        RuntimeError is raised.
+
+        Parameters
+        ----------
+        target_connector :
+            target_connector object which is used to deploy the mappping
+        check_staged :
+            bool (default: True) - Read the routing table first and raise a
+            RuntimeError if routes of the topology are missing
+
+        Returns
+        ----------
+        TableDiff : Applied changes of the port mapping
+        """
+        port_entries, route_entries = self.get_expected_entries()
+
+        if check_staged:
+            current_routes = target_connector.read_routes()
+            missing = [key for key, value in route_entries.items()
+                       if current_routes.get(key) != value]
+            if missing:
+                target_connector.teardown()
+                raise RuntimeError("{} routes of the topology are not staged, e.g. {} - stage it first".format(
+                    len(missing), missing[0]))
+
+        current_ports, _ = self.get_own_entries(
+            target_connector.read_vRouter_port_mappings(), {})
+        port_diff = diff_entries(port_entries, current_ports)
+        logging.info("Port mapping: {} inserts, {} modifications, {} deletions".format(
+            len(port_diff.insert), len(port_diff.modify), len(port_diff.delete)))
+
+        # Send the whole switchover as a single batch, which the target
+        # applies completely or not at all
+        target_connector.flush()
+        errors = len(target_connector.write_errors)
+        batch_size = target_connector.batch_size
+        target_connector.batch_size = max(
+            batch_size, sum(len(updates) for updates in port_diff), 2)
+        target_connector.atomic = True
+        try:
+            for port, vRouter_number in port_diff.insert:
+                target_connector.insert_vRouter_port_mapping(port, vRouter_number)
+            for port, vRouter_number in port_diff.modify:
+                target_connector.modify_vRouter_port_mapping(port, vRouter_number)
+            for port in port_diff.delete:
+                target_connector.delete_vRouter_port_mapping(port)
+            target_connector.flush()
+        finally:
+            target_connector.atomic = False
+            target_connector.batch_size = batch_size
+
+        if len(target_connector.write_errors) > errors:
+            # Targets without ROLLBACK_ON_ERROR may have applied a part of the
+            # switchover, which splits the ports between both topologies
+            self._restore_port_mapping(target_connector, current_ports)
+            target_connector.teardown()
+            raise RuntimeError("The switchover was rejected by the target, the previous port mapping is active - see log for details")
+
+        self._finish_deployment(target_connector)
+
+        return port_diff
+
+    def _restore_port_mapping(self, target_connector, port_entries):
+        """_restore_port_mapping.
+
+        Writes the port mapping of the ports of the environment back to the
+        given entries after a failed switchover.
+        """
+        current_ports, _ = self.get_own_entries(
+            target_connector.read_vRouter_port_mappings(), {})
+        restore_diff = diff_entries(port_entries, current_ports)
+        if any(restore_diff):
+            logging.warning("Restoring the previous port mapping")
+            self._write_diffs(target_connector, restore_diff, TableDiff([], [], []))
+            target_connector.flush()
+
+    def _write_diffs(self, target_connector, port_diff, route_diff):
+        """_write_diffs.
+
+        Writes the changes of both tables in phases, see
+        `deploy_incremental()`.
+        """
+        logging.info("Port mapping: {} inserts, {} modifications, {} deletions".format(
+            len(port_diff.insert), len(port_diff.modify), len(port_diff.delete)))
+        logging.info("Routes: {} inserts, {} modifications, {} deletions".format(
+            len(route_diff.insert), len(route_diff.modify), len(route_diff.delete)))
+
+        for (vRouter_number, network), (mac, port) in route_diff.insert:
+            target_connector.insert_route(vRouter_number, network, mac, port)
+        for (vRouter_number, network), (mac, port) in route_diff.modify:
+            target_connector.modify_route(vRouter_number, network, mac, port)
+        target_connector.flush()
+
+        for port, vRouter_number in port_diff.insert:
+            target_connector.insert_vRouter_port_mapping(port, vRouter_number)
+        for port, vRouter_number in port_diff.modify:
+            target_connector.modify_vRouter_port_mapping(port, vRouter_number)
+        target_connector.flush()
+
+        for port in port_diff.delete:
+            target_connector.delete_vRouter_port_mapping(port)
+        for vRouter_number, network in route_diff.delete:
+            target_connector.delete_route(vRouter_number, network)
+
+    def _finish_deployment(self, target_connector):
+        """_finish_deployment.
+
+        See `finish_deployment()`.
+        """
+        finish_deployment(target_connector)
 
     def get_host_config(self):
         """get_host_config.
@@ -0,0 +1,328 @@
+import io
+import json
+import logging
+import unittest
+
+from . import topology
+from . import topology_generator
+from .simulator import DataPlaneSimulator
+from .topology_controller import TopologyController, InsufficientEnvironmentError, PORT_MAPPING, ROUTES
+
+logging.basicConfig(level=logging.INFO)
+
+
+class FakeConnector:
+    """FakeConnector.
+
+    Keeps the table entries in dicts instead of writing them to a P4 target.
+    """
+
+    def __init__(self, batch_size=1):
+        self.batch_size = batch_size
+        self.pending = []
+        self.port_table = {}
+        self.route_table = {}
+        self.batches = []
+        self.write_errors = []
+        self.written_updates = 0
+        self.installed_entries = []
+        self.torn_down = False
+
+    def insert_vRouter_port_mapping(self, match_ingress_port, action_vRouter_number):
+        assert match_ingress_port not in self.port_table
+        self._queue(self.port_table, match_ingress_port, action_vRouter_number)
+        self.installed_entries.append((PORT_MAPPING, match_ingress_port))
+
+    def modify_vRouter_port_mapping(self, match_ingress_port, action_vRouter_number):
+        assert match_ingress_port in self.port_table
+        self._queue(self.port_table, match_ingress_port, action_vRouter_number)
+
+    def delete_vRouter_port_mapping(self, match_ingress_port):
+        self._queue(self.port_table, match_ingress_port, None)
+
+    def insert_route(self, match_vRouter_number, match_ipv4address, action_dest_mac, action_egress_port):
+        key = (match_vRouter_number, match_ipv4address)
+        assert key not in self.route_table
+        self._queue(self.route_table, key, (action_dest_mac, action_egress_port))
+        self.installed_entries.append((ROUTES, key))
+
+    def modify_route(self, match_vRouter_number, match_ipv4address, action_dest_mac, action_egress_port):
+        key = (match_vRouter_number, match_ipv4address)
+        assert key in self.route_table
+        self._queue(self.route_table, key, (action_dest_mac, action_egress_port))
+
+    def delete_route(self, match_vRouter_number, match_ipv4address):
+        self._queue(self.route_table, (match_vRouter_number, match_ipv4address), None)
+
+    def read_vRouter_port_mappings(self):
+        return dict(self.port_table)
+
+    def read_routes(self):
+        return dict(self.route_table)
+
+    def _queue(self, table, key, value):
+        if value is None:
+            del table[key]
+        else:
+            table[key] = value
+        self.pending.append(key)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.batches.append(self.pending)
+            self.written_updates += len(self.pending)
+            self.pending = []
+        return []
+
+    def clear_tables(self):
+        deleted = len(self.port_table), len(self.route_table)
+        for port in list(self.port_table):
+            self.delete_vRouter_port_mapping(port)
+        for key in list(self.route_table):
+            self.delete_route(*key)
+        self.flush()
+        return deleted
+
+    def teardown(self):
+        self.torn_down = True
+
+
+def env_fd(n_links, n_host_links):
+    """env_fd.
+
+    Returns a file object containing an env.json with the given number of
+    wire loops and host links.
+    """
+    env = {
+        "host_links": [["h{}".format(i + 1), 100 + i] for i in range(n_host_links)],
+        "links": [[2 * i, 2 * i + 1] for i in range(n_links)]
+    }
+    return io.StringIO(json.dumps(env))
+
+
+###########################################################
+class TestTopologyControllerDeploy(unittest.TestCase):
+    """TestTopologyControllerDeploy.
+    """
+
+    def test_batched_deploy_flushes_all_entries(self):
+        """test_batched_deploy_flushes_all_entries.
+        """
+        topo = topology_generator.create_multi_layer_topo()
+        topo.update_all_routing_tables()
+        controller = TopologyController(env_fd(12, 18), topo=topo)
+
+        connector = FakeConnector(batch_size=16)
+        controller.deploy(connector)
+
+        expected = len(connector.port_table) + len(connector.route_table)
+        self.assertEqual(connector.written_updates, expected)
+        self.assertEqual(sum(len(b) for b in connector.batches), expected)
+        self.assertTrue(all(len(b) <= 16 for b in connector.batches))
+        self.assertTrue(connector.torn_down)
+
+    def test_rejected_entries_are_reported(self):
+        """test_rejected_entries_are_reported.
+        """
+        topo = topology_generator.create_3_node_topo()
+        topo.update_all_routing_tables()
+        controller = TopologyController(env_fd(0, 2), topo=topo)
+
+        connector = FakeConnector()
+        connector.write_errors.append("rejected")
+
+        with self.assertRaises(RuntimeError):
+            controller.deploy(connector)
+        self.assertTrue(connector.torn_down)
+
+    def test_failed_deploy_is_rolled_back(self):
+        """test_failed_deploy_is_rolled_back.
+        """
+        controller = TopologyController(
+            env_fd(12, 18), topo=topology_generator.generate_topo('large'))
+        port_entries, route_entries = controller.get_expected_entries()
+
+        # A foreign entry with the key of a route lets the deploy fail halfway
+        conflicting = list(route_entries)[len(route_entries) // 2]
+        connector = FakeConnector(batch_size=16)
+        connector.route_table[conflicting] = ("02:00:00:00:00:01", 1)
+        connector.route_table[(4242, "10.0.0.0/24")] = ("02:00:00:00:00:02", 1)
+        before = dict(connector.route_table)
+
+        with self.assertRaises(AssertionError):
+            controller.deploy(connector)
+
+        # Only the installed entries were deleted, in batches of DELETEs
+        self.assertEqual(connector.port_table, {})
+        self.assertEqual(connector.route_table, before)
+        self.assertEqual(connector.installed_entries, [])
+        self.assertEqual(len(connector.batches[-1]), len(port_entries) + len(route_entries) // 2)
+        self.assertTrue(connector.torn_down)
+
+
+    def test_incremental_deploy_writes_only_changes(self):
+        """test_incremental_deploy_writes_only_changes.
+        """
+        connector = FakeConnector()
+        TopologyController(env_fd(12, 18), topo=topology_generator.generate_topo(
+            'large')).deploy(connector)
+        installed = connector.written_updates
+        installed_ports = len(connector.port_table)
+
+        # Deploying the same topology again does not write anything
+        connector.written_updates = 0
+        controller = TopologyController(
+            env_fd(12, 18), topo=topology_generator.generate_topo('large'))
+        controller.deploy_incremental(connector)
+        self.assertEqual(connector.written_updates, 0)
+
+        # A smaller topology only deletes the surplus and fixes changed entries
+        controller = TopologyController(
+            env_fd(12, 18), topo=topology_generator.generate_topo('medium'))
+        port_diff, route_diff = controller.deploy_incremental(connector)
+
+        expected_ports, expected_routes = controller.get_expected_entries()
+        self.assertEqual(connector.port_table, expected_ports)
+        self.assertEqual(connector.route_table, expected_routes)
+        self.assertLess(connector.written_updates, installed)
+        self.assertEqual(len(port_diff.delete),
+                         installed_ports - len(expected_ports))
+
+
+    def test_route_delta_deploy_writes_only_changes(self):
+        """test_route_delta_deploy_writes_only_changes.
+        """
+        topo = topology_generator.generate_topo('large')
+        controller = TopologyController(env_fd(14, 20), topo=topo)
+        connector = FakeConnector()
+        controller.deploy(connector)
+
+        subtree = topology.vRouter(topo=topo)
+        topo.add_Host(subtree)
+        deltas = [topo.add_subtree(topo.router.neighbors[2], subtree),
+                  topo.insert_Host(topo.router)[1],
+                  topo.remove_subtree(topo.router.neighbors[0])]
+
+        for delta in deltas:
+            connector.written_updates = 0
+            port_diff, route_diff = controller.deploy_route_delta(
+                delta, connector)
+
+            expected_ports, expected_routes = controller.get_expected_entries()
+            self.assertEqual(connector.port_table, expected_ports)
+            self.assertEqual(connector.route_table, expected_routes)
+            self.assertEqual(connector.written_updates,
+                             sum(len(diff) for diff in port_diff + route_diff))
+
+        # Only the new host remains on the root, the removed subtree has freed
+        # its wire loops and host links
+        self.assertEqual(len(controller.host_env), 18 - 6 + 2)
+        self.assertEqual(len(controller.link_pool), 14 - 12 - 1 + 4)
+        result = DataPlaneSimulator(controller).run()
+        self.assertEqual(list(result.failed_pairs()), [])
+
+
+###########################################################
+class TestTopologyControllerMapping(unittest.TestCase):
+    """TestTopologyControllerMapping.
+    """
+
+    def test_routes_use_mapped_ports(self):
+        """test_routes_use_mapped_ports.
+        """
+        topo = topology_generator.generate_topo('medium')
+        controller = TopologyController(env_fd(1, 2), topo=topo)
+
+        # Router 1: loop port 0 towards router 2, host link 100 towards host 3
+        self.assertEqual(controller.port_mapping, {"1": [0, 100], "2": [1, 101]})
+        self.assertEqual([(str(r[0]), r[1]) for r in controller.route_mapping["1"]],
+                         [("10.42.3.0/24", 0), ("10.42.1.0/24", 0), ("10.42.2.0/24", 100)])
+        self.assertEqual(set(controller.host_env), {"h1", "h2"})
+
+        # Logical ports of the root start at 1, the other vRouters have the
+        # uplink in front
+        self.assertEqual(controller.port_of("1", 1), 0)
+        self.assertEqual(controller.port_of("1", 2), 100)
+        self.assertEqual(controller.port_of("2", 1), 101)
+
+    def test_missing_resources_are_reported(self):
+        """test_missing_resources_are_reported.
+        """
+        topo = topology_generator.generate_topo('large')
+
+        with self.assertRaises(InsufficientEnvironmentError) as context:
+            TopologyController(env_fd(10, 15), topo=topo)
+
+        self.assertEqual(context.exception.missing_links, 2)
+        self.assertEqual(context.exception.missing_host_links, 3)
+
+
+###########################################################
+class TestStagedDeploy(unittest.TestCase):
+    """TestStagedDeploy.
+    """
+
+    def test_activation_only_rewrites_port_mapping(self):
+        """test_activation_only_rewrites_port_mapping.
+        """
+        active = TopologyController(
+            env_fd(12, 18), topo=topology_generator.generate_topo('large'))
+        staged = TopologyController(
+            env_fd(12, 18), topo=topology_generator.generate_topo('n_hops', hops=6),
+            vRouter_offset=1000)
+
+        connector = FakeConnector(batch_size=50)
+        active.deploy(connector)
+        active_ports, active_routes = active.get_expected_entries()
+
+        # Port mapping of another tenant outside of the environment
+        connector.port_table[500] = 4242
+        active_ports[500] = 4242
+
+        # Staging leaves the active port mapping alone
+        route_diff = staged.stage(connector)
+        staged_ports, staged_routes = staged.get_expected_entries()
+        self.assertEqual(len(route_diff.insert), len(staged_routes))
+        self.assertEqual(connector.port_table, active_ports)
+
+        written_updates = connector.written_updates
+        batches = len(connector.batches)
+        port_diff = staged.activate(connector)
+
+        # One batch with the port mapping changes only
+        self.assertEqual(len(connector.batches), batches + 1)
+        self.assertEqual(connector.written_updates - written_updates,
+                         sum(len(updates) for updates in port_diff))
+        staged_ports[500] = 4242
+        self.assertEqual(connector.port_table, staged_ports)
+        staged_routes.update(active_routes)
+        self.assertEqual(connector.route_table, staged_routes)
+
+        # Switching back is as cheap, as the old routes are still staged
+        active.activate(connector)
+        self.assertEqual(connector.port_table, active_ports)
+
+    def test_active_or_missing_routes_are_rejected(self):
+        """test_active_or_missing_routes_are_rejected.
+        """
+        topo = topology_generator.generate_topo('large')
+        controller = TopologyController(env_fd(12, 18), topo=topo)
+
+        connector = FakeConnector()
+        with self.assertRaises(RuntimeError):
+            controller.activate(connector)
+
+        controller.deploy(connector)
+        with self.assertRaises(RuntimeError):
+            controller.stage(connector)
+
+        with self.assertRaises(ValueError):
+            TopologyController(env_fd(12, 18), topo=topo,
+                               vRouter_offset=2 ** 32 - 1).get_expected_entries()
+
+
+################################################
+if __name__ == '__main__':
+    unittest.main()
@@ -1,99 +1,377 @@
 import logging
+import random
 
 from . import topology
 
 
-def _reset_topo_id_counter():
-    """_reset_topo_id_counter.
-    Only necessary to perform unit tests.
-    """
-    # pylint: disable=protected-access
-    topology._Node.next_id = 1
+# Topology types known by `create_topo()`
+TOPOLOGY_TYPES = ['minimal', 'medium', 'large', 'n_hops',
+                  'tree', 'k_ary', 'fat_tree', 'random']
 
 
-def create_3_node_topo():
+def create_3_node_topo(allocator=None):
     """create_3_node_topo.
 
     Creates one router and two hosts connected to the router.
     In this case the router is just a forwarder.
+
+    Parameters
+    ----------
+    allocator :
+        AddressAllocator - (optional) Address plan of the topology
     """
     logging.info("Instantiate new 3 node topology")
 
-    _reset_topo_id_counter()
-
-    root = topology.vRouter()
-    topo = topology.V_topology(root)
+    topo = topology.V_topology(allocator=allocator)
+    root = topo.add_vRouter()
 
-    root.add_link(topology.Host())
-    root.add_link(topology.Host())
+    topo.add_Host(root)
+    topo.add_Host(root)
 
     return topo
 
 
-def create_4_node_topo():
+def create_4_node_topo(allocator=None):
     """create_4_node_topo.
 
     Creates two vRouters connected to each other.
     Each vRouter is connected to one Host.
 
     This topology is the minimal 2 vRouter setup.
+
+    Parameters
+    ----------
+    allocator :
+        AddressAllocator - (optional) Address plan of the topology
     """
 
     logging.info("Instantiate new 4 node topology")
 
-    _reset_topo_id_counter()
-
-    root = topology.vRouter()
-    topo = topology.V_topology(root)
+    topo = topology.V_topology(allocator=allocator)
+    root = topo.add_vRouter()
 
-    tmp = topology.vRouter()
-    root.add_link(tmp)
-    root.add_link(topology.Host())
-    tmp.add_link(topology.Host())
+    tmp = topo.add_vRouter(root)
+    topo.add_Host(root)
+    topo.add_Host(tmp)
 
     return topo
 
 
-def create_multi_layer_topo():
+def create_multi_layer_topo(allocator=None):
     """create_multi_layer_topo.
 
     Creates 1 core router connected to 3 vRouters.
     Each of these vRouters is again connected to 3 vRouters.
     Each of these vRouter is then connected to 2 Hosts.
+
+    Parameters
+    ----------
+    allocator :
+        AddressAllocator - (optional) Address plan of the topology
     """
     logging.info("Instantiate new multilayer topology")
 
-    _reset_topo_id_counter()
+    return create_tree_topo([3, 3], 2, allocator)
 
-    root = topology.vRouter()
-    topo = topology.V_topology(root)
 
-    for _ in range(3):
-        l1 = topology.vRouter()
-        root.add_link(l1)
-        for _ in range(3):
-            l2 = topology.vRouter()
-            l1.add_link(l2)
-            for _ in range(2):
-                l2.add_link(topology.Host())
+def create_tree_topo(fanouts, hosts_per_leaf=1, allocator=None):
+    """create_tree_topo.
+
+    Creates a tree of vRouters with the given number of child vRouters per
+    layer. Each vRouter of the last layer is connected to `hosts_per_leaf`
+    Hosts. E.g. `fanouts=[3, 3]` and `hosts_per_leaf=2` is the multilayer
+    topology.
+
+    The _Nodes are created depth first (in the order of the IR) with an
+    explicit stack, so the generation takes linear time for arbitrary deep
+    trees.
+
+    Parameters
+    ----------
+    fanouts :
+        list of int - Number of child vRouters of a vRouter in each layer
+    hosts_per_leaf :
+        int - Number of Hosts connected to each vRouter of the last layer
+    allocator :
+        AddressAllocator - (optional) Address plan of the topology
+    """
+    if any(fanout < 1 for fanout in fanouts) or hosts_per_leaf < 0:
+        raise ValueError(
+            "Fan-outs have to be >= 1 and hosts per leaf >= 0")
+
+    logging.info("Instantiate new tree topology with fan-outs {} and {} hosts per leaf".format(
+        fanouts, hosts_per_leaf))
+
+    topo = topology.V_topology(allocator=allocator)
+    root = topo.add_vRouter()
+
+    # Each stack element is a vRouter which still has to be created below
+    # `parent` in layer `depth`
+    stack = [(root, 1)] * fanouts[0] if fanouts else []
+    if not fanouts:
+        for _ in range(hosts_per_leaf):
+            topo.add_Host(root)
+
+    while stack:
+        parent, depth = stack.pop()
+        router = topo.add_vRouter(parent)
+        if depth == len(fanouts):
+            for _ in range(hosts_per_leaf):
+                topo.add_Host(router)
+        else:
+            stack.extend([(router, depth + 1)] * fanouts[depth])
+
     return topo
 
 
-def create_n_hop_topo(n_hops):
-    logging.info("Instantiate new {} hop topology".format(n_hops))
+def create_k_ary_topo(arity, depth, hosts_per_leaf=1, allocator=None):
+    """create_k_ary_topo.
+
+    Creates a complete k-ary tree of vRouters with `depth` layers below the
+    root router.
+
+    Parameters
+    ----------
+    arity :
+        int - Number of child vRouters of each vRouter
+    depth :
+        int - Number of layers below the root router
+    hosts_per_leaf :
+        int - Number of Hosts connected to each vRouter of the last layer
+    allocator :
+        AddressAllocator - (optional) Address plan of the topology
+    """
+    return create_tree_topo([arity] * depth, hosts_per_leaf, allocator)
+
+
+def create_fat_tree_topo(k, allocator=None):
+    """create_fat_tree_topo.
+
+    Creates the tree of a k-ary fat-tree: A core vRouter connected to `k`
+    pod vRouters (aggregation layer), each connected to `k/2` edge vRouters
+    with `k/2` Hosts each. The tree has the `k^3/4` Hosts of a fat-tree, but
+    as virntup only supports trees, the redundant core and aggregation links
+    are left out.
+
+    Parameters
+    ----------
+    k :
+        int - Even number of ports of the fat-tree switches
+    allocator :
+        AddressAllocator - (optional) Address plan of the topology
+    """
+    if k < 2 or k % 2:
+        raise ValueError("A fat-tree needs an even k >= 2")
+
+    return create_tree_topo([k, k // 2], k // 2, allocator)
+
+
+def create_random_tree_topo(routers, hosts, seed=None, max_fanout=None, allocator=None):
+    """create_random_tree_topo.
+
+    Creates a random tree: Every vRouter is connected to a randomly chosen,
+    previously created vRouter and every Host to a randomly chosen vRouter.
+    The same seed always creates the same topology.
+
+    Parameters
+    ----------
+    routers :
+        int - Number of vRouters
+    hosts :
+        int - Number of Hosts
+    seed :
+        int - (optional) Seed of the random number generator
+    max_fanout :
+        int - (optional) Maximum number of neighbours (vRouters and Hosts)
+        of a vRouter
+    allocator :
+        AddressAllocator - (optional) Address plan of the topology
+    """
+    if routers < 1 or hosts < 0:
+        raise ValueError("A random tree needs >= 1 vRouters and >= 0 hosts")
+    if routers - 1 + hosts < 1:
+        # The root vRouter needs a port, a mapping without links has no
+        # uplink for the default route
+        raise ValueError("A random tree needs at least one link, i.e. 2 vRouters or a host")
+    if max_fanout is not None and (max_fanout < 1 or routers * max_fanout < routers - 1 + hosts):
+        raise ValueError("{} vRouters with a fan-out of {} can not connect {} hosts".format(
+            routers, max_fanout, hosts))
+
+    logging.info("Instantiate new random tree topology with {} vRouters and {} hosts (seed {})".format(
+        routers, hosts, seed))
+
+    generator = random.Random(seed)
 
-    _reset_topo_id_counter()
+    topo = topology.V_topology(allocator=allocator)
 
-    root = topology.vRouter()
-    topo = topology.V_topology(root)
+    # vRouters which can take further neighbours
+    candidates = [topo.add_vRouter()]
+
+    def choose_parent():
+        index = generator.randrange(len(candidates))
+        parent = candidates[index]
+        if max_fanout is not None and len(parent.neighbors) + 1 >= max_fanout:
+            # Remove the full vRouter in O(1) by swapping it with the last one
+            candidates[index] = candidates[-1]
+            candidates.pop()
+        return parent
+
+    for _ in range(routers - 1):
+        candidates.append(topo.add_vRouter(choose_parent()))
+
+    for _ in range(hosts):
+        topo.add_Host(choose_parent())
+
+    return topo
+
+
+def create_n_hop_topo(n_hops, allocator=None):
+    """create_n_hop_topo.
+
+    Creates a chain of `n_hops` vRouters with one Host on each end.
+
+    Parameters
+    ----------
+    n_hops :
+        int - Number of vRouters between the two Hosts
+    allocator :
+        AddressAllocator - (optional) Address plan of the topology
+    """
+    logging.info("Instantiate new {} hop topology".format(n_hops))
+
+    topo = topology.V_topology(allocator=allocator)
+    root = topo.add_vRouter()
 
     current_router = root
-    for count in range(n_hops - 1):
-        tmp = topology.vRouter()
-        current_router.add_link(tmp)
-        current_router = tmp
+    for _ in range(n_hops - 1):
+        current_router = topo.add_vRouter(current_router)
+
+    topo.add_Host(root)
+    topo.add_Host(current_router)
+
+    return topo
+
+
+def create_topo(topo_type, allocator=None, hops=None, fanouts=None, hosts_per_leaf=1,
+                arity=None, depth=None, k=None, routers=None, hosts=None, seed=None,
+                max_fanout=None):
+    """create_topo.
+
+    Creates a topology of the given type.
+
+    Parameters
+    ----------
+    topo_type :
+        str - One of `TOPOLOGY_TYPES`
+    allocator :
+        AddressAllocator - (optional) Address plan of the topology
+    hops :
+        int - Number of vRouters, only used for type `n_hops`
+    fanouts :
+        list of int or str (e.g. "4,4,8") - Fan-out per layer, only used for
+        type `tree`
+    hosts_per_leaf :
+        int - Hosts per vRouter of the last layer, used for `tree` and `k_ary`
+    arity :
+        int - Fan-out of every vRouter, only used for type `k_ary`
+    depth :
+        int - Number of layers below the root, only used for type `k_ary`
+    k :
+        int - Port count of the switches, only used for type `fat_tree`
+    routers :
+        int - Number of vRouters, only used for type `random`
+    hosts :
+        int - Number of Hosts, only used for type `random`
+    seed :
+        int - Seed, only used for type `random`
+    max_fanout :
+        int - Maximum neighbours of a vRouter, only used for type `random`
+    """
+    if topo_type == 'minimal':
+        return create_3_node_topo(allocator)
+
+    if topo_type == 'medium':
+        return create_4_node_topo(allocator)
+
+    if topo_type == 'large':
+        return create_multi_layer_topo(allocator)
+
+    if topo_type == 'n_hops':
+        if not hops or hops < 1:
+            raise ValueError(
+                "For type `n_hops` a number of hops >= 1 has to be specified")
+        return create_n_hop_topo(int(hops), allocator)
+
+    if topo_type == 'tree':
+        if fanouts is None:
+            raise ValueError(
+                "For type `tree` the fan-outs per layer have to be specified")
+        if isinstance(fanouts, str):
+            fanouts = [int(fanout) for fanout in fanouts.split(",") if fanout]
+        return create_tree_topo(fanouts, hosts_per_leaf, allocator)
+
+    if topo_type == 'k_ary':
+        if not arity or depth is None:
+            raise ValueError(
+                "For type `k_ary` the arity and the depth have to be specified")
+        return create_k_ary_topo(arity, depth, hosts_per_leaf, allocator)
+
+    if topo_type == 'fat_tree':
+        if not k:
+            raise ValueError("For type `fat_tree` k has to be specified")
+        return create_fat_tree_topo(k, allocator)
+
+    if topo_type == 'random':
+        if not routers or hosts is None:
+            raise ValueError(
+                "For type `random` the number of vRouters and hosts have to be specified")
+        return create_random_tree_topo(routers, hosts, seed, max_fanout, allocator)
+
+    raise ValueError("`{}` is not a known topology type".format(topo_type))
+
+
+def generate_topo(topo_type, allocator=None, aggregate=False, verify_aggregation=False, compact=False,
+                  **params):
+    """generate_topo.
+
+    Creates a topology of the given type and calculates all routing tables,
+    so the topology is ready to be exported.
+
+    Parameters
+    ----------
+    topo_type :
+        str - see `create_topo()`
+    allocator :
+        AddressAllocator - (optional) Address plan of the topology
+    aggregate :
+        Bool (default: False) - Assign aggregatable subnets and summarize the
+        routing tables
+    verify_aggregation :
+        Bool (default: False) - Verify the summarized routing tables
+    compact :
+        Bool (default: False) - Return a `CompactTopology`, which derives the
+        routing tables from arrays instead of storing them in every vRouter.
+        Can not be combined with `aggregate`.
+    params :
+        Parameters of the topology type, see `create_topo()`
+    """
+    if compact and aggregate:
+        raise ValueError(
+            "Summarized routing tables are not supported by the compact representation")
+
+    topo = create_topo(topo_type, allocator, **params)
+
+    if compact:
+        # NumPy is only imported if the compact representation is used
+        from . import compact_topology
+        return compact_topology.CompactTopology(topo)
+
+    if aggregate:
+        topo.assign_aggregatable_subnets()
+
+    topo.update_all_routing_tables()
 
-    root.add_link(topology.Host())
-    current_router.add_link(topology.Host())
+    if aggregate:
+        topo.summarize_routing_tables(verify=verify_aggregation)
 
     return topo
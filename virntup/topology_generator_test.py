@@ -0,0 +1,69 @@
+import logging
+import unittest
+
+from . import topology_generator
+
+logging.basicConfig(level=logging.INFO)
+
+
+def count_nodes(topo):
+    """count_nodes.
+
+    Returns the number of vRouters and Hosts in the IR of topo.
+    """
+    ir = topo.get_IR_representation()
+    return len(ir["vRouter"]), len(ir["Host"])
+
+
+###########################################################
+class TestTreeGenerators(unittest.TestCase):
+    """TestTreeGenerators.
+    """
+
+    def test_tree_equals_multi_layer_topo(self):
+        """test_tree_equals_multi_layer_topo.
+        """
+        self.assertEqual(
+            topology_generator.generate_topo(
+                'tree', fanouts="3,3", hosts_per_leaf=2).get_IR_representation(),
+            topology_generator.generate_topo('large').get_IR_representation())
+
+    def test_node_counts(self):
+        """test_node_counts.
+        """
+        self.assertEqual(count_nodes(topology_generator.generate_topo(
+            'tree', fanouts=[2, 3], hosts_per_leaf=4)), (1 + 2 + 6, 24))
+        self.assertEqual(count_nodes(topology_generator.generate_topo(
+            'k_ary', arity=2, depth=3)), (15, 8))
+        # k^3/4 hosts, 1 + k + k^2/2 vRouters
+        self.assertEqual(count_nodes(topology_generator.generate_topo(
+            'fat_tree', k=4)), (13, 16))
+
+        with self.assertRaises(ValueError):
+            topology_generator.generate_topo('fat_tree', k=3)
+
+    def test_random_tree_is_seeded(self):
+        """test_random_tree_is_seeded.
+        """
+        def random_ir(seed):
+            return topology_generator.generate_topo(
+                'random', routers=30, hosts=60, seed=seed, max_fanout=4).get_IR_representation()
+
+        ir = random_ir(7)
+        self.assertEqual(ir, random_ir(7))
+        self.assertNotEqual(ir, random_ir(8))
+
+        self.assertEqual((len(ir["vRouter"]), len(ir["Host"])), (30, 60))
+        for router in ir["vRouter"].values():
+            self.assertLessEqual(len(router["neighbors"]), 4)
+
+        # A single vRouter without hosts has no link to map
+        with self.assertRaises(ValueError):
+            topology_generator.generate_topo('random', routers=1, hosts=0)
+        self.assertEqual(count_nodes(topology_generator.generate_topo(
+            'random', routers=1, hosts=1)), (1, 1))
+
+
+################################################
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import itertools
+import json
+import logging
+import os
+import concurrent.futures
+
+from . import binary_ir
+from . import topology_generator
+from .address_allocator import AddressAllocator
+
+
+def parse_sweep_values(values):
+    """parse_sweep_values.
+
+    Parses the values of a swept parameter.
+
+    Parameters
+    ----------
+    values :
+        str - Either an inclusive integer range `<start>..<end>` or a list of
+        values separated by `;`, e.g. `1..500` or `2;4;8`
+
+    Returns
+    ----------
+    list : The values, integers are converted to int
+    """
+    if ".." in values:
+        start, end = values.split("..")
+        return list(range(int(start), int(end) + 1))
+
+    return [int(v) if v.isdigit() else v for v in values.split(";") if v]
+
+
+def expand_variants(topo_type, sweeps, params=None):
+    """expand_variants.
+
+    Creates all combinations of the swept parameters.
+
+    Parameters
+    ----------
+    topo_type :
+        str - Topology type, see `topology_generator.create_topo()`
+    sweeps :
+        list of (name, list of values) tuples - Swept parameters
+    params :
+        dict - (optional) Parameters shared by all variants
+
+    Returns
+    ----------
+    list of (name, params) tuples : One entry per variant. The name is
+    derived from the topology type and the swept values.
+    """
+    names = [sweep[0] for sweep in sweeps]
+    variants = []
+    for values in itertools.product(*[sweep[1] for sweep in sweeps]):
+        variant_params = dict(params or {})
+        variant_params.update(zip(names, values))
+
+        name = "_".join([topo_type] + ["{}-{}".format(n, v).replace(",", "-")
+                                       for n, v in zip(names, values)])
+        variants.append((name, variant_params))
+    return variants
+
+
+def _generate_variant(job):
+    """_generate_variant.
+
+    Worker function - Generates one topology variant and stores its IR.
+    Every variant is built from a new V_topology, hence the output does not
+    depend on the worker or on the order in which variants are generated.
+
+    Parameters
+    ----------
+    job :
+        tuple - (name, topo_type, params, address plan, aggregate,
+        verify_aggregation, compact, ir_format, out_dir)
+    """
+    name, topo_type, params, plan, aggregate, verify_aggregation, compact, ir_format, out_dir = job
+
+    topo = topology_generator.generate_topo(
+        topo_type,
+        AddressAllocator(**plan),
+        aggregate=aggregate,
+        verify_aggregation=verify_aggregation,
+        compact=compact,
+        **params
+    )
+    if ir_format == 'binary':
+        path = os.path.join(out_dir, name + ".bin")
+        with open(path, mode="wb") as file:
+            routers, hosts = binary_ir.write_binary_ir(topo, file)
+    else:
+        ir = topo.get_IR_representation()
+        path = os.path.join(out_dir, name + ".json")
+        with open(path, mode="w") as file:
+            json.dump(ir, file, indent=4)
+        routers, hosts = len(ir["vRouter"]), len(ir["Host"])
+
+    return name, path, routers, hosts
+
+
+def run_sweep(topo_type, variants, out_dir, plan=None, aggregate=False,
+              verify_aggregation=False, compact=False, ir_format='json', processes=None):
+    """run_sweep.
+
+    Generates all topology variants in a process pool and stores the IR of
+    each variant as `<out_dir>/<variant name>.json` (or `.bin` for the
+    binary IR).
+
+    Parameters
+    ----------
+    topo_type :
+        str - Topology type, see `topology_generator.create_topo()`
+    variants :
+        list of (name, params) tuples - see `expand_variants()`
+    out_dir :
+        str - Directory the IR files are stored in
+    plan :
+        dict - (optional) Keyword arguments for the `AddressAllocator` of each
+        variant
+    aggregate :
+        Bool (default: False) - Assign aggregatable subnets and summarize
+    verify_aggregation :
+        Bool (default: False) - Verify the summarized routing tables
+    compact :
+        Bool (default: False) - Generate compact topologies, see
+        `topology_generator.generate_topo()`
+    ir_format :
+        str (default: 'json') - 'json' or 'binary', see
+        `binary_ir.write_binary_ir()`
+    processes :
+        int - (optional) Number of worker processes, defaults to the number
+        of CPUs
+
+    Returns
+    ----------
+    list of (name, path, #vRouter, #Host) tuples : One entry per variant in
+    the order of `variants`
+    """
+    os.makedirs(out_dir, exist_ok=True)
+
+    jobs = [(name, topo_type, params, plan or {}, aggregate, verify_aggregation, compact,
+             ir_format, out_dir)
+            for name, params in variants]
+
+    logging.info("Generate {} topology variants in {}".format(len(jobs), out_dir))
+
+    # concurrent.futures loads the process pool (and multiprocessing) on
+    # first access, so plain topogen runs do not pay for it
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as pool:
+        results = list(pool.map(_generate_variant, jobs))
+
+    for name, path, routers, hosts in results:
+        logging.debug("{}: {} vRouter, {} Hosts -> {}".format(
+            name, routers, hosts, path))
+
+    return results
@@ -0,0 +1,64 @@
+import json
+import logging
+import os
+import tempfile
+import unittest
+
+from . import binary_ir
+from . import topology_generator
+from . import topology_sweep
+
+logging.basicConfig(level=logging.INFO)
+
+
+###########################################################
+class TestTopologySweep(unittest.TestCase):
+    """TestTopologySweep.
+    """
+
+    def test_parse_sweep_values(self):
+        """test_parse_sweep_values.
+        """
+        self.assertEqual(topology_sweep.parse_sweep_values("1..4"), [1, 2, 3, 4])
+        self.assertEqual(topology_sweep.parse_sweep_values("2;4;8"), [2, 4, 8])
+        self.assertEqual(topology_sweep.parse_sweep_values("3,3,2;4,2"), ["3,3,2", "4,2"])
+
+    def test_sweep_matches_single_generation(self):
+        """test_sweep_matches_single_generation.
+        """
+        variants = topology_sweep.expand_variants(
+            'n_hops', [("hops", [1, 2, 3, 4, 5, 6])])
+
+        with tempfile.TemporaryDirectory() as out_dir:
+            results = topology_sweep.run_sweep('n_hops', variants, out_dir, processes=3)
+            self.assertEqual([r[0] for r in results],
+                             ["n_hops_hops-{}".format(n) for n in range(1, 7)])
+
+            for hops in range(1, 7):
+                with open(os.path.join(out_dir, "n_hops_hops-{}.json".format(hops))) as file:
+                    swept = json.load(file)
+                expected = topology_generator.generate_topo(
+                    'n_hops', hops=hops).get_IR_representation()
+                self.assertEqual(swept, expected)
+
+    def test_compact_binary_sweep_matches_single_generation(self):
+        """test_compact_binary_sweep_matches_single_generation.
+        """
+        variants = topology_sweep.expand_variants('n_hops', [("hops", [2, 3])])
+
+        with tempfile.TemporaryDirectory() as out_dir:
+            results = topology_sweep.run_sweep(
+                'n_hops', variants, out_dir, compact=True, ir_format='binary', processes=2)
+            self.assertEqual([r[2:] for r in results], [(2, 2), (3, 2)])
+
+            for hops in (2, 3):
+                with open(os.path.join(out_dir, "n_hops_hops-{}.bin".format(hops)), mode='rb') as file:
+                    swept = binary_ir.load_binary_ir(file)
+                expected = topology_generator.generate_topo(
+                    'n_hops', hops=hops).get_IR_representation()
+                self.assertEqual(swept, expected)
+
+
+################################################
+if __name__ == '__main__':
+    unittest.main()
@@ -1,18 +1,262 @@
+import io
 import logging
 import unittest
 
 from . import topology
 from . import topology_generator
+from .address_allocator import AddressAllocator
 
 logging.basicConfig(level=logging.INFO)
 
 
+class _RecordingPreOrderVisitor(topology.AbstractPreOderVTopologyVisitor):
+    """_RecordingPreOrderVisitor.
+    """
+
+    def __init__(self):
+        self.visited = []
+
+    def visit_vRouter(self, router):
+        self.visited.append(router.id)
+
+    def visit_Host(self, host):
+        self.visited.append(host.id)
+
+
+class _RecordingPostOrderVisitor(topology.AbstractPostOrderVTopologyVisitor):
+    """_RecordingPostOrderVisitor.
+    """
+
+    def __init__(self):
+        self.visited = []
+
+    def visit_vRouter(self, router):
+        self.visited.append(router.id)
+
+    def visit_Host(self, host):
+        self.visited.append(host.id)
+
+
+class _ChainNode:
+    """_ChainNode.
+
+    Minimal stand-in for a _Node, used to build very deep chains cheaply.
+    """
+
+    def __init__(self, node_id, node_type):
+        self.id = node_id
+        self.type = node_type
+        self.neighbors = []
+
+
 ###########################################################
 class TestVRouter(unittest.TestCase):
     """TestVRouter.
     """
 
 
+###########################################################
+class TestTraversal(unittest.TestCase):
+    """TestTraversal.
+    """
+
+    def test_visit_order(self):
+        """test_visit_order.
+        """
+        topo = topology_generator.create_4_node_topo()
+
+        pre = _RecordingPreOrderVisitor()
+        topo.apply_visitor(pre)
+        self.assertEqual(pre.visited, [1, 2, 4, 3])
+
+        post = _RecordingPostOrderVisitor()
+        topo.apply_visitor(post)
+        self.assertEqual(post.visited, [4, 2, 3, 1])
+
+    def test_deep_chain(self):
+        """test_deep_chain.
+
+        A chain far deeper than the recursion limit must be walkable.
+        """
+        depth = 200000
+        root = _ChainNode(0, 'vRouter')
+        current = root
+        for node_id in range(1, depth):
+            tmp = _ChainNode(node_id, 'vRouter')
+            current.neighbors.append(tmp)
+            current = tmp
+        current.neighbors.append(_ChainNode(depth, 'host'))
+
+        pre = _RecordingPreOrderVisitor()
+        topology.traverse(root, pre)
+        self.assertEqual(pre.visited, list(range(depth + 1)))
+
+        post = _RecordingPostOrderVisitor()
+        topology.traverse(root, post)
+        self.assertEqual(post.visited, list(range(depth, -1, -1)))
+
+
+###########################################################
+class TestTopologyState(unittest.TestCase):
+    """TestTopologyState.
+    """
+
+    def test_independent_topologies(self):
+        """test_independent_topologies.
+
+        Ids and networks are allocated per topology, so generating the same
+        topology twice results in the same IR.
+        """
+        first = topology_generator.generate_topo('large')
+        topology_generator.generate_topo('n_hops', hops=5)
+        second = topology_generator.generate_topo('large')
+
+        self.assertEqual(first.get_IR_representation(),
+                         second.get_IR_representation())
+        self.assertIn("1", second.get_IR_representation()["vRouter"])
+
+    def test_node_requires_topology(self):
+        """test_node_requires_topology.
+        """
+        with self.assertRaises(RuntimeError):
+            topology.vRouter()
+
+
+###########################################################
+class TestRouteAggregation(unittest.TestCase):
+    """TestRouteAggregation.
+    """
+
+    def test_aggregated_tables_have_one_route_per_port(self):
+        """test_aggregated_tables_have_one_route_per_port.
+        """
+        topo = topology_generator.create_multi_layer_topo()
+        topo.assign_aggregatable_subnets()
+        topo.update_all_routing_tables()
+        topo.summarize_routing_tables(verify=True)
+
+        for router in topo.get_IR_representation()["vRouter"].values():
+            ports = [route[0] for route in router["routingtable"]]
+            self.assertEqual(len(ports), len(router["neighbors"]))
+            self.assertEqual(len(set(ports)), len(ports))
+
+    def test_deep_trees_need_few_subnets(self):
+        """test_deep_trees_need_few_subnets.
+
+        Blocks of deep subtrees must not double at every level.
+        """
+        for topo in (topology_generator.generate_topo('n_hops', hops=20),
+                     topology_generator.generate_topo('random', routers=300, hosts=600, seed=3,
+                                                      allocator=AddressAllocator("10.0.0.0/12"))):
+            block_visitor = topology.SubnetBlockSizeVisitor()
+            topo.apply_visitor(block_visitor)
+            nodes = block_visitor.node_counts[topo.router]
+            self.assertLessEqual(block_visitor.block_sizes[topo.router], 2.5 * nodes)
+
+            topo.assign_aggregatable_subnets()
+            topo.update_all_routing_tables()
+            topo.summarize_routing_tables(verify=True)
+
+            networks_visitor = topology.AssignedNetworksVisitor()
+            topo.apply_visitor(networks_visitor)
+            self.assertEqual(len(set(networks_visitor.networks)), nodes)
+
+        # 22 networks fit into the 32 /24 subnets of a /19, the aggregatable
+        # blocks do not
+        with self.assertRaises(ValueError):
+            topology_generator.generate_topo(
+                'n_hops', hops=20, allocator=AddressAllocator("10.0.0.0/19"), aggregate=True)
+
+    def test_summarization_keeps_forwarding(self):
+        """test_summarization_keeps_forwarding.
+
+        Without aggregatable subnets the summarization must not cover any
+        network which is routed elsewhere.
+        """
+        topo = topology_generator.create_multi_layer_topo()
+        topo.update_all_routing_tables()
+        before = sum(len(r["routingtable"])
+                     for r in topo.get_IR_representation()["vRouter"].values())
+
+        topo.summarize_routing_tables(verify=True)
+        after = sum(len(r["routingtable"])
+                    for r in topo.get_IR_representation()["vRouter"].values())
+
+        self.assertLess(after, before)
+
+
+###########################################################
+class TestIncrementalUpdate(unittest.TestCase):
+    """TestIncrementalUpdate.
+    """
+
+    def assertTablesAreUpToDate(self, topo):
+        """assertTablesAreUpToDate.
+
+        Compares all routing tables with a full recomputation.
+        """
+        incremental = topo.get_IR_representation()
+        topo.update_all_routing_tables()
+        self.assertEqual(incremental, topo.get_IR_representation())
+
+    def test_tables_equal_full_update(self):
+        """test_tables_equal_full_update.
+        """
+        topo = topology_generator.generate_topo('large')
+        leaf = topo.router.neighbors[1].neighbors[0]
+
+        _, delta = topo.insert_Host(leaf)
+        self.assertTablesAreUpToDate(topo)
+        # The host network is added to the leaf and all routers above it
+        self.assertEqual(len(delta.added), 3)
+        self.assertEqual(delta.removed, [])
+
+        subtree = topology.vRouter(topo=topo)
+        topo.add_Host(subtree)
+        topo.add_Host(subtree)
+        delta = topo.add_subtree(topo.router, subtree)
+        self.assertTablesAreUpToDate(topo)
+        self.assertEqual([(router.id, port) for router, port, _ in delta.linked],
+                         [(topo.router.id, 4), (subtree.id, 1), (subtree.id, 2)])
+
+        delta = topo.remove_subtree(topo.router.neighbors[0])
+        self.assertTablesAreUpToDate(topo)
+        # The remaining neighbours of the root move to ports 1 to 3
+        self.assertEqual(len(delta.unlinked), 1 + 3 + 6)
+        self.assertEqual({port for router_id, port, _ in delta.added}, {1, 2, 3})
+
+    def test_routing_table_is_replaced(self):
+        """test_routing_table_is_replaced.
+        """
+        topo = topology_generator.generate_topo('medium')
+        before = topo.get_IR_representation()
+        topo.update_all_routing_tables()
+        self.assertEqual(topo.get_IR_representation(), before)
+
+    def test_inserts_after_reassignment_get_new_networks(self):
+        """test_inserts_after_reassignment_get_new_networks.
+        """
+        topo = topology_generator.generate_topo('n_hops', hops=5)
+        topo.assign_aggregatable_subnets()
+        topo.update_all_routing_tables()
+
+        topo.insert_Host(topo.router)
+        topo.insert_Host(topo.router)
+
+        networks_visitor = topology.AssignedNetworksVisitor()
+        topo.apply_visitor(networks_visitor)
+        networks = networks_visitor.networks
+        self.assertEqual(len(networks), len(set(networks)))
+        self.assertTablesAreUpToDate(topo)
+
+    def test_summarized_tables_are_rejected(self):
+        """test_summarized_tables_are_rejected.
+        """
+        topo = topology_generator.generate_topo('large', aggregate=True)
+        with self.assertRaises(RuntimeError):
+            topo.insert_Host(topo.router)
+
+
 ###########################################################
 class TestDotRepresentationVisitor(unittest.TestCase):
     """TestDotRepresentationVisitor.
@@ -23,10 +267,14 @@ class TestDotRepresentationVisitor(unittest.TestCase):
         """
         expected = r"""graph graphname {
 1[shape=box]
-1 -- 2
-1 -- 3
-2
-3
+1 -- 2 [headlabel = 0, taillabel="1"] 
+1 -- 3 [headlabel = 0, taillabel="2"] 
+2 [label="Host2 
+ 10.42.1.1/24 
+ 08:00:00:0a:2a:01"]
+3 [label="Host3 
+ 10.42.2.1/24 
+ 08:00:00:0a:2a:02"]
 }"""
         dot_v = topology.DotRepresentationVisitor()
 
@@ -42,66 +290,102 @@ class TestDotRepresentationVisitor(unittest.TestCase):
         """
         expected = r"""graph graphname {
 1[shape=box]
-1 -- 2
-1 -- 12
-1 -- 22
+1 -- 2 [headlabel = 0, taillabel="1"] 
+1 -- 12 [headlabel = 0, taillabel="2"] 
+1 -- 22 [headlabel = 0, taillabel="3"] 
 2[shape=box]
-2 -- 3
-2 -- 6
-2 -- 9
+2 -- 3 [headlabel = 0, taillabel="1"] 
+2 -- 6 [headlabel = 0, taillabel="2"] 
+2 -- 9 [headlabel = 0, taillabel="3"] 
 3[shape=box]
-3 -- 4
-3 -- 5
-4
-5
+3 -- 4 [headlabel = 0, taillabel="1"] 
+3 -- 5 [headlabel = 0, taillabel="2"] 
+4 [label="Host4 
+ 10.42.3.1/24 
+ 08:00:00:0a:2a:03"]
+5 [label="Host5 
+ 10.42.4.1/24 
+ 08:00:00:0a:2a:04"]
 6[shape=box]
-6 -- 7
-6 -- 8
-7
-8
+6 -- 7 [headlabel = 0, taillabel="1"] 
+6 -- 8 [headlabel = 0, taillabel="2"] 
+7 [label="Host7 
+ 10.42.6.1/24 
+ 08:00:00:0a:2a:06"]
+8 [label="Host8 
+ 10.42.7.1/24 
+ 08:00:00:0a:2a:07"]
 9[shape=box]
-9 -- 10
-9 -- 11
-10
-11
+9 -- 10 [headlabel = 0, taillabel="1"] 
+9 -- 11 [headlabel = 0, taillabel="2"] 
+10 [label="Host10 
+ 10.42.9.1/24 
+ 08:00:00:0a:2a:09"]
+11 [label="Host11 
+ 10.42.10.1/24 
+ 08:00:00:0a:2a:0a"]
 12[shape=box]
-12 -- 13
-12 -- 16
-12 -- 19
+12 -- 13 [headlabel = 0, taillabel="1"] 
+12 -- 16 [headlabel = 0, taillabel="2"] 
+12 -- 19 [headlabel = 0, taillabel="3"] 
 13[shape=box]
-13 -- 14
-13 -- 15
-14
-15
+13 -- 14 [headlabel = 0, taillabel="1"] 
+13 -- 15 [headlabel = 0, taillabel="2"] 
+14 [label="Host14 
+ 10.42.13.1/24 
+ 08:00:00:0a:2a:0d"]
+15 [label="Host15 
+ 10.42.14.1/24 
+ 08:00:00:0a:2a:0e"]
 16[shape=box]
-16 -- 17
-16 -- 18
-17
-18
+16 -- 17 [headlabel = 0, taillabel="1"] 
+16 -- 18 [headlabel = 0, taillabel="2"] 
+17 [label="Host17 
+ 10.42.16.1/24 
+ 08:00:00:0a:2a:10"]
+18 [label="Host18 
+ 10.42.17.1/24 
+ 08:00:00:0a:2a:11"]
 19[shape=box]
-19 -- 20
-19 -- 21
-20
-21
+19 -- 20 [headlabel = 0, taillabel="1"] 
+19 -- 21 [headlabel = 0, taillabel="2"] 
+20 [label="Host20 
+ 10.42.19.1/24 
+ 08:00:00:0a:2a:13"]
+21 [label="Host21 
+ 10.42.20.1/24 
+ 08:00:00:0a:2a:14"]
 22[shape=box]
-22 -- 23
-22 -- 26
-22 -- 29
+22 -- 23 [headlabel = 0, taillabel="1"] 
+22 -- 26 [headlabel = 0, taillabel="2"] 
+22 -- 29 [headlabel = 0, taillabel="3"] 
 23[shape=box]
-23 -- 24
-23 -- 25
-24
-25
+23 -- 24 [headlabel = 0, taillabel="1"] 
+23 -- 25 [headlabel = 0, taillabel="2"] 
+24 [label="Host24 
+ 10.42.23.1/24 
+ 08:00:00:0a:2a:17"]
+25 [label="Host25 
+ 10.42.24.1/24 
+ 08:00:00:0a:2a:18"]
 26[shape=box]
-26 -- 27
-26 -- 28
-27
-28
+26 -- 27 [headlabel = 0, taillabel="1"] 
+26 -- 28 [headlabel = 0, taillabel="2"] 
+27 [label="Host27 
+ 10.42.26.1/24 
+ 08:00:00:0a:2a:1a"]
+28 [label="Host28 
+ 10.42.27.1/24 
+ 08:00:00:0a:2a:1b"]
 29[shape=box]
-29 -- 30
-29 -- 31
-30
-31
+29 -- 30 [headlabel = 0, taillabel="1"] 
+29 -- 31 [headlabel = 0, taillabel="2"] 
+30 [label="Host30 
+ 10.42.29.1/24 
+ 08:00:00:0a:2a:1d"]
+31 [label="Host31 
+ 10.42.30.1/24 
+ 08:00:00:0a:2a:1e"]
 }"""
 
         topo = topology_generator.create_multi_layer_topo()
@@ -113,6 +397,36 @@ class TestDotRepresentationVisitor(unittest.TestCase):
         self.assertMultiLineEqual(actual, expected)
 
 
+    def test_streamed_representation(self):
+        """test_streamed_representation.
+        """
+        topo = topology_generator.generate_topo('large')
+        dot_v = topology.DotRepresentationVisitor(with_routingtable=True)
+        topo.apply_visitor(dot_v)
+
+        fd = io.StringIO()
+        topology.write_dot_representation(topo, fd, with_routingtable=True)
+        self.assertEqual(fd.getvalue(), dot_v.get_representation())
+
+    def test_collapsed_subtrees(self):
+        """test_collapsed_subtrees.
+        """
+        topo = topology_generator.generate_topo('large')
+
+        fd = io.StringIO()
+        topology.write_dot_representation(
+            topo, fd, routingtable_routers={2}, max_depth=2)
+        lines = fd.getvalue().splitlines()
+        # 9 leaf routers are drawn as summaries, their hosts are left out
+        self.assertEqual(sum('shape=box3d' in line for line in lines), 9)
+        self.assertNotIn('4 [label="Host4 ', lines)
+        self.assertEqual(sum('shape="record"' in line for line in lines), 1)
+
+        fd = io.StringIO()
+        topology.write_dot_representation(topo, fd, max_subtree_size=9)
+        self.assertEqual(fd.getvalue().count('+3 vRouters, 6 hosts'), 3)
+
+
 ################################################
 if __name__ == '__main__':
     unittest.main()
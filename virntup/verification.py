@@ -0,0 +1,145 @@
+import logging
+from collections import namedtuple
+
+from .topology_controller import PORT_MAPPING, ROUTES, diff_entries
+
+
+# Result of the comparison of one table. `missing` and `extra` contain
+# (key, action) tuples, `mismatched` (key, expected action, installed action)
+# tuples.
+TableVerification = namedtuple(
+    "TableVerification", ["missing", "extra", "mismatched", "matching"])
+
+TABLES = [PORT_MAPPING, ROUTES]
+
+
+def compare_entries(expected, current):
+    """compare_entries.
+
+    Compares the expected with the installed entries of a table. The
+    differences are the updates `diff_entries()` computes: missing entries
+    would be inserted, mismatched ones modified and extra ones deleted.
+
+    Parameters
+    ----------
+    expected :
+        dict - {match key: action} entries the table should contain
+    current :
+        dict - {match key: action} entries the table contains
+
+    Returns
+    ----------
+    TableVerification
+    """
+    diff = diff_entries(expected, current)
+
+    mismatched = [(key, value, current[key]) for key, value in diff.modify]
+    extra = [(key, current[key]) for key in diff.delete]
+    matching = len(expected) - len(diff.insert) - len(diff.modify)
+
+    return TableVerification(diff.insert, extra, mismatched, matching)
+
+
+def verify_deployment(controller, target_connector, scoped=False):
+    """verify_deployment.
+
+    Reads both tables with one wildcard read each and compares them with
+    the entries of the mapping.
+
+    Parameters
+    ----------
+    controller :
+        TopologyController - mapped topology
+    target_connector :
+        target_connector object of the target
+    scoped :
+        bool (default: False) - Only compare the entries of the ports of the
+        environment and of the vRouter numbers of the topology, entries of
+        other topologies on the same target are not reported as extra
+
+    Returns
+    ----------
+    dict : {table name (see TABLES): TableVerification}
+    """
+    port_entries, route_entries = controller.get_expected_entries()
+
+    current_ports = target_connector.read_vRouter_port_mappings()
+    current_routes = target_connector.read_routes()
+    logging.info("Read {} port mapping and {} route entries".format(
+        len(current_ports), len(current_routes)))
+
+    if scoped:
+        current_ports, current_routes = controller.get_own_entries(
+            current_ports, current_routes)
+
+    return {
+        PORT_MAPPING: compare_entries(port_entries, current_ports),
+        ROUTES: compare_entries(route_entries, current_routes)
+    }
+
+
+def is_consistent(report):
+    """is_consistent.
+
+    Returns True if the target contains exactly the expected entries.
+
+    Parameters
+    ----------
+    report :
+        dict - result of `verify_deployment()`
+    """
+    return not any(result.missing or result.extra or result.mismatched
+                   for result in report.values())
+
+
+def report_to_json(report):
+    """report_to_json.
+
+    Converts the result of `verify_deployment()` to a json serializable
+    dict.
+    """
+    return {
+        table: {
+            "missing": [{"key": key, "action": value} for key, value in result.missing],
+            "extra": [{"key": key, "action": value} for key, value in result.extra],
+            "mismatched": [{"key": key, "expected": expected, "installed": installed}
+                           for key, expected, installed in result.mismatched],
+            "matching": result.matching
+        }
+        for table, result in report.items()
+    }
+
+
+def format_report(report, show=10):
+    """format_report.
+
+    Formats the result of `verify_deployment()` as table with the first
+    differences of each table.
+
+    Parameters
+    ----------
+    report :
+        dict - result of `verify_deployment()`
+    show :
+        int (default: 10) - Number of differences printed per kind and table
+    """
+    lines = ["{:<14}{:>10}{:>10}{:>10}{:>12}".format(
+        "table", "matching", "missing", "extra", "mismatched")]
+    for table in TABLES:
+        result = report[table]
+        lines.append("{:<14}{:>10}{:>10}{:>10}{:>12}".format(
+            table, result.matching, len(result.missing), len(result.extra), len(result.mismatched)))
+
+    for table in TABLES:
+        result = report[table]
+        for key, value in result.missing[:show]:
+            lines.append("{} missing: {} -> {}".format(table, key, value))
+        for key, value in result.extra[:show]:
+            lines.append("{} extra: {} -> {}".format(table, key, value))
+        for key, expected, installed in result.mismatched[:show]:
+            lines.append("{} mismatched: {} -> {} (expected {})".format(
+                table, key, installed, expected))
+
+    lines.append("Target is {}".format(
+        "consistent with the mapping" if is_consistent(report) else "NOT consistent with the mapping"))
+    return "\n".join(lines)
@@ -0,0 +1,65 @@
+import logging
+import unittest
+
+from . import topology_generator
+from . import verification
+from .topology_controller import TopologyController
+from .topology_controller_test import FakeConnector, env_fd
+
+logging.basicConfig(level=logging.INFO)
+
+
+###########################################################
+class TestVerification(unittest.TestCase):
+    """TestVerification.
+    """
+
+    def setUp(self):
+        self.controller = TopologyController(
+            env_fd(12, 18), topo=topology_generator.generate_topo('large'))
+        self.connector = FakeConnector(batch_size=50)
+        self.controller.deploy(self.connector)
+
+    def test_deployed_tables_are_consistent(self):
+        """test_deployed_tables_are_consistent.
+        """
+        report = verification.verify_deployment(self.controller, self.connector)
+
+        port_entries, route_entries = self.controller.get_expected_entries()
+        self.assertTrue(verification.is_consistent(report))
+        self.assertEqual(report["port_mapping"].matching, len(port_entries))
+        self.assertEqual(report["routes"].matching, len(route_entries))
+
+    def test_differences_are_reported(self):
+        """test_differences_are_reported.
+        """
+        port_entries, route_entries = self.controller.get_expected_entries()
+        missing_port = next(iter(port_entries))
+        changed_route = next(iter(route_entries))
+
+        del self.connector.port_table[missing_port]
+        self.connector.route_table[changed_route] = ("02:00:00:00:00:01", 511)
+        self.connector.route_table[(4242, "10.0.0.0/24")] = ("02:00:00:00:00:02", 1)
+
+        report = verification.verify_deployment(self.controller, self.connector)
+
+        self.assertFalse(verification.is_consistent(report))
+        self.assertEqual(report["port_mapping"].missing,
+                         [(missing_port, port_entries[missing_port])])
+        self.assertEqual(report["routes"].mismatched,
+                         [(changed_route, route_entries[changed_route], ("02:00:00:00:00:01", 511))])
+        self.assertEqual(report["routes"].extra,
+                         [((4242, "10.0.0.0/24"), ("02:00:00:00:00:02", 1))])
+        self.assertIn("NOT consistent", verification.format_report(report))
+
+        # Entries of other topologies are ignored by a scoped verification
+        self.connector.port_table[missing_port] = port_entries[missing_port]
+        self.connector.route_table[changed_route] = route_entries[changed_route]
+        report = verification.verify_deployment(
+            self.controller, self.connector, scoped=True)
+        self.assertTrue(verification.is_consistent(report))
+
+
+################################################
+if __name__ == '__main__':
+    unittest.main()